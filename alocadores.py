@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# ALOCADORES SEM GRADE
+# =========================
+# Alternativas à enumeração de pesos: dependem só da matriz de covariância
+# e resolvem 50–200 ativos em milissegundos.
+#   paridade de risco – cada ativo contribui igualmente para o risco
+#                       (método de Newton, O(n³) por iteração, ~10 iterações);
+#   HRP               – paridade de risco hierárquica (López de Prado):
+#                       agrupamento pela correlação e bissecção recursiva.
+
+TOLERANCIA = 1e-10
+MAX_ITERACOES = 100
+
+
+# =========================
+# PARIDADE DE RISCO
+# =========================
+def paridade_risco(cov, orcamento=None, tolerancia=TOLERANCIA, max_iteracoes=MAX_ITERACOES):
+    """Pesos com contribuição ao risco proporcional a ``orcamento`` (igual, por padrão).
+
+    Minimiza f(y) = ½ y'Σy - Σ b_i ln y_i (convexa) pelo método de Newton:
+    gradiente Σy - b/y, hessiana Σ + diag(b/y²). No ótimo y_i (Σy)_i = b_i,
+    então w = y / Σy tem as contribuições pedidas.
+    """
+    cov = np.asarray(cov, dtype=float)
+    n = len(cov)
+    b = np.full(n, 1.0 / n) if orcamento is None else np.asarray(orcamento, dtype=float)
+    b = b / b.sum()
+
+    # ponto de partida: inverso da volatilidade, na escala em que y'Σy = 1
+    y = 1.0 / np.sqrt(np.diag(cov))
+    y /= np.sqrt(y @ cov @ y)
+
+    for _ in range(max_iteracoes):
+        sy = cov @ y
+        gradiente = sy - b / y
+        passo = np.linalg.solve(cov + np.diag(b / y ** 2), gradiente)
+
+        # passo amortecido: y precisa continuar positivo
+        t = 1.0
+        while np.any(y - t * passo <= 0):
+            t *= 0.5
+        y = y - t * passo
+
+        if np.max(np.abs(passo) / y) < tolerancia:
+            break
+
+    return y / y.sum()
+
+
+def contribuicoes_risco(pesos, cov):
+    """Fração da volatilidade da carteira devida a cada ativo (soma 1)."""
+    sw = cov @ pesos
+    return pesos * sw / (pesos @ sw)
+
+
+# =========================
+# HRP
+# =========================
+def _correlacao(cov):
+    vol = np.sqrt(np.diag(cov))
+    return cov / np.outer(vol, vol)
+
+
+def ordem_quasi_diagonal(cov):
+    """Folhas do agrupamento hierárquico (ligação simples) sobre a distância de correlação."""
+    d = np.sqrt(np.clip(0.5 * (1.0 - _correlacao(cov)), 0.0, None))
+    # distância entre os vetores de distância de cada ativo
+    dist = np.sqrt(np.maximum(((d[:, None, :] - d[None, :, :]) ** 2).sum(axis=2), 0.0))
+
+    n = len(cov)
+    np.fill_diagonal(dist, np.inf)
+    grupos = [[i] for i in range(n)]
+    ativo = np.ones(n, dtype=bool)
+
+    for _ in range(n - 1):
+        i, j = np.unravel_index(np.argmin(dist), dist.shape)
+        i, j = min(i, j), max(i, j)
+        grupos[i] = grupos[i] + grupos[j]
+
+        # ligação simples: distância ao novo grupo é a menor das duas
+        dist[i, :] = np.minimum(dist[i, :], dist[j, :])
+        dist[:, i] = dist[i, :]
+        dist[i, i] = np.inf
+        dist[j, :] = np.inf
+        dist[:, j] = np.inf
+        ativo[j] = False
+
+    return grupos[int(np.flatnonzero(ativo)[0])]
+
+
+def _variancia_grupo(cov, indices):
+    sub = cov[np.ix_(indices, indices)]
+    ivp = 1.0 / np.diag(sub)
+    ivp /= ivp.sum()
+    return ivp @ sub @ ivp
+
+
+def hrp(cov):
+    """Pesos da paridade de risco hierárquica."""
+    cov = np.asarray(cov, dtype=float)
+    pesos = np.ones(len(cov))
+    grupos = [ordem_quasi_diagonal(cov)]
+
+    while grupos:
+        proximos = []
+        for grupo in grupos:
+            if len(grupo) < 2:
+                continue
+            meio = len(grupo) // 2
+            esquerda, direita = grupo[:meio], grupo[meio:]
+
+            v_esq = _variancia_grupo(cov, esquerda)
+            v_dir = _variancia_grupo(cov, direita)
+            alfa = 1.0 - v_esq / (v_esq + v_dir)
+
+            pesos[esquerda] *= alfa
+            pesos[direita] *= 1.0 - alfa
+            proximos += [esquerda, direita]
+        grupos = proximos
+
+    return pesos / pesos.sum()
+
+
+# =========================
+# TABELA PARA AS FERRAMENTAS
+# =========================
+ALOCADORES = {
+    "Paridade de risco": paridade_risco,
+    "HRP": hrp,
+}
+
+
+def tabela_alocadores(nomes, media, cov, aporte_total, z_score, montantes=None):
+    """Uma linha por alocador, com as mesmas colunas da tabela de combinações."""
+    cov = np.asarray(cov, dtype=float)
+    linhas = {}
+
+    for rotulo, alocar in ALOCADORES.items():
+        w = alocar(cov)
+        vol = np.sqrt(w @ cov @ w)
+        var_pct = w @ media - z_score * vol
+
+        linha = {f"Peso {nome} (%)": peso * 100 for nome, peso in zip(nomes, w)}
+        linha["VaR %"] = var_pct * 100
+        linha["VaR R$"] = abs(var_pct) * aporte_total
+        if montantes is not None:
+            linha["Montante Final (R$)"] = w @ montantes
+        linhas[rotulo] = linha
+
+    return pd.DataFrame.from_dict(linhas, orient="index")
@@ -1,16 +1,22 @@
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.backends.backend_pdf import PdfPages
 
-plt.rcParams.update({'figure.max_open_warning': 0})
+from armazem_precos import fechamentos
+from calendario_b3 import inicio_janela
+from interface import abrir_janela, configurar_matplotlib
+from graficos import barras_retorno
+from metricas_risco import figura_superficie, superficie_var
+from snapshot import metricas_individuais
+
+configurar_matplotlib()
 
 RODAPE = (
     "Produzido por Helio Beloto Junior, Assessor de Investimento atuante pelo BTG. "
@@ -26,15 +32,12 @@ A4_LANDSCAPE = (11.69, 8.27)  # polegadas
 # DADOS
 # =====================================================
 def baixar_dados(ticker, data_ref, n):
-    start = data_ref - timedelta(days=n * 4)
-    end = data_ref + timedelta(days=1)
+    start = inicio_janela(data_ref, n)
 
-    df = yf.download(ticker, start=start, end=end, progress=False)
+    df = fechamentos(ticker, start, data_ref).to_frame()
     if df.empty:
         return None
 
-    df = df[['Close']].dropna()
-    df = df[df.index <= pd.to_datetime(data_ref)]
     return df.tail(n)
 
 # =====================================================
@@ -61,17 +64,11 @@ def analisar(ticker_raw, data_str, n):
     df['ret_ibov'] = df['ibov'].pct_change() * 100 if 'ibov' in df else np.nan
     df.dropna(inplace=True)
 
-    media = df['ret_acao'].mean()
-    vol = df['ret_acao'].std()
-    sharpe = media / vol if vol != 0 else np.nan
-
-    var_param = media - 1.65 * vol
-    var_hist = np.percentile(df['ret_acao'], 5)
-
-    correlacao = (
-        df[['ret_acao', 'ret_ibov']].corr().iloc[0, 1]
-        if 'ret_ibov' in df else np.nan
+    # Sharpe, correlação e VaR da pré-carga, quando o ticker está nela
+    metricas = metricas_individuais(
+        ticker, data_ref, n, df['ret_acao'] / 100, df['ret_ibov'] / 100
     )
+    var_hist = np.percentile(df['ret_acao'], 5)
 
     df['var_acao'] = (df['acao'] / df['acao'].iloc[0] - 1) * 100
     if 'ibov' in df:
@@ -79,12 +76,79 @@ def analisar(ticker_raw, data_str, n):
 
     return df, {
         "ticker": ticker,
-        "sharpe": sharpe,
-        "var_param": var_param,
+        "sharpe": metricas['sharpe'],
+        "var_param": metricas['var_param'],
         "var_hist": var_hist,
-        "correlacao": correlacao
+        "correlacao": metricas['correlacao']
     }
 
+# =====================================================
+# RELATÓRIO (sem interface)
+# =====================================================
+def figuras(df, info):
+    """Variação acumulada (com as métricas) e retornos diários, em A4 paisagem."""
+    # ========= FIGURA 1 – VARIAÇÃO ACUMULADA =========
+    fig1 = Figure(figsize=A4_LANDSCAPE)
+    ax1 = fig1.add_subplot()
+    ax1.plot(df['var_acao'], label=info['ticker'])
+
+    if 'var_ibov' in df:
+        ax1.plot(df['var_ibov'], '--', label='Ibovespa')
+
+    ax1.legend()
+    ax1.grid(alpha=0.3)
+
+    texto = (
+        f"Correlação: {info['correlacao']:.2f}\n"
+        f"Sharpe: {info['sharpe']:.2f}\n"
+        f"VaR Param: {info['var_param']:.2f}%\n"
+        f"VaR Hist: {info['var_hist']:.2f}%"
+    )
+
+    ax1.text(0.02, 0.95, texto, transform=ax1.transAxes,
+             fontsize=12, va="top", color="darkred")
+
+    ax1.text(0.5, 0.03, RODAPE, transform=ax1.transAxes,
+             fontsize=9, color="gray", ha="center")
+
+    # ========= FIGURA 2 – RETORNOS DIÁRIOS =========
+    fig2 = Figure(figsize=A4_LANDSCAPE)
+    ax2 = fig2.add_subplot()
+    barras_retorno(ax2, df.index, df['ret_acao'])
+
+    ax2.axhline(info['var_param'], linestyle='--', label='VaR Param')
+    ax2.axhline(info['var_hist'], linestyle=':', label='VaR Hist')
+
+    ax2.legend()
+    ax2.grid(axis='y', alpha=0.3)
+
+    ax2.text(0.5, 0.03, RODAPE, transform=ax2.transAxes,
+             fontsize=9, color="gray", ha="center")
+
+    return fig1, fig2
+
+
+def escrever_pdf(caminho, df, info, fig1, fig2):
+    # ret_acao já está em %; a superfície trabalha com retornos decimais
+    parametrico, historico = superficie_var(df[['ret_acao']] / 100)
+
+    with PdfPages(caminho) as pdf:
+        pdf.savefig(fig1)
+        pdf.savefig(fig2)
+        pdf.savefig(figura_superficie(
+            np.concatenate([parametrico, historico]),
+            ["Paramétrico", "Histórico"],
+            f"VaR (%) – {info['ticker']} – confiança × horizonte (pregões)",
+            RODAPE, A4_LANDSCAPE
+        ))
+
+
+def gerar_relatorio(caminho, ticker, data, n=252):
+    """Análise completa gravada em PDF; devolve as métricas."""
+    df, info = analisar(ticker, data, int(n))
+    escrever_pdf(caminho, df, info, *figuras(df, info))
+    return info
+
 # =====================================================
 # INTERFACE
 # =====================================================
@@ -143,42 +207,7 @@ class App:
         for w in self.preview.winfo_children():
             w.destroy()
 
-        # ========= FIGURA 1 – VARIAÇÃO ACUMULADA =========
-        self.fig1, ax1 = plt.subplots(figsize=A4_LANDSCAPE)
-        ax1.plot(self.df['var_acao'], label=self.info['ticker'])
-
-        if 'var_ibov' in self.df:
-            ax1.plot(self.df['var_ibov'], '--', label='Ibovespa')
-
-        ax1.legend()
-        ax1.grid(alpha=0.3)
-
-        texto = (
-            f"Correlação: {self.info['correlacao']:.2f}\n"
-            f"Sharpe: {self.info['sharpe']:.2f}\n"
-            f"VaR Param: {self.info['var_param']:.2f}%\n"
-            f"VaR Hist: {self.info['var_hist']:.2f}%"
-        )
-
-        ax1.text(0.02, 0.95, texto, transform=ax1.transAxes,
-                 fontsize=12, va="top", color="darkred")
-
-        ax1.text(0.5, 0.03, RODAPE, transform=ax1.transAxes,
-                 fontsize=9, color="gray", ha="center")
-
-        # ========= FIGURA 2 – RETORNOS DIÁRIOS =========
-        self.fig2, ax2 = plt.subplots(figsize=A4_LANDSCAPE)
-        cores = ['green' if x >= 0 else 'red' for x in self.df['ret_acao']]
-        ax2.bar(self.df.index, self.df['ret_acao'], color=cores)
-
-        ax2.axhline(self.info['var_param'], linestyle='--', label='VaR Param')
-        ax2.axhline(self.info['var_hist'], linestyle=':', label='VaR Hist')
-
-        ax2.legend()
-        ax2.grid(axis='y', alpha=0.3)
-
-        ax2.text(0.5, 0.03, RODAPE, transform=ax2.transAxes,
-                 fontsize=9, color="gray", ha="center")
+        self.fig1, self.fig2 = figuras(self.df, self.info)
 
         FigureCanvasTkAgg(self.fig1, self.preview).get_tk_widget().pack(
             side="top", fill="both", expand=True)
@@ -191,16 +220,16 @@ class App:
         if not path:
             return
 
-        with PdfPages(path) as pdf:
-            pdf.savefig(self.fig1)
-            pdf.savefig(self.fig2)
+        escrever_pdf(path, self.df, self.info, self.fig1, self.fig2)
 
         messagebox.showinfo("Sucesso", "Relatório A4 exportado com sucesso.")
 
 # =====================================================
 # MAIN
 # =====================================================
+def main(master=None):
+    return abrir_janela(App, master)
+
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
+    main()
@@ -1,16 +1,29 @@
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
+import multiprocessing
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from armazem_precos import fechamentos
+from calendario_b3 import inicio_janela
+from interface import abrir_janela, configurar_matplotlib
+from painel import montar_painel
+from metricas_risco import (
+    decompor_var, expected_shortfall, figura_superficie, superficie_var
+)
+from graficos import barras_retorno, marcar_rupturas
+from simulador import SimuladorOperacoes
+from snapshot import metricas_individuais
+from modelos_pdf import (
+    Relatorio, capa, mescla_disponivel, modelo_figura, renderizar_em_paralelo
+)
 
-plt.rcParams.update({'figure.max_open_warning': 0})
+configurar_matplotlib()
 
 # =========================
 # CONSTANTES
@@ -23,19 +36,18 @@ RODAPE = (
 A4_LANDSCAPE = (11.69, 8.27)
 A4_PORTRAIT = (8.27, 11.69)
 
+Z_SCORE = 1.65  # 95%
+
 # =========================
 # DOWNLOAD DE DADOS
 # =========================
 def baixar_dados(ticker, data_ref, n):
-    inicio = data_ref - timedelta(days=n * 4)
-    fim = data_ref + timedelta(days=1)
+    inicio = inicio_janela(data_ref, n)
 
-    df = yf.download(ticker, start=inicio, end=fim, progress=False)
+    df = fechamentos(ticker, inicio, data_ref).to_frame()
     if df.empty:
         return None
 
-    df = df[['Close']].dropna()
-    df = df[df.index <= pd.to_datetime(data_ref)]
     return df.tail(n)
 
 # =========================
@@ -61,19 +73,16 @@ def analisar(ticker_raw, data_str, n, aporte):
     df['ret_ibov'] = df['ibov'].pct_change()
     df.dropna(inplace=True)
 
-    media = df['ret_acao'].mean()
-    vol = df['ret_acao'].std()
-    sharpe = media / vol if vol != 0 else np.nan
-
-    cov = np.cov(df['ret_acao'], df['ret_ibov'])[0][1]
-    var_ibov = np.var(df['ret_ibov'])
-    beta = cov / var_ibov if var_ibov != 0 else np.nan
-
-    correlacao = df[['ret_acao', 'ret_ibov']].corr().iloc[0, 1]
+    # Sharpe, beta, correlação e VaR da pré-carga, quando o ticker está nela
+    metricas = metricas_individuais(ticker, data_ref, n, df['ret_acao'], df['ret_ibov'])
+    var_param = metricas['var_param']
+    var_reais = aporte * abs(var_param) / 100
 
     df['ret_acao_pct'] = df['ret_acao'] * 100
-    var_param = df['ret_acao_pct'].mean() - 1.65 * df['ret_acao_pct'].std()
-    var_reais = aporte * abs(var_param) / 100
+
+    # ES histórico a 95%: média dos piores 5% dos dias
+    es_hist = expected_shortfall(df['ret_acao_pct'].values, 0.95)
+    es_reais = aporte * abs(es_hist) / 100
 
     df['var_acao'] = (df['acao'] / df['acao'].iloc[0] - 1) * 100
     df['var_ibov'] = (df['ibov'] / df['ibov'].iloc[0] - 1) * 100
@@ -81,15 +90,329 @@ def analisar(ticker_raw, data_str, n, aporte):
     info = {
         "ticker": ticker,
         "aporte": aporte,
-        "sharpe": sharpe,
-        "beta": beta,
-        "correlacao": correlacao,
+        "sharpe": metricas['sharpe'],
+        "beta": metricas['beta'],
+        "correlacao": metricas['correlacao'],
         "var_param": var_param,
-        "var_reais": var_reais
+        "var_reais": var_reais,
+        "es_hist": es_hist,
+        "es_reais": es_reais
     }
 
     return df, info
 
+# =========================
+# SUPERFÍCIE DE VAR
+# =========================
+def superficie_resultados(resultados):
+    """VaR por confiança × horizonte para cada ticker e para a carteira (pesos = aportes)."""
+    retornos = montar_painel(
+        [df['ret_acao'] for df, _ in resultados],
+        [info['ticker'] for _, info in resultados]
+    ).matriz
+
+    aportes = np.array([info['aporte'] for _, info in resultados])
+    nomes = [info['ticker'] for _, info in resultados] + ["Carteira"]
+
+    parametrico, historico = superficie_var(retornos, aportes / aportes.sum())
+    return nomes, parametrico, historico
+
+# =========================
+# VAR DA CARTEIRA (COM CORRELAÇÕES)
+# =========================
+def decomposicao_carteira(resultados):
+    """VaR da carteira pelos aportes e covariância, com VaR marginal e componente por ticker."""
+    retornos = montar_painel(
+        [df['ret_acao'] for df, _ in resultados],
+        [info['ticker'] for _, info in resultados]
+    ).matriz
+
+    aportes = np.array([info['aporte'] for _, info in resultados])
+    cov = np.atleast_2d(np.cov(retornos, rowvar=False))
+
+    return decompor_var(aportes, retornos.mean(axis=0), cov, Z_SCORE)
+
+# =========================
+# SIMULADOR DE OPERAÇÕES
+# =========================
+def criar_simulador(resultados, data_str, n):
+    """Simulador what-if sobre a carteira analisada; tickers novos usam a mesma janela."""
+    retornos = montar_painel(
+        [df['ret_acao'] for df, _ in resultados],
+        [info['ticker'] for _, info in resultados]
+    ).retornos()
+
+    def buscar_retornos(ticker):
+        df, _ = analisar(ticker, data_str, n, 0.0)
+        return df['ret_acao']
+
+    return SimuladorOperacoes(
+        retornos.columns, retornos,
+        [info['aporte'] for _, info in resultados],
+        buscar_retornos, Z_SCORE
+    )
+
+
+class JanelaSimulador:
+    def __init__(self, master, simulador):
+        self.simulador = simulador
+
+        self.janela = tk.Toplevel(master)
+        self.janela.title("Simular operação – Zeca(AI)")
+
+        frame = ttk.Frame(self.janela, padding=10)
+        frame.pack(fill="both", expand=True)
+
+        self.atual = ttk.Label(frame, font=("Segoe UI", 10, "bold"))
+        self.atual.grid(row=0, column=0, columnspan=3, sticky="w", pady=(0, 8))
+
+        ttk.Label(frame, text="Ticker").grid(row=1, column=0, sticky="w")
+        self.ticker = ttk.Entry(frame, width=12)
+        self.ticker.insert(0, "VALE3")
+        self.ticker.grid(row=1, column=1, sticky="w")
+
+        ttk.Label(frame, text="Valor em R$ (negativo = venda)").grid(row=2, column=0, sticky="w")
+        self.valor = ttk.Entry(frame, width=12)
+        self.valor.insert(0, "20000")
+        self.valor.grid(row=2, column=1, sticky="w")
+
+        ttk.Button(frame, text="Avaliar", command=lambda: self.executar(False))\
+            .grid(row=3, column=0, pady=6)
+        ttk.Button(frame, text="Aplicar à carteira", command=lambda: self.executar(True))\
+            .grid(row=3, column=1, pady=6)
+
+        self.resultado = ttk.Label(frame, justify="left")
+        self.resultado.grid(row=4, column=0, columnspan=3, sticky="w")
+
+        self.mostrar_atual()
+
+    def mostrar_atual(self):
+        m = self.simulador.atual()
+        self.atual.config(
+            text=f"Carteira atual: R$ {m['total']:,.2f} | "
+                 f"VaR R$ {m['var_reais']:,.2f} | ES R$ {m['es_reais']:,.2f}"
+        )
+
+    def executar(self, aplicar):
+        ticker = self.ticker.get()
+        valor = float(self.valor.get())
+        antes = self.simulador.atual()
+        # ticker novo é baixado: fora da thread da interface
+        threading.Thread(
+            target=self._thread, args=(ticker, valor, aplicar, antes), daemon=True
+        ).start()
+
+    def _thread(self, ticker, valor, aplicar, antes):
+        try:
+            operar = self.simulador.aplicar if aplicar else self.simulador.avaliar
+            depois = operar(ticker, valor)
+        except Exception as e:
+            messagebox.showerror("Erro", str(e), parent=self.janela)
+            return
+
+        texto = (
+            f"{'Aplicado' if aplicar else 'Simulação'}: "
+            f"{'compra' if valor >= 0 else 'venda'} de R$ {abs(valor):,.2f} em {ticker.upper()}\n"
+            f"VaR: R$ {antes['var_reais']:,.2f} → R$ {depois['var_reais']:,.2f} "
+            f"({depois['var_reais'] - antes['var_reais']:+,.2f})\n"
+            f"ES:  R$ {antes['es_reais']:,.2f} → R$ {depois['es_reais']:,.2f} "
+            f"({depois['es_reais'] - antes['es_reais']:+,.2f})\n"
+            f"VaR %: {antes['var_pct']:.2f}% → {depois['var_pct']:.2f}%"
+        )
+        self.janela.after(0, lambda: self._mostrar(texto))
+
+    def _mostrar(self, texto):
+        self.resultado.config(text=texto)
+        self.mostrar_atual()
+
+# =========================
+# PÁGINAS DO PDF
+# =========================
+TITULO_CAPA = "Relatório de VaR paramétrico multi-ações"
+
+TEXTO_EXPLICATIVO = (
+    "** Entendendo os Indicadores de Risco da Carteira**\n\n"
+    "-> O que é Correlação?\n"
+    "A correlação indica o quanto o preço de uma ação tende a se mover junto com o Ibovespa.\n\n"
+    "• Correlação próxima de +1: a ação costuma subir e cair junto com o índice.\n"
+    "• Correlação próxima de 0: a ação se move de forma mais independente.\n"
+    "• Correlação negativa: a ação tende a se mover na direção oposta ao índice.\n\n"
+    "• Por que isso importa?\n"
+    "Ativos com correlação menor ajudam a diversificar a carteira, reduzindo o risco total.\n\n"
+    "-> O que é Beta?\n"
+    "O beta mede a sensibilidade da ação às oscilações do mercado (Ibovespa).\n\n"
+    "• Beta = 1 → a ação oscila, em média, como o mercado.\n"
+    "• Beta > 1 → a ação tende a oscilar mais que o mercado (maior risco).\n"
+    "• Beta < 1 → a ação tende a oscilar menos que o mercado (menor risco).\n\n"
+    "👉 Exemplo prático:\n"
+    "Se uma ação tem beta 1,2, uma variação de 1% do Ibovespa tende a gerar cerca de 1,2% nessa ação.\n\n"
+    "-> O que é o Índice de Sharpe?\n"
+    "O Índice de Sharpe mede quanto retorno um investimento entrega para cada unidade de risco assumida.\n\n"
+    "• Sharpe maior que 1: boa relação risco-retorno.\n"
+    "• Sharpe próximo de 0: retorno baixo para o risco assumido.\n"
+    "• Sharpe negativo: retorno inferior ao ativo livre de risco.\n\n"
+    "-> O que é VaR (Value at Risk)?\n"
+    "O VaR estima quanto um investimento pode perder em um único dia, em condições normais de mercado, "
+    "com um determinado nível de confiança.\n\n"
+    "• VaR em %: mostra a perda percentual estimada.\n"
+    "• VaR em R$: mostra o impacto financeiro considerando o valor investido.\n\n"
+    "Exemplo prático:\n"
+    "Se o VaR for -2,0% e o investimento for de R$ 10.000, espera-se que a perda não ultrapasse "
+    "R$ 200 em 95% dos dias.\n\n"
+    "⚠️ Importante:\n"
+    "O VaR não elimina o risco e não prevê eventos extremos, mas é uma ferramenta fundamental "
+    "para mensurar e controlar o risco da carteira."
+)
+
+
+def desenhar_variacao(ax, df, info):
+    ax.plot(df['var_acao'], label=info['ticker'])
+    ax.plot(df['var_ibov'], '--', label='Ibovespa')
+    ax.legend()
+    ax.grid(alpha=0.3)
+
+    texto = (
+        f"Correlação: {info['correlacao']:.2f}\n"
+        f"Beta: {info['beta']:.2f}\n"
+        f"Sharpe: {info['sharpe']:.2f}"
+    )
+
+    ax.text(0.02, 0.95, texto, transform=ax.transAxes,
+            fontsize=12, va="top",
+            bbox=dict(boxstyle="round", fc="white", ec="gray"))
+
+def desenhar_retornos(fig, ax, df, info):
+    valores = df['ret_acao_pct']
+    barras_retorno(ax, df.index, valores)
+
+    ax.axhline(info['var_param'], linestyle='--',
+               color='darkred', label='VaR Paramétrico (%)')
+    ax.axhline(info['es_hist'], linestyle=':',
+               color='black', label='ES Histórico (%)')
+    ax.legend()
+
+    ax.text(
+        0.02, 0.95,
+        f"VaR (%): {info['var_param']:.2f}%\n"
+        f"VaR (R\\$): R\\$ {info['var_reais']:,.2f}\n"
+        f"ES (%): {info['es_hist']:.2f}%\n"
+        f"ES (R\\$): R\\$ {info['es_reais']:,.2f}",
+        transform=ax.transAxes,
+        fontsize=12, va="top", color="darkred"
+    )
+
+    ymin = min(valores.min(), info['var_param'], info['es_hist'])
+    ymax = max(valores.max(), 0)
+    margem = (ymax - ymin) * 0.25
+    ax.set_ylim(ymin - margem, ymax + margem)
+
+    offset = (ymax - ymin) * 0.08
+    marcar_rupturas(ax, df.index, valores, info['var_param'], offset)
+
+    ax.grid(axis='y', alpha=0.3)
+    fig.subplots_adjust(bottom=0.20)
+
+def desenhar_paginas_ticker(pdf, df, info):
+    grafico = modelo_figura("ticker", A4_LANDSCAPE, RODAPE)
+
+    fig, ax = grafico.nova()
+    desenhar_variacao(ax, df, info)
+    pdf.savefig(fig)
+
+    fig, ax = grafico.nova()
+    desenhar_retornos(fig, ax, df, info)
+    pdf.savefig(fig)
+
+TICKERS_POR_PAGINA = 6  # linhas do resumo por página (cada ticker ocupa duas)
+
+# nos textos abaixo "R\\$": com dois "$" na mesma string o matplotlib
+# entraria em modo matemático
+def _linhas_ticker(ax, y, info, marginal, componente, var_carteira):
+    ax.text(
+        0.05, y,
+        f"{info['ticker']} | "
+        f"Aporte: R\\$ {info['aporte']:,.2f} | "
+        f"VaR (%): {info['var_param']:.2f}% | "
+        f"VaR (R\\$): R\\$ {info['var_reais']:,.2f} | "
+        f"ES (R\\$): R\\$ {info['es_reais']:,.2f}",
+        fontsize=12
+    )
+
+    texto = (
+        f"VaR marginal: {marginal * 100:.2f}% por R\\$ aplicado | "
+        f"VaR componente: R\\$ {componente:,.2f}"
+    )
+    # com VaR da carteira nulo, negativo ou indefinido a fração não tem sentido
+    if np.isfinite(var_carteira) and var_carteira > 0:
+        texto += f" ({componente / var_carteira * 100:.1f}% do VaR da carteira)"
+
+    ax.text(0.07, y - 0.04, texto, fontsize=10, color="dimgray")
+
+def figuras_resumo(resultados):
+    """Páginas de resumo (até TICKERS_POR_PAGINA tickers cada); os totais vão na última."""
+    var_total = sum(info['var_reais'] for _, info in resultados)
+    decomposicao = decomposicao_carteira(resultados)
+    var_carteira = decomposicao['var_reais']
+
+    linhas = list(zip(resultados, decomposicao['marginal'], decomposicao['componente']))
+    paginas = [
+        linhas[i:i + TICKERS_POR_PAGINA]
+        for i in range(0, len(linhas), TICKERS_POR_PAGINA)
+    ]
+
+    for numero, pagina in enumerate(paginas, start=1):
+        fig = Figure(figsize=A4_LANDSCAPE)
+        ax = fig.add_subplot()
+        ax.axis("off")
+
+        titulo = "Resumo de Risco da Carteira"
+        if len(paginas) > 1:
+            titulo += f" ({numero}/{len(paginas)})"
+
+        y = 0.85
+        ax.text(0.05, y, titulo, fontsize=16, weight="bold")
+        y -= 0.08
+
+        for (_, info), marginal, componente in pagina:
+            _linhas_ticker(ax, y, info, marginal, componente, var_carteira)
+            y -= 0.10
+
+        if numero == len(paginas):
+            ax.text(
+                0.05, y - 0.04,
+                f"VaR da Carteira (com correlações): "
+                f"R\\$ {var_carteira:,.2f} ({-decomposicao['var_pct']:.2f}%)",
+                fontsize=14, weight="bold", color="darkred"
+            )
+            ax.text(
+                0.05, y - 0.10,
+                f"Soma simples dos VaRs: R\\$ {var_total:,.2f} | "
+                f"Benefício da diversificação: R\\$ {var_total - var_carteira:,.2f}",
+                fontsize=11
+            )
+
+        ax.text(0.5, 0.02, RODAPE, fontsize=8,
+                color="gray", ha="center", transform=ax.transAxes)
+
+        yield fig
+
+def desenhar_explicativa(fig):
+    ax = fig.add_subplot()
+    ax.axis("off")
+
+    fig.subplots_adjust(bottom=0.00010)
+
+    ax.text(0.05, 0.92, TEXTO_EXPLICATIVO, fontsize=12, va="top", wrap=True)
+
+    ax.text(
+        0.5, 0.04,
+        RODAPE,
+        fontsize=8,
+        color="gray",
+        ha="center",
+        transform=ax.transAxes
+    )
+
 # =========================
 # INTERFACE
 # =========================
@@ -101,6 +424,7 @@ class App:
         self.inputs = []
         self.resultados = []
         self.ultimo_pdf = None
+        self.simulador = None
 
         self._build()
 
@@ -135,6 +459,12 @@ class App:
         )
         self.btn_abrir.grid(row=3, column=2, pady=6)
 
+        self.btn_simular = ttk.Button(
+            frame, text="Simular operação",
+            command=self.abrir_simulador, state="disabled"
+        )
+        self.btn_simular.grid(row=4, column=1, pady=6)
+
     def adicionar_ticker(self):
         linha = ttk.Frame(self.frame_tickers)
         linha.pack(fill="x", pady=2)
@@ -167,7 +497,13 @@ class App:
 
             self.exportar_pdf()
 
+            # Σw e o resultado diário ficam prontos para as simulações
+            self.simulador = criar_simulador(
+                self.resultados, self.data.get(), int(self.n.get())
+            )
+
             self.btn_abrir.config(state="normal")
+            self.btn_simular.config(state="normal")
             messagebox.showinfo("Sucesso", "Relatório gerado com sucesso!")
 
         except Exception as e:
@@ -185,203 +521,49 @@ class App:
             return
 
         self.ultimo_pdf = caminho
-        var_total = 0
 
-        with PdfPages(caminho) as pdf:
+        with Relatorio(caminho) as pdf:
 
-            # >>> INÍCIO DA CAPA (ÚNICA ADIÇÃO)
-            fig, ax = plt.subplots(figsize=A4_PORTRAIT)
-            ax.axis("off")
-
-            ax.text(
-                0.5, 0.60,
-                "Relatório de VaR paramétrico multi-ações",
-                fontsize=23,
-                color="lightblue",
-                ha="center",
-                va="center",
-                weight="bold"
-            )
-
-            ax.text(
-                0.5, 0.52,
+            pdf.savefig(capa(TITULO_CAPA, RODAPE, A4_PORTRAIT).renderizar(
                 f"Data final da análise: {self.data.get()}\n"
-                f"Janela considerada: {self.n.get()} pregões",
-                fontsize=14,
-                ha="center",
-                va="center",
-                color="gray"
-            )
-
-            ax.text(
-                0.5, 0.06,
-                RODAPE,
-                fontsize=9,
-                color="gray",
-                ha="center"
-            )
-
-            pdf.savefig(fig)
-            plt.close(fig)
-            # >>> FIM DA CAPA
-
-            for df, info in self.resultados:
-                # ===== Gráfico 1 =====
-                fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-                ax.plot(df['var_acao'], label=info['ticker'])
-                ax.plot(df['var_ibov'], '--', label='Ibovespa')
-                ax.legend()
-                ax.grid(alpha=0.3)
-
-                texto = (
-                    f"Correlação: {info['correlacao']:.2f}\n"
-                    f"Beta: {info['beta']:.2f}\n"
-                    f"Sharpe: {info['sharpe']:.2f}"
-                )
-
-                ax.text(0.02, 0.95, texto, transform=ax.transAxes,
-                        fontsize=12, va="top",
-                        bbox=dict(boxstyle="round", fc="white", ec="gray"))
-
-                ax.text(0.5, 0.02, RODAPE, fontsize=8,
-                        color="gray", ha="center", transform=ax.transAxes)
-
+                f"Janela considerada: {self.n.get()} pregões"
+            ))
+
+            if mescla_disponivel():
+                # duas páginas por ticker, renderizadas em paralelo e mescladas na ordem
+                for paginas in renderizar_em_paralelo(
+                    desenhar_paginas_ticker, self.resultados
+                ):
+                    pdf.adicionar_pdf(paginas)
+            else:
+                for df, info in self.resultados:
+                    desenhar_paginas_ticker(pdf, df, info)
+
+            # ===== Páginas de resumo =====
+            for fig in figuras_resumo(self.resultados):
                 pdf.savefig(fig)
-                plt.close(fig)
-
-                # ===== Gráfico 2 =====
-                fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-                valores = df['ret_acao_pct']
-                cores = ['green' if x >= 0 else 'red' for x in valores]
-                ax.bar(df.index, valores, color=cores)
-
-                ax.axhline(info['var_param'], linestyle='--',
-                           color='darkred', label='VaR Paramétrico (%)')
-                ax.legend()
-
-                ax.text(
-                    0.02, 0.95,
-                    f"VaR (%): {info['var_param']:.2f}%\n"
-                    f"VaR (R$): R$ {info['var_reais']:,.2f}",
-                    transform=ax.transAxes,
-                    fontsize=12, va="top", color="darkred"
-                )
-
-                ymin = min(valores.min(), info['var_param'])
-                ymax = max(valores.max(), 0)
-                margem = (ymax - ymin) * 0.25
-                ax.set_ylim(ymin - margem, ymax + margem)
-
-                offset = (ymax - ymin) * 0.08
-
-                for idx, v in valores.items():
-                    if v < info['var_param']:
-                        ax.text(
-                            idx, v - offset,
-                            idx.strftime("%d/%m/%Y"),
-                            rotation=90,
-                            fontsize=8,
-                            ha='center',
-                            va='top'
-                        )
 
-                ax.grid(axis='y', alpha=0.3)
-                fig.subplots_adjust(bottom=0.20)
-
-                ax.text(0.5, 0.02, RODAPE, fontsize=8,
-                        color="gray", ha="center", transform=ax.transAxes)
-
-                pdf.savefig(fig)
-                plt.close(fig)
-
-                var_total += info['var_reais']
-
-            # ===== Página resumo =====
-            fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-            ax.axis("off")
-
-            y = 0.85
-            ax.text(0.05, y, "Resumo de Risco da Carteira",
-                    fontsize=16, weight="bold")
-            y -= 0.08
-
-            for _, info in self.resultados:
-                ax.text(
-                    0.05, y,
-                    f"{info['ticker']} | "
-                    f"Aporte: R$ {info['aporte']:,.2f} | "
-                    f"VaR (%): {info['var_param']:.2f}% | "
-                    f"VaR (R$): R$ {info['var_reais']:,.2f}",
-                    fontsize=12
-                )
-                y -= 0.06
-
-            ax.text(
-                0.05, y - 0.04,
-                f"VaR Total da Carteira (soma simples): "
-                f"R$ {var_total:,.2f}",
-                fontsize=14, weight="bold", color="darkred"
-            )
-
-            ax.text(0.5, 0.02, RODAPE, fontsize=8,
-                    color="gray", ha="center", transform=ax.transAxes)
-
-            pdf.savefig(fig)
-            plt.close(fig)
-
-            # ===== Página explicativa =====
-            texto = (
-                "** Entendendo os Indicadores de Risco da Carteira**\n\n"
-                "-> O que é Correlação?\n"
-                "A correlação indica o quanto o preço de uma ação tende a se mover junto com o Ibovespa.\n\n"
-                "• Correlação próxima de +1: a ação costuma subir e cair junto com o índice.\n"
-                "• Correlação próxima de 0: a ação se move de forma mais independente.\n"
-                "• Correlação negativa: a ação tende a se mover na direção oposta ao índice.\n\n"
-                "• Por que isso importa?\n"
-                "Ativos com correlação menor ajudam a diversificar a carteira, reduzindo o risco total.\n\n"
-                "-> O que é Beta?\n"
-                "O beta mede a sensibilidade da ação às oscilações do mercado (Ibovespa).\n\n"
-                "• Beta = 1 → a ação oscila, em média, como o mercado.\n"
-                "• Beta > 1 → a ação tende a oscilar mais que o mercado (maior risco).\n"
-                "• Beta < 1 → a ação tende a oscilar menos que o mercado (menor risco).\n\n"
-                "👉 Exemplo prático:\n"
-                "Se uma ação tem beta 1,2, uma variação de 1% do Ibovespa tende a gerar cerca de 1,2% nessa ação.\n\n"
-                "-> O que é o Índice de Sharpe?\n"
-                "O Índice de Sharpe mede quanto retorno um investimento entrega para cada unidade de risco assumida.\n\n"
-                "• Sharpe maior que 1: boa relação risco-retorno.\n"
-                "• Sharpe próximo de 0: retorno baixo para o risco assumido.\n"
-                "• Sharpe negativo: retorno inferior ao ativo livre de risco.\n\n"
-                "-> O que é VaR (Value at Risk)?\n"
-                "O VaR estima quanto um investimento pode perder em um único dia, em condições normais de mercado, "
-                "com um determinado nível de confiança.\n\n"
-                "• VaR em %: mostra a perda percentual estimada.\n"
-                "• VaR em R$: mostra o impacto financeiro considerando o valor investido.\n\n"
-                "Exemplo prático:\n"
-                "Se o VaR for -2,0% e o investimento for de R$ 10.000, espera-se que a perda não ultrapasse "
-                "R$ 200 em 95% dos dias.\n\n"
-                "⚠️ Importante:\n"
-                "O VaR não elimina o risco e não prevê eventos extremos, mas é uma ferramenta fundamental "
-                "para mensurar e controlar o risco da carteira."
-            )
-
-            fig, ax = plt.subplots(figsize=A4_PORTRAIT)
-            ax.axis("off")
-
-            fig.subplots_adjust(bottom=0.00010)
-
-            ax.text(0.05, 0.92, texto, fontsize=12, va="top", wrap=True)
-
-            ax.text(
-                0.5, 0.04,
-                RODAPE,
-                fontsize=8,
-                color="gray",
-                ha="center",
-                transform=ax.transAxes
+            # ===== Superfície de VaR =====
+            nomes, parametrico, historico = superficie_resultados(self.resultados)
+
+            pdf.savefig(figura_superficie(
+                parametrico, nomes,
+                "VaR Paramétrico (%) – confiança × horizonte (pregões)",
+                RODAPE, A4_LANDSCAPE
+            ))
+            pdf.savefig(figura_superficie(
+                historico, nomes,
+                "VaR Histórico (%) – confiança × horizonte (pregões)",
+                RODAPE, A4_LANDSCAPE
+            ))
+
+            # ===== Página explicativa (renderizada uma vez por versão) =====
+            pdf.adicionar_estatica(
+                "explicativa_risco_mult", desenhar_explicativa, A4_PORTRAIT
             )
 
-            pdf.savefig(fig)
-            plt.close(fig)
+    def abrir_simulador(self):
+        JanelaSimulador(self.root, self.simulador)
 
     def abrir_pdf(self):
         if self.ultimo_pdf and os.path.exists(self.ultimo_pdf):
@@ -390,16 +572,10 @@ class App:
 # =========================
 # MAIN
 # =========================
-if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
-
-def main():
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
+def main(master=None):
+    return abrir_janela(App, master)
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,380 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from busca_assincrona import ErroBusca, historico, historicos
+from caminhos import diretorio_cache
+from calendario_b3 import contar_pregoes
+
+# =========================
+# ARMAZÉM LOCAL DE PREÇOS
+# =========================
+# Layout em disco (um diretório por ticker, intervalo e ano):
+#   precos/<intervalo>/<TICKER>/<ano>/tempo.npy      int64  (ns, horário de Brasília)
+#   precos/<intervalo>/<TICKER>/<ano>/<coluna>.npy   float32 (OHLC) / int64 (volume)
+#   precos/<intervalo>/<TICKER>/cobertura.json       intervalos já baixados
+# Leitura por memory-map e fatiamento por data com busca binária.
+#
+# O Yahoo recalcula para trás o "Adj Close" (e o "Close", nos desdobramentos)
+# a cada provento novo. Cada download inclui uma barra já gravada (a âncora);
+# se ela voltar com outro valor, o ajuste mudou e o histórico do ticker é
+# baixado de novo inteiro, para não emendar séries com fatores diferentes.
+#
+# Trecho anterior à primeira barra gravada que volta vazio (ou com 400/404)
+# é de antes da listagem: fica coberto, sem barras, e não é pedido de novo.
+
+COLUNAS_PRECO = ("Open", "High", "Low", "Close", "Adj Close")
+COLUNA_VOLUME = "Volume"
+COLUNA_AJUSTADA = "Adj Close"
+
+INTERVALOS_INTRADAY = ("1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h")
+
+FUSO = "America/Sao_Paulo"
+
+# antes da abertura não há barra do dia; depois do fechamento ela é definitiva
+HORA_ABERTURA = 10
+HORA_FECHAMENTO = 19
+
+# janela para achar a âncora ao lado de um trecho (cobre feriados emendados)
+DIAS_ANCORA = 10
+# float32 guarda ~7 dígitos; um provento mexe bem mais que isso no fator
+TOLERANCIA_AJUSTE = 1e-5
+# respostas do Yahoo para período sem cotação (antes da listagem, por exemplo)
+STATUS_SEM_DADOS = (400, 404)
+
+_travas = {}
+_trava_global = threading.Lock()
+
+
+def _arquivo(nome):
+    return nome.lower().replace(" ", "_") + ".npy"
+
+
+def _dir_ticker(ticker, intervalo):
+    return diretorio_cache("precos", intervalo, ticker.upper())
+
+
+def _trava(ticker, intervalo):
+    with _trava_global:
+        return _travas.setdefault((ticker.upper(), intervalo), threading.Lock())
+
+
+# =========================
+# COBERTURA
+# =========================
+def _ler_cobertura(ticker, intervalo):
+    caminho = os.path.join(_dir_ticker(ticker, intervalo), "cobertura.json")
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho) as f:
+        return [(pd.Timestamp(a), pd.Timestamp(b)) for a, b in json.load(f)]
+
+
+def _gravar_cobertura(ticker, intervalo, faixas):
+    faixas = sorted(faixas)
+    unidas = []
+    for ini, fim in faixas:
+        if unidas and ini <= unidas[-1][1] + pd.Timedelta(days=1):
+            unidas[-1] = (unidas[-1][0], max(unidas[-1][1], fim))
+        else:
+            unidas.append((ini, fim))
+
+    caminho = os.path.join(_dir_ticker(ticker, intervalo), "cobertura.json")
+    with open(caminho + ".tmp", "w") as f:
+        json.dump([[a.isoformat(), b.isoformat()] for a, b in unidas], f)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def faixas_faltantes(ticker, inicio, fim, intervalo="1d"):
+    """Trechos de [inicio, fim] (datas) que ainda não foram baixados."""
+    inicio, fim = pd.Timestamp(inicio).normalize(), pd.Timestamp(fim).normalize()
+    faltam = []
+    cursor = inicio
+    for ini, f in _ler_cobertura(ticker, intervalo):
+        if f < cursor:
+            continue
+        if ini > fim:
+            break
+        if ini > cursor:
+            faltam.append((cursor, ini - pd.Timedelta(days=1)))
+        cursor = max(cursor, f + pd.Timedelta(days=1))
+    if cursor <= fim:
+        faltam.append((cursor, fim))
+    return faltam
+
+
+# =========================
+# ESCRITA
+# =========================
+def _normalizar(df):
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+
+    indice = pd.DatetimeIndex(df.index)
+    if indice.tz is not None:
+        indice = indice.tz_convert(FUSO).tz_localize(None)
+
+    df = df.set_axis(indice).sort_index()
+    return df[~df.index.duplicated(keep="last")]
+
+
+def gravar(ticker, df, intervalo="1d"):
+    """Mescla barras OHLCV no armazém (as novas prevalecem sobre as existentes)."""
+    if df is None or df.empty:
+        return
+
+    df = _normalizar(df)
+    base = _dir_ticker(ticker, intervalo)
+
+    with _trava(ticker, intervalo):
+        for ano, parte in df.groupby(df.index.year):
+            pasta = os.path.join(base, str(ano))
+            existente = _ler_ano(pasta, mmap=False)
+            if existente is not None:
+                existente = existente[~existente.index.isin(parte.index)]
+                parte = pd.concat([existente, parte]).sort_index()
+            _gravar_ano(pasta, parte)
+
+
+def _gravar_ano(pasta, df):
+    os.makedirs(pasta, exist_ok=True)
+
+    colunas = {"tempo": df.index.values.astype("datetime64[ns]").astype(np.int64)}
+    for nome in COLUNAS_PRECO:
+        if nome in df:
+            colunas[nome] = df[nome].values.astype(np.float32)
+    if COLUNA_VOLUME in df:
+        colunas[COLUNA_VOLUME] = np.nan_to_num(df[COLUNA_VOLUME].values).astype(np.int64)
+
+    # grava tudo em temporários e só então troca, para não deixar o ano inconsistente
+    for nome, valores in colunas.items():
+        destino = os.path.join(pasta, _arquivo(nome))
+        with open(destino + ".tmp", "wb") as f:
+            np.save(f, valores)
+    for nome in colunas:
+        destino = os.path.join(pasta, _arquivo(nome))
+        os.replace(destino + ".tmp", destino)
+
+
+# =========================
+# LEITURA
+# =========================
+def _ler_ano(pasta, inicio=None, fim=None, colunas=None, mmap=True):
+    arquivo_tempo = os.path.join(pasta, _arquivo("tempo"))
+    if not os.path.exists(arquivo_tempo):
+        return None
+
+    modo = "r" if mmap else None
+    tempo = np.load(arquivo_tempo, mmap_mode=modo)
+
+    a = 0 if inicio is None else np.searchsorted(tempo, inicio, side="left")
+    b = len(tempo) if fim is None else np.searchsorted(tempo, fim, side="right")
+
+    dados = {}
+    for nome in colunas or COLUNAS_PRECO + (COLUNA_VOLUME,):
+        caminho = os.path.join(pasta, _arquivo(nome))
+        if os.path.exists(caminho):
+            valores = np.load(caminho, mmap_mode=modo)[a:b]
+            dados[nome] = valores.astype(np.float64) if nome != COLUNA_VOLUME else np.array(valores)
+
+    return pd.DataFrame(dados, index=pd.DatetimeIndex(np.array(tempo[a:b]).astype("datetime64[ns]")))
+
+
+def ler(ticker, inicio, fim, intervalo="1d", colunas=None):
+    """Barras de [inicio, fim] (inclusive) já presentes no armazém."""
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    if intervalo not in INTERVALOS_INTRADAY:
+        fim = fim.normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+
+    base = _dir_ticker(ticker, intervalo)
+    ini_ns, fim_ns = inicio.value, fim.value
+
+    partes = []
+    for ano in range(inicio.year, fim.year + 1):
+        parte = _ler_ano(os.path.join(base, str(ano)), ini_ns, fim_ns, colunas)
+        if parte is not None and not parte.empty:
+            partes.append(parte)
+
+    if not partes:
+        return pd.DataFrame(columns=list(colunas or COLUNAS_PRECO + (COLUNA_VOLUME,)))
+    return pd.concat(partes)
+
+
+# =========================
+# DOWNLOAD + CACHE
+# =========================
+def _cobrir(ticker, ini, f, intervalo):
+    with _trava(ticker, intervalo):
+        _gravar_cobertura(
+            ticker, intervalo, _ler_cobertura(ticker, intervalo) + [(ini, f)]
+        )
+
+
+def _primeira_barra(ticker, intervalo):
+    base = _dir_ticker(ticker, intervalo)
+    for ano in sorted(int(nome) for nome in os.listdir(base) if nome.isdigit()):
+        parte = _ler_ano(os.path.join(base, str(ano)), colunas=("Close",))
+        if parte is not None and not parte.empty:
+            return parte.index[0]
+    return None
+
+
+def _antes_da_listagem(ticker, f, intervalo):
+    primeira = _primeira_barra(ticker, intervalo)
+    return primeira is not None and f < primeira.normalize()
+
+
+def _registrar(ticker, ini, f, df, intervalo):
+    gravar(ticker, df, intervalo)
+
+    # resposta vazia ou curta (falha do servidor, limite de barras): só fica
+    # coberto o que veio, o resto é pedido de novo na próxima leitura; vazia
+    # antes da primeira barra conhecida é o ticker ainda não negociado
+    if df is None or df.empty:
+        if _antes_da_listagem(ticker, f, intervalo):
+            _cobrir(ticker, ini, f, intervalo)
+        return
+    ultima = _normalizar(df).index[-1].normalize()
+
+    # o pregão de hoje só é marcado como coberto depois do fechamento
+    agora = datetime.now()
+    limite_cobertura = pd.Timestamp(agora.date())
+    if agora.hour < HORA_FECHAMENTO:
+        limite_cobertura -= pd.Timedelta(days=1)
+    f_coberto = min(f, limite_cobertura, ultima)
+    if ini <= f_coberto:
+        _cobrir(ticker, ini, f_coberto, intervalo)
+
+
+def faixas_a_baixar(ticker, inicio, fim, intervalo="1d"):
+    """Trechos faltantes que podem ter cotação: com pregão e já iniciados."""
+    agora = datetime.now()
+    ultimo_dia = pd.Timestamp(agora.date())
+    if agora.hour < HORA_ABERTURA:
+        ultimo_dia -= pd.Timedelta(days=1)
+
+    faixas = []
+    for ini, f in faixas_faltantes(ticker, inicio, min(pd.Timestamp(fim), ultimo_dia), intervalo):
+        if contar_pregoes(ini, f) > 0:
+            faixas.append((ini, f))
+    return faixas
+
+
+def _ancora(ticker, ini, f, intervalo):
+    """Barra gravada encostada no trecho: a última antes dele ou, sem ela, a primeira depois."""
+    colunas = ("Close", COLUNA_AJUSTADA)
+    antes = ler(ticker, ini - pd.Timedelta(days=DIAS_ANCORA), ini - pd.Timedelta(1, "ns"),
+                intervalo, colunas)
+    if not antes.empty:
+        return antes.iloc[-1:]
+    depois = ler(ticker, f + pd.Timedelta(days=1), f + pd.Timedelta(days=DIAS_ANCORA),
+                 intervalo, colunas)
+    return depois.iloc[:1]
+
+
+def _planejar(ticker, inicio, fim, intervalo):
+    """Trechos a baixar como ``(ticker, ini, f, ancora)``."""
+    return [
+        (ticker, ini, f, _ancora(ticker, ini, f, intervalo))
+        for ini, f in faixas_a_baixar(ticker, inicio, fim, intervalo)
+    ]
+
+
+def _pedido(plano, intervalo):
+    # o pedido vai até a âncora para que ela volte junto
+    ticker, ini, f, ancora = plano
+    if not ancora.empty:
+        dia = ancora.index[0].normalize()
+        ini, f = min(ini, dia), max(f, dia)
+    return ticker, ini, f, intervalo
+
+
+def _ajuste_mudou(ancora, df):
+    if ancora.empty or df is None or df.empty:
+        return False
+    df = _normalizar(df)
+    momento = ancora.index[0]
+    if momento not in df.index:
+        return False
+    novo = df.loc[momento, list(ancora.columns)].values.astype(float)
+    return not np.allclose(novo, ancora.iloc[0].values, rtol=TOLERANCIA_AJUSTE, atol=0,
+                           equal_nan=True)
+
+
+def _rebaixar(ticker, ini, f, intervalo):
+    """Provento ou desdobramento novo: baixa de novo tudo o que estava coberto."""
+    faixas = _ler_cobertura(ticker, intervalo) + [(ini, f)]
+    inicio = min(a for a, _ in faixas)
+    fim = max(b for _, b in faixas)
+    df = historico(ticker, inicio, fim, intervalo)
+
+    with _trava(ticker, intervalo):
+        shutil.rmtree(_dir_ticker(ticker, intervalo))
+    _registrar(ticker, inicio, fim, df, intervalo)
+
+
+def _baixar(pedido):
+    try:
+        return historico(*pedido)
+    except ErroBusca as e:
+        return e
+
+
+def _concluir(plano, resposta, intervalo):
+    """Grava a resposta do trecho; devolve o erro a repassar, se houver."""
+    ticker, ini, f, ancora = plano
+    if isinstance(resposta, Exception):
+        if (getattr(resposta, "status", None) in STATUS_SEM_DADOS
+                and _antes_da_listagem(ticker, f, intervalo)):
+            _cobrir(ticker, ini, f, intervalo)
+            return None
+        return resposta
+
+    if _ajuste_mudou(ancora, resposta):
+        _rebaixar(ticker, ini, f, intervalo)
+    else:
+        _registrar(ticker, ini, f, resposta, intervalo)
+    return None
+
+
+def obter(ticker, inicio, fim, intervalo="1d", colunas=None):
+    """Lê do armazém, baixando antes só os trechos ainda não cobertos."""
+    for plano in _planejar(ticker, inicio, fim, intervalo):
+        erro = _concluir(plano, _baixar(_pedido(plano, intervalo)), intervalo)
+        if erro is not None:
+            raise erro
+
+    return ler(ticker, inicio, fim, intervalo, colunas)
+
+
+def obter_varios(tickers, inicio, fim, intervalo="1d", colunas=None):
+    """Como ``obter``, mas os trechos faltantes de todos os tickers são baixados em paralelo."""
+    tickers = list(dict.fromkeys(tickers))
+    planos = [p for t in tickers for p in _planejar(t, inicio, fim, intervalo)]
+
+    erros = []
+    for plano, resposta in zip(planos, historicos([_pedido(p, intervalo) for p in planos])):
+        erro = _concluir(plano, resposta, intervalo)
+        if erro is not None:
+            erros.append(erro)
+
+    # o que deu certo já ficou gravado; a falha é repassada a quem chamou
+    if erros:
+        raise erros[0]
+
+    return {t: ler(t, inicio, fim, intervalo, colunas) for t in tickers}
+
+
+def fechamentos(ticker, inicio, fim):
+    """Fechamento diário ajustado (proventos e desdobramentos) entre as datas, via armazém.
+
+    Mesmo critério do ``yf.download`` padrão (auto_adjust=True): a queda da
+    ação na data ex não aparece como perda. A série mantém o nome "Close".
+    """
+    df = obter(ticker, inicio, fim, colunas=(COLUNA_AJUSTADA,))
+    return df[COLUNA_AJUSTADA].dropna().rename("Close")
@@ -1,18 +1,34 @@
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-import itertools
 import math
 import os
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
 
-plt.rcParams.update({'figure.max_open_warning': 0})
+from armazem_precos import fechamentos
+from calendario_b3 import inicio_janela
+from interface import (
+    abrir_janela, configurar_matplotlib, criar_figura_interativa, exibir_figura
+)
+from modelos_pdf import Relatorio, capa, modelo_figura
+from covariancia import (
+    METODOS, estimar_covariancia, matriz_covariancia, variancia_carteiras
+)
+from kernels import avaliar_grade
+from painel import POLITICAS_INTERFACE, montar_painel
+from estresse import colunas_estresse, retornos_cenarios
+from metricas_risco import es_carteiras
+from alocadores import tabela_alocadores
+from graficos import conectar_dicas, conectar_laco, dispersao_lod
+from snapshot import estatisticas_do_snapshot, retornos_do_snapshot
+from pipeline import PipelineCarteira
+
+configurar_matplotlib()
 
 # =========================
 # CONSTANTES
@@ -28,6 +44,8 @@ A4_PORTRAIT = (8.27, 11.69)
 Z_SCORE = 1.65
 PESO_MIN = 0.05
 
+TITULO_CAPA = "Relatório de alocação eficiente de carteira"
+
 COR_CABECALHO = "#1f4e79"
 COR_LINHA = "#ddebf7"
 COR_TEXTO = "#000000"
@@ -36,15 +54,12 @@ COR_TEXTO = "#000000"
 # DOWNLOAD DE DADOS
 # =========================
 def baixar_dados(ticker, data_ref, n):
-    inicio = data_ref - timedelta(days=n * 4)
-    fim = data_ref + timedelta(days=1)
+    inicio = inicio_janela(data_ref, n)
 
-    df = yf.download(ticker, start=inicio, end=fim, progress=False)
+    df = fechamentos(ticker, inicio, data_ref).to_frame()
     if df.empty:
         return None
 
-    df = df[['Close']].dropna()
-    df = df[df.index <= pd.to_datetime(data_ref)]
     return df.tail(n)
 
 # =========================
@@ -57,6 +72,11 @@ def analisar(ticker_raw, data_str, n):
 
     data_ref = datetime.strptime(data_str, "%d/%m/%Y")
 
+    # janela já calculada pela pré-carga: dispensa download e preparo
+    df = retornos_do_snapshot(ticker, data_ref, n)
+    if df is not None:
+        return df, ticker.replace(".SA", "")
+
     acao = baixar_dados(ticker, data_ref, n)
     ibov = baixar_dados("^BVSP", data_ref, n)
 
@@ -72,47 +92,30 @@ def analisar(ticker_raw, data_str, n):
 
     return df, ticker.replace(".SA", "")
 
-# =========================
-# GERADOR DE PESOS
-# =========================
-def gerar_pesos(n_ativos, passo):
-    total = int(1 / passo)
-    minimo = int(PESO_MIN / passo)
-    restante = total - minimo * n_ativos
-
-    if restante < 0:
-        raise ValueError("Incremento incompatível com o número de ativos.")
-
-    combinacoes = set()
-
-    for divisao in itertools.combinations_with_replacement(range(restante + 1), n_ativos):
-        if sum(divisao) == restante:
-            base = [minimo + d for d in divisao]
-            for perm in set(itertools.permutations(base)):
-                combinacoes.add(tuple(p / total for p in perm))
-
-    return np.array(sorted(combinacoes))
+def estatisticas_snapshot(nomes, data_str, n):
+    # carteira toda na pré-carga: médias e covariância também vêm prontas
+    return estatisticas_do_snapshot(nomes, datetime.strptime(data_str, "%d/%m/%Y"), n)
 
 # =========================
 # VAR E RETORNOS
 # =========================
-def montar_df_retorno(resultados):
-    retornos = []
-    nomes = []
-
-    for df, ticker in resultados:
-        retornos.append(df['ret_acao'])
-        nomes.append(ticker)
+def painel_retornos(resultados, politica="descartar"):
+    # o Ibovespa entra uma única vez, como benchmark do painel
+    return montar_painel(
+        [df['ret_acao'] for df, _ in resultados],
+        [ticker for _, ticker in resultados],
+        benchmark=resultados[0][0]['ret_ibov'],
+        politica=politica
+    )
 
-    df_ret = pd.concat(retornos, axis=1)
-    df_ret.columns = nomes
-    return df_ret.dropna()
+def montar_df_retorno(resultados, politica="descartar"):
+    return painel_retornos(resultados, politica).retornos()
 
-def calcular_var_carteira(retornos, pesos, aporte_total):
-    cov = retornos.cov().values
+def calcular_var_carteira(retornos, pesos, aporte_total, metodo="amostral", ret_mercado=None):
+    estimativa = estimar_covariancia(retornos, metodo, ret_mercado)
     media = retornos.mean().values
 
-    vol = math.sqrt(pesos @ cov @ pesos)
+    vol = math.sqrt(variancia_carteiras(pesos, estimativa))
     var_pct = media @ pesos - Z_SCORE * vol
     var_rs = abs(var_pct) * aporte_total
 
@@ -133,91 +136,128 @@ def simular_montante(df, aporte_mensal, meses, capital_inicial):
 # =========================
 # TABELA FINAL
 # =========================
-def tabela_var_combinacoes(resultados, passo, aporte_total, aporte_mensal):
-    retornos = montar_df_retorno(resultados)
-    n = retornos.shape[1]
-    meses = int(len(retornos) / 21)
+def montar_tabela(nomes, media, estimativa, montantes, passo, aporte_total, retornos=None):
+    n = len(nomes)
+
+    # o montante de cada ticker é linear no peso (ver simular_montante);
+    # retorno, volatilidade e montante saem do kernel, carteira a carteira,
+    # e os pesos (colunas, ES e estresse) na mesma passada pela grade
+    retorno, vol, montante_final, pesos_lista = avaliar_grade(
+        media, estimativa, passo, PESO_MIN, montantes, com_pesos=True
+    )
+    var_pct = retorno - Z_SCORE * vol
+    var_rs = np.abs(var_pct) * aporte_total
 
-    pesos_lista = gerar_pesos(n, passo)
-    linhas = []
+    colunas = {f"Peso {nomes[i]} (%)": pesos_lista[:, i] * 100 for i in range(n)}
+    colunas["VaR %"] = var_pct * 100
+    colunas["VaR R$"] = var_rs
+    colunas["Montante Final (R$)"] = montante_final
 
-    for pesos in pesos_lista:
-        var_pct, var_rs = calcular_var_carteira(retornos, pesos, aporte_total)
+    if retornos is not None:
+        # ES histórico (95%, como o VaR) sobre a matriz de retornos das carteiras
+        es = es_carteiras(pesos_lista, retornos)
+        colunas["ES %"] = es * 100
+        colunas["ES R$"] = np.abs(es) * aporte_total
 
-        montante_final = 0
-        for (df, _), peso in zip(resultados, pesos):
-            capital_inicial = aporte_total * peso
-            montante_final += simular_montante(
-                df,
-                aporte_mensal * peso,
-                meses,
-                capital_inicial
-            )
+    # replay das crises históricas sobre todas as carteiras
+    colunas.update(colunas_estresse(pesos_lista, retornos_cenarios(nomes)))
 
-        linha = {f"Peso {retornos.columns[i]} (%)": pesos[i] * 100 for i in range(n)}
-        linha["VaR %"] = var_pct
-        linha["VaR R$"] = var_rs
-        linha["Montante Final (R$)"] = montante_final
+    return pd.DataFrame(colunas).sort_values("VaR %").reset_index(drop=True)
 
-        linhas.append(linha)
+def tabela_var_combinacoes(resultados, passo, aporte_total, aporte_mensal, metodo="amostral",
+                           estatisticas=None, politica="descartar"):
+    painel = painel_retornos(resultados, politica)
+    retornos = painel.retornos()
+    meses = int(len(retornos) / 21)
 
-    return pd.DataFrame(linhas).sort_values("VaR %").reset_index(drop=True)
+    montantes = np.array([
+        simular_montante(df, aporte_mensal, meses, aporte_total)
+        for df, _ in resultados
+    ])
+
+    ret_mercado = None
+    if metodo == "indice":
+        ret_mercado = painel.benchmark
+
+    # médias e covariância amostral do snapshot, quando há (ver estatisticas_snapshot);
+    # o snapshot só tem as datas completas, isto é, a política "descartar"
+    if metodo == "amostral" and estatisticas is not None and politica == "descartar":
+        media, estimativa = estatisticas
+    else:
+        media = retornos.mean().values
+        estimativa = estimar_covariancia(retornos, metodo, ret_mercado)
+
+    return montar_tabela(
+        list(retornos.columns),
+        media,
+        estimativa,
+        montantes,
+        passo,
+        aporte_total,
+        retornos.values
+    )
 
 # =========================
 # GRÁFICO INTERATIVO
 # =========================
-def mostrar_grafico_interativo(tabela):
-    fig, ax = plt.subplots(figsize=(10, 6))
+def mostrar_grafico_interativo(tabela, master=None, alocacoes=None):
+    fig, ax = criar_figura_interativa(master, "Risco x Retorno", figsize=(10, 6))
 
-    ax.scatter(
+    # acima de LIMIAR_LOD carteiras vira densidade + fronteira de Pareto + amostra
+    dispersao_lod(
+        ax,
         tabela["VaR %"],
         tabela["Montante Final (R$)"],
         s=40,
-        picker=True
+        cor="C0"
     )
 
+    # alocadores sem grade, ao lado das carteiras da grade
+    if alocacoes is not None:
+        for (rotulo, linha), marcador in zip(alocacoes.iterrows(), ("D", "P")):
+            ax.scatter(linha["VaR %"], linha["Montante Final (R$)"], s=90,
+                       marker=marcador, color="darkorange", zorder=5, label=rotulo)
+        ax.legend()
+
     ax.invert_xaxis()
     ax.set_xlabel("VaR % (Risco)")
     ax.set_ylabel("Montante Final (R$)")
     ax.set_title("Risco x Retorno – Carteiras Simuladas")
     ax.grid(True, linestyle="--", alpha=0.4)
 
-    anotacao = ax.annotate(
-        "",
-        xy=(0, 0),
-        xytext=(10, 10),
-        textcoords="offset points",
-        bbox=dict(boxstyle="round", fc="w"),
-        arrowprops=dict(arrowstyle="->")
-    )
-    anotacao.set_visible(False)
-
-    def on_pick(event):
-        ind = event.ind[0]
-        linha = tabela.iloc[ind]
-
-        x = linha["VaR %"]
-        y = linha["Montante Final (R$)"]
+    x = tabela["VaR %"].values
+    y = tabela["Montante Final (R$)"].values
+    pesos_cols = [c for c in tabela.columns if c.startswith("Peso")]
+    pesos = tabela[pesos_cols].values
 
+    def descrever(i):
         pesos_txt = ""
-        for col in tabela.columns:
-            if col.startswith("Peso"):
-                ativo = col.replace("Peso ", "").replace(" (%)", "")
-                pesos_txt += f"{ativo}: {linha[col]:.1f}%\n"
-
-        anotacao.xy = (x, y)
-        anotacao.set_text(
-            f"VaR %: {x:.2f}\n"
-            f"Montante: R$ {y:,.2f}\n\n"
+        for col, peso in zip(pesos_cols, pesos[i]):
+            ativo = col.replace("Peso ", "").replace(" (%)", "")
+            pesos_txt += f"{ativo}: {peso:.1f}%\n"
+
+        return (
+            f"VaR %: {x[i]:.2f}\n"
+            f"Montante: R$ {y[i]:,.2f}\n\n"
             f"Composição:\n{pesos_txt}"
         )
-        anotacao.set_visible(True)
-        fig.canvas.draw_idle()
 
-    fig.canvas.mpl_connect("pick_event", on_pick)
+    # dica e laço localizam as carteiras pelo índice espacial
+    indice = conectar_dicas(fig, ax, x, y, descrever)
+
+    def ao_selecionar(idx):
+        if len(idx) == 0:
+            ax.set_title("Risco x Retorno – Carteiras Simuladas")
+            return
+        ax.set_title(
+            f"{len(idx)} carteiras selecionadas – VaR % de {x[idx].min():.2f} "
+            f"a {x[idx].max():.2f} – Montante até R$ {y[idx].max():,.2f}",
+            fontsize=10
+        )
+
+    conectar_laco(fig, ax, x, y, ao_selecionar, indice)
 
     # carteira atual (já existente)
-    pesos_cols = [c for c in tabela.columns if c.startswith("Peso")]
     pesos_usuario = []
 
     for col in pesos_cols:
@@ -225,20 +265,21 @@ def mostrar_grafico_interativo(tabela):
             "Carteira Atual",
             f"Informe o {col}:",
             minvalue=0,
-            maxvalue=100
+            maxvalue=100,
+            parent=master
         )
         if val is None:
             break
         pesos_usuario.append(val)
 
     if len(pesos_usuario) == len(pesos_cols):
-        pesos_usuario = np.array(pesos_usuario)
-        base = tabela[pesos_cols].values
-        dist = np.linalg.norm(base - pesos_usuario, axis=1)
-        idx = np.argmin(dist)
+        # carteira da grade mais próxima dos pesos informados (consulta única:
+        # uma varredura custa menos que montar um índice)
+        dist = np.linalg.norm(pesos - np.array(pesos_usuario), axis=1)
+        idx = int(np.argmin(dist))
 
-        x_u = tabela.iloc[idx]["VaR %"]
-        y_u = tabela.iloc[idx]["Montante Final (R$)"]
+        x_u = x[idx]
+        y_u = y[idx]
 
         ax.scatter(x_u, y_u, s=120, marker="*", zorder=5)
         ax.annotate(
@@ -250,14 +291,41 @@ def mostrar_grafico_interativo(tabela):
             weight="bold"
         )
 
-    plt.show()
+    exibir_figura(fig)
+
+# =========================
+# ALOCADORES SEM GRADE
+# =========================
+def desenhar_alocacoes(pdf, alocacoes):
+    fig, ax = modelo_figura("tabela", A4_LANDSCAPE, RODAPE, y_rodape=0.03).nova()
+    ax.axis("off")
+    ax.set_title("Alocações sem grade – Paridade de risco e HRP", fontsize=14, weight="bold")
+
+    table = ax.table(
+        cellText=np.round(alocacoes.values, 2),
+        rowLabels=alocacoes.index,
+        colLabels=alocacoes.columns,
+        loc="center",
+        cellLoc="center"
+    )
+    table.scale(1, 1.5)
+
+    for (row, col), cell in table.get_celld().items():
+        if row == 0 or col == -1:
+            cell.set_facecolor(COR_CABECALHO)
+            cell.set_text_props(color="white", weight="bold")
+        else:
+            cell.set_facecolor(COR_LINHA)
+            cell.set_text_props(color=COR_TEXTO)
+
+    pdf.savefig(fig)
 
 # =========================
 # INTERFACE
 # =========================
 class App:
 
-    def exportar_pdf(self, tabela):
+    def exportar_pdf(self, tabela, alocacoes=None):
         self.caminho_pdf = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF", "*.pdf")]
@@ -267,33 +335,24 @@ class App:
 
         linhas_por_pagina = 20
 
-        with PdfPages(self.caminho_pdf) as pdf:
-
-            fig, ax = plt.subplots(figsize=A4_PORTRAIT)
-            ax.axis("off")
+        with Relatorio(self.caminho_pdf) as pdf:
 
-            ax.text(0.5, 0.60,
-                    "Relatório de alocação eficiente de carteira",
-                    fontsize=23, color="lightblue",
-                    ha="center", va="center", weight="bold")
+            pdf.savefig(capa(TITULO_CAPA, RODAPE, A4_PORTRAIT).renderizar(
+                f"Data final da análise: {self.data.get()}\n"
+                f"Janela considerada: {self.n.get()} pregões"
+            ))
 
-            ax.text(0.5, 0.52,
-                    f"Data final da análise: {self.data.get()}\n"
-                    f"Janela considerada: {self.n.get()} pregões",
-                    fontsize=14, ha="center", va="center", color="gray")
+            if alocacoes is not None:
+                desenhar_alocacoes(pdf, alocacoes)
 
-            ax.text(0.5, 0.06, RODAPE,
-                    fontsize=9, color="gray", ha="center")
-
-            pdf.savefig(fig)
-            plt.close(fig)
-
-            fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-            ax.scatter(
+            fig = Figure(figsize=A4_LANDSCAPE)
+            ax = fig.add_subplot()
+            dispersao_lod(
+                ax,
                 tabela["VaR %"],
                 tabela["Montante Final (R$)"],
                 s=60,
-                color="darkblue"
+                cor="darkblue"
             )
             ax.invert_xaxis()
             ax.set_xlabel("VaR % (Risco)")
@@ -304,12 +363,13 @@ class App:
                     fontsize=8, color="gray",
                     ha="center", transform=ax.transAxes)
             pdf.savefig(fig)
-            plt.close(fig)
+
+            pagina_tabela = modelo_figura("tabela", A4_LANDSCAPE, RODAPE, y_rodape=0.03)
 
             for i in range(0, len(tabela), linhas_por_pagina):
                 fatia = tabela.iloc[i:i + linhas_por_pagina]
 
-                fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
+                fig, ax = pagina_tabela.nova()
                 ax.axis("off")
 
                 table = ax.table(
@@ -329,12 +389,7 @@ class App:
                         cell.set_facecolor(COR_LINHA)
                         cell.set_text_props(color=COR_TEXTO)
 
-                ax.text(0.5, 0.03, RODAPE,
-                        fontsize=8, color="gray",
-                        ha="center", transform=ax.transAxes)
-
                 pdf.savefig(fig)
-                plt.close(fig)
 
     def __init__(self, root):
         self.root = root
@@ -342,6 +397,10 @@ class App:
         self.inputs = []
         self.resultados = []
         self.caminho_pdf = None
+        self.alocacoes = None
+        self.pipeline = PipelineCarteira(
+            analisar, simular_montante, estatisticas=estatisticas_snapshot
+        )
 
         self.root.protocol("WM_DELETE_WINDOW", self.root.destroy)
         self._build()
@@ -375,6 +434,20 @@ class App:
         self.incremento.insert(0, "5")
         self.incremento.grid(row=4, column=1)
 
+        ttk.Label(frame, text="Covariância").grid(row=4, column=2, padx=(10, 0))
+        self.metodo_cov = ttk.Combobox(
+            frame, values=list(METODOS), state="readonly", width=22
+        )
+        self.metodo_cov.current(0)
+        self.metodo_cov.grid(row=4, column=3)
+
+        ttk.Label(frame, text="Dados faltantes").grid(row=3, column=2, padx=(10, 0))
+        self.politica = ttk.Combobox(
+            frame, values=list(POLITICAS_INTERFACE), state="readonly", width=22
+        )
+        self.politica.current(0)
+        self.politica.grid(row=3, column=3)
+
         self.frame_tickers = ttk.LabelFrame(frame, text="Ações")
         self.frame_tickers.grid(row=5, column=0, columnspan=3, pady=10)
 
@@ -421,33 +494,56 @@ class App:
 
     def _thread(self):
         try:
-            self.resultados.clear()
-
             passo = float(self.incremento.get()) / 100
             aporte_total = float(self.aporte_total.get())
             aporte_mensal = float(self.aporte_mensal.get())
 
-            for t in self.inputs:
-                df, ticker = analisar(t.get(), self.data.get(), int(self.n.get()))
-                self.resultados.append((df, ticker))
+            # outra política muda o calendário comum: recomeça o pipeline
+            politica = POLITICAS_INTERFACE[self.politica.get()]
+            if politica != self.pipeline.politica:
+                self.pipeline = PipelineCarteira(
+                    analisar, simular_montante, politica, estatisticas_snapshot
+                )
 
-            self.tabela = tabela_var_combinacoes(
-                self.resultados, passo, aporte_total, aporte_mensal
+            # só baixa/recalcula o que mudou desde a última exportação
+            self.resultados = self.pipeline.atualizar(
+                [t.get() for t in self.inputs],
+                self.data.get(),
+                int(self.n.get())
             )
 
-            self.exportar_pdf(self.tabela)
+            metodo = METODOS[self.metodo_cov.get()]
+            self.tabela = self.pipeline.tabela_combinacoes(
+                montar_tabela, passo, aporte_total, aporte_mensal, metodo
+            )
 
-            messagebox.showinfo(
-                "Sucesso",
-                f"Relatório gerado com {len(self.tabela)} combinações!"
+            # paridade de risco e HRP sobre a mesma covariância da grade
+            self.alocacoes = tabela_alocadores(
+                self.pipeline.nomes(),
+                self.pipeline.media(),
+                matriz_covariancia(self.pipeline.estimativa(metodo)),
+                aporte_total,
+                Z_SCORE,
+                self.pipeline.montantes(aporte_total, aporte_mensal)
             )
 
+            self.exportar_pdf(self.tabela, self.alocacoes)
+
+            mensagem = f"Relatório gerado com {len(self.tabela)} combinações!"
+            descartadas = len(self.pipeline.datas_descartadas)
+            if descartadas:
+                mensagem += f"\n{descartadas} data(s) sem cotação de todos os tickers foram descartadas."
+
+            messagebox.showinfo("Sucesso", mensagem)
+
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
     def abrir_grafico(self):
         if hasattr(self, "tabela"):
-            mostrar_grafico_interativo(self.tabela)
+            mostrar_grafico_interativo(
+                self.tabela, master=self.root, alocacoes=self.alocacoes
+            )
         else:
             messagebox.showwarning("Aviso", "Execute a simulação antes.")
 
@@ -460,12 +556,9 @@ class App:
 # =========================
 # MAIN
 # =========================
+def main(master=None):
+    return abrir_janela(App, master)
+
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
-
-def main():
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
\ No newline at end of file
+    main()
@@ -0,0 +1,363 @@
+import asyncio
+import gzip
+import json
+import os
+import random
+import ssl
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+# =========================
+# CONFIGURAÇÃO
+# =========================
+# endpoint "chart" (v8) do Yahoo Finance; apontável para um servidor local em testes
+URL_BASE = os.environ.get("ZECAAI_URL_COTACOES", "https://query1.finance.yahoo.com")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) ZecaAI"
+
+TAXA_POR_HOST = 4.0      # requisições por segundo
+RAJADA = 8               # requisições seguidas permitidas antes de limitar
+MAX_CONEXOES = 6         # conexões simultâneas por host
+TENTATIVAS = 4
+ESPERA_BASE = 0.5        # segundos; dobra a cada nova tentativa
+TIMEOUT = 20             # segundos por tentativa
+
+STATUS_TRANSITORIOS = {408, 425, 429, 500, 502, 503, 504}
+
+INTERVALOS_INTRADAY = ("1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h")
+
+
+class ErroBusca(Exception):
+    """Falha definitiva ao buscar cotações (já esgotadas as novas tentativas)."""
+
+    def __init__(self, mensagem, status=None):
+        super().__init__(mensagem)
+        self.status = status
+
+
+class _ErroTransitorio(Exception):
+    def __init__(self, mensagem, espera=None):
+        super().__init__(mensagem)
+        self.espera = espera
+
+
+# =========================
+# LIMITE DE TAXA (balde de fichas)
+# =========================
+class LimiteTaxa:
+    def __init__(self, taxa, rajada):
+        self.taxa = taxa
+        self.rajada = rajada
+        self.fichas = float(rajada)
+        self.ultimo = time.monotonic()
+        self.trava = asyncio.Lock()
+
+    async def aguardar(self):
+        async with self.trava:
+            while True:
+                agora = time.monotonic()
+                self.fichas = min(self.rajada, self.fichas + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                await asyncio.sleep((1 - self.fichas) / self.taxa)
+
+
+# =========================
+# POOL DE CONEXÕES (HTTP/1.1 keep-alive)
+# =========================
+class PoolConexoes:
+    def __init__(self, max_por_host):
+        self.max_por_host = max_por_host
+        self.livres = {}
+        self.limites = {}
+
+    def limite(self, destino):
+        if destino not in self.limites:
+            self.limites[destino] = asyncio.Semaphore(self.max_por_host)
+        return self.limites[destino]
+
+    async def abrir(self, destino):
+        livres = self.livres.get(destino, [])
+        while livres:
+            reader, writer = livres.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+
+        host, porta, tls = destino
+        contexto = ssl.create_default_context() if tls else None
+        return await asyncio.open_connection(host, porta, ssl=contexto)
+
+    def devolver(self, destino, conexao):
+        self.livres.setdefault(destino, []).append(conexao)
+
+    @staticmethod
+    def descartar(conexao):
+        conexao[1].close()
+
+    def fechar(self):
+        for conexoes in self.livres.values():
+            for conexao in conexoes:
+                self.descartar(conexao)
+        self.livres.clear()
+
+
+async def _ler_corpo(reader, cabecalhos):
+    if cabecalhos.get("transfer-encoding", "").lower() == "chunked":
+        partes = []
+        while True:
+            tamanho = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if tamanho == 0:
+                # trailers até a linha vazia
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(partes), True
+            partes.append(await reader.readexactly(tamanho))
+            await reader.readexactly(2)
+
+    if "content-length" in cabecalhos:
+        return await reader.readexactly(int(cabecalhos["content-length"])), True
+
+    # sem tamanho declarado: corpo vai até o servidor fechar a conexão
+    return await reader.read(), False
+
+
+def _detalhe_erro(corpo):
+    # o Yahoo devolve a causa (ticker inexistente etc.) no próprio JSON
+    try:
+        erro = json.loads(corpo)["chart"]["error"]
+        return f" ({erro.get('description') or erro.get('code')})"
+    except (ValueError, KeyError, TypeError):
+        return ""
+
+
+# =========================
+# BUSCADOR
+# =========================
+class BuscadorAssincrono:
+    """Cliente HTTP assíncrono com pool, limite por host, novas tentativas e coalescência.
+
+    Requisições simultâneas para a mesma URL compartilham uma única busca.
+    """
+
+    def __init__(self, base_url=URL_BASE, taxa=TAXA_POR_HOST, rajada=RAJADA,
+                 max_conexoes=MAX_CONEXOES, tentativas=TENTATIVAS,
+                 espera_base=ESPERA_BASE, timeout=TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.taxa = taxa
+        self.rajada = rajada
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.timeout = timeout
+
+        self.pool = PoolConexoes(max_conexoes)
+        self.limites_taxa = {}
+        self.em_andamento = {}
+        self.requisicoes = 0
+
+    # ---------- HTTP ----------
+    async def obter_json(self, caminho, params=None):
+        url = self.base_url + caminho
+        if params:
+            url += "?" + urlencode(sorted(params.items()))
+
+        tarefa = self.em_andamento.get(url)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(self._com_tentativas(url))
+            self.em_andamento[url] = tarefa
+            tarefa.add_done_callback(lambda _: self.em_andamento.pop(url, None))
+
+        # shield: quem desistir de esperar não cancela a busca dos demais
+        return await asyncio.shield(tarefa)
+
+    async def _com_tentativas(self, url):
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            try:
+                return await asyncio.wait_for(self._requisitar(url), self.timeout)
+            except (_ErroTransitorio, OSError, asyncio.TimeoutError,
+                    asyncio.IncompleteReadError) as e:
+                ultimo_erro = e
+                if tentativa + 1 == self.tentativas:
+                    break
+                espera = getattr(e, "espera", None)
+                if espera is None:
+                    espera = self.espera_base * 2 ** tentativa * (1 + random.random() / 2)
+                await asyncio.sleep(espera)
+
+        raise ErroBusca(
+            f"Falha ao buscar {url} após {self.tentativas} tentativas: {ultimo_erro or 'timeout'}"
+        )
+
+    async def _requisitar(self, url):
+        partes = urlsplit(url)
+        tls = partes.scheme == "https"
+        destino = (partes.hostname, partes.port or (443 if tls else 80), tls)
+        alvo = partes.path + (f"?{partes.query}" if partes.query else "")
+
+        if destino not in self.limites_taxa:
+            self.limites_taxa[destino] = LimiteTaxa(self.taxa, self.rajada)
+        await self.limites_taxa[destino].aguardar()
+
+        async with self.pool.limite(destino):
+            conexao = await self.pool.abrir(destino)
+            try:
+                status, cabecalhos, corpo, reutilizavel = await self._trocar(
+                    conexao, partes.netloc, alvo
+                )
+            except BaseException:
+                self.pool.descartar(conexao)
+                raise
+
+            if reutilizavel and cabecalhos.get("connection", "").lower() != "close":
+                self.pool.devolver(destino, conexao)
+            else:
+                self.pool.descartar(conexao)
+
+        self.requisicoes += 1
+
+        if status in STATUS_TRANSITORIOS:
+            espera = cabecalhos.get("retry-after")
+            raise _ErroTransitorio(
+                f"HTTP {status}",
+                float(espera) if espera and espera.isdigit() else None
+            )
+        if cabecalhos.get("content-encoding", "").lower() == "gzip":
+            corpo = gzip.decompress(corpo)
+
+        if status >= 400:
+            raise ErroBusca(f"HTTP {status} ao buscar {url}{_detalhe_erro(corpo)}", status)
+
+        try:
+            return json.loads(corpo)
+        except ValueError as e:
+            # 200 com página HTML (consentimento, "crumb") em vez de JSON
+            raise ErroBusca(f"Resposta inválida de {url}: {e}", status) from e
+
+    async def _trocar(self, conexao, host, alvo):
+        reader, writer = conexao
+        pedido = (
+            f"GET {alvo} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            f"User-Agent: {USER_AGENT}\r\n"
+            "Accept: application/json\r\n"
+            "Accept-Encoding: gzip\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        writer.write(pedido.encode("ascii"))
+        await writer.drain()
+
+        linha = await reader.readline()
+        if not linha:
+            # conexão ociosa fechada pelo servidor
+            raise _ErroTransitorio("conexão encerrada pelo servidor")
+        status = int(linha.split()[1])
+
+        cabecalhos = {}
+        while True:
+            linha = await reader.readline()
+            if linha in (b"\r\n", b"\n", b""):
+                break
+            nome, _, valor = linha.decode("latin-1").partition(":")
+            cabecalhos[nome.strip().lower()] = valor.strip()
+
+        corpo, reutilizavel = await _ler_corpo(reader, cabecalhos)
+        return status, cabecalhos, corpo, reutilizavel
+
+    # ---------- COTAÇÕES ----------
+    async def historico(self, ticker, inicio, fim, intervalo="1d"):
+        """Barras OHLCV de [inicio, fim] (datas, inclusive) no formato do yfinance."""
+        inicio = pd.Timestamp(inicio).normalize()
+        fim = pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+
+        dados = await self.obter_json(f"/v8/finance/chart/{ticker}", {
+            "period1": int(inicio.tz_localize("UTC").timestamp()),
+            "period2": int(fim.tz_localize("UTC").timestamp()),
+            "interval": intervalo,
+            "includePrePost": "false",
+        })
+        return quadro_chart(dados, ticker, intervalo)
+
+    async def historicos(self, pedidos):
+        """Vários ``(ticker, inicio, fim, intervalo)`` em paralelo; erros voltam na lista."""
+        return await asyncio.gather(
+            *(self.historico(*p) for p in pedidos), return_exceptions=True
+        )
+
+    def fechar(self):
+        self.pool.fechar()
+
+
+def quadro_chart(dados, ticker, intervalo="1d"):
+    """Converte a resposta JSON do endpoint chart num DataFrame OHLCV."""
+    chart = dados.get("chart") or {}
+    if chart.get("error"):
+        erro = chart["error"]
+        raise ErroBusca(f"{ticker}: {erro.get('description') or erro.get('code')}")
+
+    resultado = (chart.get("result") or [None])[0]
+    colunas = ["Open", "High", "Low", "Close", "Adj Close", "Volume"]
+    if not resultado or not resultado.get("timestamp"):
+        return pd.DataFrame(columns=colunas)
+
+    fuso = resultado.get("meta", {}).get("exchangeTimezoneName", "America/Sao_Paulo")
+    indice = pd.to_datetime(resultado["timestamp"], unit="s", utc=True).tz_convert(fuso)
+    if intervalo not in INTERVALOS_INTRADAY:
+        indice = indice.tz_localize(None).normalize()
+
+    cotacoes = resultado["indicators"]["quote"][0]
+    df = pd.DataFrame({
+        "Open": cotacoes.get("open"),
+        "High": cotacoes.get("high"),
+        "Low": cotacoes.get("low"),
+        "Close": cotacoes.get("close"),
+        "Volume": cotacoes.get("volume"),
+    }, index=indice, dtype=float)
+
+    ajustado = resultado["indicators"].get("adjclose")
+    df["Adj Close"] = ajustado[0]["adjclose"] if ajustado else df["Close"]
+
+    # barras sem negócio vêm com tudo nulo
+    return df[colunas].dropna(subset=["Close"])
+
+
+# =========================
+# USO A PARTIR DE CÓDIGO SÍNCRONO
+# =========================
+# Um único laço de eventos em segundo plano, compartilhado pelas threads da
+# interface: assim o pool, o limite de taxa e a coalescência valem para todas.
+_laco = None
+_buscador = None
+_trava = threading.Lock()
+
+
+def _laco_de_fundo():
+    global _laco, _buscador
+    with _trava:
+        if _laco is None:
+            _laco = asyncio.new_event_loop()
+            threading.Thread(
+                target=_laco.run_forever, name="busca-cotacoes", daemon=True
+            ).start()
+            _buscador = BuscadorAssincrono()
+        return _laco
+
+
+def executar(corrotina):
+    """Roda a corrotina no laço de fundo e espera o resultado."""
+    return asyncio.run_coroutine_threadsafe(corrotina, _laco_de_fundo()).result()
+
+
+def historico(ticker, inicio, fim, intervalo="1d"):
+    _laco_de_fundo()
+    return executar(_buscador.historico(ticker, inicio, fim, intervalo))
+
+
+def historicos(pedidos):
+    _laco_de_fundo()
+    return executar(_buscador.historicos(pedidos))
@@ -0,0 +1,206 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from caminhos import diretorio_cache
+
+# =========================
+# CACHE DE RESULTADOS EM DISCO
+# =========================
+# Endereçado por conteúdo: a chave é um hash dos dados de entrada (painel de
+# retornos) e dos parâmetros. Mesmos dados e parâmetros dão a mesma chave,
+# então a tabela (e o PDF gerado a partir dela) pode ser reaproveitada.
+#   resultados/<chave>.pkl   tabela (DataFrame)
+#   resultados/<chave>.pdf   relatório
+# O mtime de cada arquivo marca o último uso; passando de LIMITE_BYTES os
+# arquivos usados há mais tempo são apagados (LRU). Cada gravação vai para um
+# temporário próprio e troca de uma vez: vários processos podem gravar a
+# mesma chave ao mesmo tempo.
+
+VERSAO = 1
+LIMITE_BYTES = int(os.environ.get("ZECAAI_CACHE_RESULTADOS_MB", "1024")) * 1024 ** 2
+
+
+def _atualizar(h, valor):
+    # tipo antes do conteúdo: 1 e "1" não podem colidir
+    h.update(type(valor).__name__.encode())
+
+    if isinstance(valor, pd.DataFrame):
+        _atualizar(h, list(map(str, valor.columns)))
+        _atualizar(h, valor.index.values)
+        _atualizar(h, valor.values)
+    elif isinstance(valor, (pd.Series, pd.Index)):
+        _atualizar(h, valor.index.values if isinstance(valor, pd.Series) else None)
+        _atualizar(h, valor.values)
+    elif isinstance(valor, np.ndarray):
+        if valor.dtype == object:
+            _atualizar(h, [str(v) for v in valor.ravel()])
+        else:
+            valor = np.ascontiguousarray(valor)
+            h.update(f"{valor.dtype.str}{valor.shape}".encode())
+            h.update(valor.tobytes())
+    elif isinstance(valor, (list, tuple)):
+        h.update(str(len(valor)).encode())
+        for item in valor:
+            _atualizar(h, item)
+    elif isinstance(valor, dict):
+        for k in sorted(valor):
+            _atualizar(h, k)
+            _atualizar(h, valor[k])
+    else:
+        h.update(repr(valor).encode())
+    h.update(b"|")
+
+
+def chave(*partes):
+    """Hash (hex) do conteúdo de arrays, quadros, listas e escalares."""
+    h = hashlib.sha256(str(VERSAO).encode())
+    for parte in partes:
+        _atualizar(h, parte)
+    return h.hexdigest()
+
+
+class CacheResultados:
+    def __init__(self, diretorio=None, limite_bytes=LIMITE_BYTES):
+        self.diretorio = diretorio or diretorio_cache("resultados")
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+
+    def _caminho(self, chave, extensao):
+        return os.path.join(self.diretorio, f"{chave}.{extensao}")
+
+    def _gravar(self, caminho, escrever):
+        descritor, temporario = tempfile.mkstemp(
+            dir=self.diretorio, prefix=os.path.basename(caminho) + ".", suffix=".tmp"
+        )
+        os.close(descritor)
+        try:
+            escrever(temporario)
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.remove(temporario)
+            raise
+
+    def _usar(self, caminho):
+        # acerto: o arquivo passa a ser o mais recente para o LRU
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+
+    def _contar(self, achou):
+        with self._trava:
+            if achou:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+    # =========================
+    # TABELAS
+    # =========================
+    def obter(self, chave):
+        """Tabela guardada sob a chave, ou None."""
+        caminho = self._caminho(chave, "pkl")
+        try:
+            tabela = pd.read_pickle(caminho)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            # ausente ou corrompido: conta como falha e é recalculado
+            self._contar(False)
+            return None
+
+        self._usar(caminho)
+        self._contar(True)
+        return tabela
+
+    def guardar(self, chave, tabela):
+        self._gravar(self._caminho(chave, "pkl"), tabela.to_pickle)
+        self.podar()
+
+    def memorizar(self, chave, calcular):
+        """Devolve a tabela da chave, calculando e guardando se não houver."""
+        tabela = self.obter(chave)
+        if tabela is None:
+            tabela = calcular()
+            self.guardar(chave, tabela)
+        return tabela
+
+    # =========================
+    # PDFs
+    # =========================
+    def copiar_pdf(self, chave, destino):
+        """Copia o PDF guardado para ``destino``; False se não houver."""
+        caminho = self._caminho(chave, "pdf")
+        if not os.path.exists(caminho):
+            self._contar(False)
+            return False
+
+        shutil.copyfile(caminho, destino)
+        self._usar(caminho)
+        self._contar(True)
+        return True
+
+    def guardar_pdf(self, chave, origem):
+        self._gravar(self._caminho(chave, "pdf"), lambda destino: shutil.copyfile(origem, destino))
+        self.podar()
+
+    # =========================
+    # LIMITE DE ESPAÇO E ESTATÍSTICAS
+    # =========================
+    def _arquivos(self):
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith(".tmp"):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+        return arquivos
+
+    def podar(self):
+        """Apaga os arquivos usados há mais tempo até caber em ``limite_bytes``."""
+        with self._trava:
+            arquivos = sorted(self._arquivos())
+            total = sum(tamanho for _, tamanho, _ in arquivos)
+
+            for _, tamanho, caminho in arquivos:
+                if total <= self.limite_bytes:
+                    break
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    continue
+                total -= tamanho
+
+    def estatisticas(self):
+        with self._trava:
+            arquivos = self._arquivos()
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+                "entradas": len(arquivos),
+                "bytes": sum(tamanho for _, tamanho, _ in arquivos),
+            }
+
+    def resumo(self):
+        """Texto curto para a interface."""
+        e = self.estatisticas()
+        return (
+            f"Cache: {e['acertos']} acertos / {e['falhas']} falhas "
+            f"({e['entradas']} arquivos, {e['bytes'] / 1024 ** 2:.1f} MB)"
+        )
+
+
+cache = CacheResultados()
@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# =========================
+# CALENDÁRIO DE PREGÕES DA B3
+# =========================
+# Feriados gerados por regra (sem consulta externa):
+#   - nacionais fixos e móveis (Carnaval, Sexta-feira Santa, Corpus Christi);
+#   - 24/12 e 31/12, dias sem pregão na B3;
+#   - até 2021 a bolsa também fechava nos feriados da cidade/estado de SP
+#     (25/01, 09/07 e 20/11); a Consciência Negra virou feriado nacional em 2024.
+# A quarta-feira de Cinzas tem pregão (abertura às 13h) e conta como dia útil.
+
+FIXOS = ((1, 1), (4, 21), (5, 1), (9, 7), (10, 12), (11, 2), (11, 15), (12, 25))
+SEM_PREGAO = ((12, 24), (12, 31))
+FERIADOS_SP = ((1, 25), (7, 9), (11, 20))
+
+ULTIMO_ANO_FERIADOS_SP = 2021
+INICIO_CONSCIENCIA_NEGRA = 2024
+
+ANO_MIN = 1995
+ANO_MAX = 2100
+
+
+def pascoa(ano):
+    """Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher)."""
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+@lru_cache(maxsize=None)
+def feriados(ano):
+    """Dias de semana sem pregão no ano (ordenados)."""
+    dias = {date(ano, m, d) for m, d in FIXOS + SEM_PREGAO}
+
+    if ano <= ULTIMO_ANO_FERIADOS_SP:
+        dias |= {date(ano, m, d) for m, d in FERIADOS_SP}
+    elif ano >= INICIO_CONSCIENCIA_NEGRA:
+        dias.add(date(ano, 11, 20))
+
+    p = pascoa(ano)
+    dias |= {
+        p - timedelta(days=48),   # segunda de Carnaval
+        p - timedelta(days=47),   # terça de Carnaval
+        p - timedelta(days=2),    # Sexta-feira Santa
+        p + timedelta(days=60),   # Corpus Christi
+    }
+
+    return tuple(sorted(d for d in dias if d.weekday() < 5))
+
+
+@lru_cache(maxsize=1)
+def _calendario():
+    todos = [d for ano in range(ANO_MIN, ANO_MAX + 1) for d in feriados(ano)]
+    return np.busdaycalendar(holidays=np.array(todos, dtype="datetime64[D]"))
+
+
+def _dia(data):
+    return np.datetime64(pd.Timestamp(data).date(), "D")
+
+
+# =========================
+# CONSULTAS
+# =========================
+def eh_pregao(data):
+    return bool(np.is_busday(_dia(data), busdaycal=_calendario()))
+
+
+def ultimo_pregao(data):
+    """O próprio dia se houver pregão, senão o pregão anterior."""
+    d = np.busday_offset(_dia(data), 0, roll="backward", busdaycal=_calendario())
+    return d.astype(object)
+
+
+def proximo_pregao(data):
+    """Primeiro pregão estritamente depois de ``data``."""
+    d = np.busday_offset(_dia(data), 1, roll="backward", busdaycal=_calendario())
+    return d.astype(object)
+
+
+def pregoes_entre(inicio, fim):
+    """Pregões de [inicio, fim] (inclusive) como DatetimeIndex."""
+    dias = np.arange(_dia(inicio), _dia(fim) + 1, dtype="datetime64[D]")
+    return pd.DatetimeIndex(dias[np.is_busday(dias, busdaycal=_calendario())])
+
+
+def contar_pregoes(inicio, fim):
+    """Quantidade de pregões em [inicio, fim] (inclusive)."""
+    return int(np.busday_count(_dia(inicio), _dia(fim) + 1, busdaycal=_calendario()))
+
+
+def inicio_janela(data_ref, n):
+    """Data do primeiro dos ``n`` pregões que terminam em ``data_ref``.
+
+    Se ``data_ref`` não tiver pregão, a janela termina no pregão anterior.
+    """
+    d = np.busday_offset(_dia(data_ref), -(n - 1), roll="backward",
+                         busdaycal=_calendario())
+    return d.astype(object)
+
+
+if __name__ == "__main__":
+    import sys
+
+    ano = int(sys.argv[1]) if len(sys.argv) > 1 else date.today().year
+    print(f"Feriados B3 em {ano}:")
+    for d in feriados(ano):
+        print(f"  {d.strftime('%d/%m/%Y')}")
+    print(f"Pregões no ano: {contar_pregoes(date(ano, 1, 1), date(ano, 12, 31))}")
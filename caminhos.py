@@ -0,0 +1,16 @@
+import os
+
+# =========================
+# DIRETÓRIOS LOCAIS
+# =========================
+DIR_CACHE = os.environ.get(
+    "ZECAAI_CACHE",
+    os.path.join(os.path.expanduser("~"), ".zecaai")
+)
+
+
+def diretorio_cache(*partes):
+    """Caminho dentro do cache local, criando as pastas se necessário."""
+    caminho = os.path.join(DIR_CACHE, *partes)
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
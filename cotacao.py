@@ -2,18 +2,23 @@
 
 import threading
 import io
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.backends.backend_pdf import PdfPages
 
-plt.rcParams.update({'figure.max_open_warning': 0})
+from armazem_precos import obter, obter_varios
+from busca_assincrona import ErroBusca
+from calendario_b3 import inicio_janela
+from interface import abrir_janela, configurar_matplotlib
+from graficos import barras_retorno
+
+configurar_matplotlib()
 
 
 # -------------------- Utilitários -------------------- #
@@ -30,46 +35,38 @@ def extrair_preco(valor):
         return None
 
 
-def buscar_dados_ibovespa(data_obj):
-    """Busca os últimos 252 pregões do Ibovespa até a data informada."""
-    try:
-        start_date = data_obj - timedelta(days=900)
-        end_date = data_obj + timedelta(days=1)
-
-        df = yf.download(
-            '^BVSP',
-            start=str(start_date),
-            end=str(end_date),
-            progress=False,
-            auto_adjust=False,
-            prepost=False
-        )
+def ultimos_fechamentos(df, data_obj, n=252):
+    """Últimos ``n`` fechamentos válidos (positivos) até a data, ou None."""
+    if df is None or df.empty:
+        return None
 
-        if df is None or df.empty:
-            return None
+    if 'Close' in df.columns:
+        close_data = df['Close']
+    elif 'Adj Close' in df.columns:
+        close_data = df['Adj Close']
+    else:
+        return None
 
-        if 'Close' in df.columns:
-            close_data = df['Close']
-        elif 'Adj Close' in df.columns:
-            close_data = df['Adj Close']
-        else:
-            return None
+    close_data.index = pd.to_datetime(close_data.index)
+    close_data = close_data.sort_index()
+    data_limite = pd.to_datetime(data_obj)
+    close_data = close_data[close_data.index <= data_limite]
+    close_data = close_data.dropna()
+    close_data = close_data[close_data > 0]
 
-        close_data.index = pd.to_datetime(close_data.index)
-        close_data = close_data.sort_index()
-        data_limite = pd.to_datetime(data_obj)
-        close_data = close_data[close_data.index <= data_limite]
-        close_data = close_data.dropna()
-        close_data = close_data[close_data > 0]
+    if close_data.empty:
+        return None
 
-        if close_data.empty:
-            return None
+    return close_data.tail(n)
 
-        return close_data.tail(252)
 
-    except Exception as e:
-        print(f"Erro ao buscar dados do Ibovespa: {e}")
-        return None
+def buscar_dados_ibovespa(data_obj):
+    """Busca os últimos 252 pregões do Ibovespa até a data informada.
+
+    Falhas de rede (após as novas tentativas) sobem como ErroBusca.
+    """
+    start_date = inicio_janela(data_obj, 252)
+    return ultimos_fechamentos(obter('^BVSP', start_date, data_obj), data_obj)
 
 
 # -------------------- Análise e gráficos -------------------- #
@@ -101,18 +98,15 @@ def analisar(ticker_raw, data_str):
         if data_obj is None:
             return None, None, f"Erro: não consegui entender a data '{data_str}'."
 
-        # período para busca
-        start_date = data_obj - timedelta(days=900)
-        end_date = data_obj + timedelta(days=1)
+        # período para busca (ação e Ibovespa baixados em paralelo)
+        start_date = inicio_janela(data_obj, 252)
 
-        df = yf.download(
-            ticker,
-            start=str(start_date),
-            end=str(end_date),
-            progress=False,
-            auto_adjust=False,
-            prepost=False
-        )
+        try:
+            quadros = obter_varios([ticker, '^BVSP'], start_date, data_obj)
+        except ErroBusca as e:
+            return None, None, f"Falha ao baixar as cotações: {e}"
+
+        df = quadros[ticker]
 
         if df is None or df.empty:
             return None, None, f"Nenhum dado encontrado para {ticker}."
@@ -154,7 +148,7 @@ def analisar(ticker_raw, data_str):
         media_acao = float(np.nanmean([v for v in variacoes_float if not np.isnan(v)])) if len(variacoes_float) > 0 else 0.0
 
         # buscar ibov
-        ultimos_252_ibov = buscar_dados_ibovespa(data_obj)
+        ultimos_252_ibov = ultimos_fechamentos(quadros['^BVSP'], data_obj)
         precos_ibov_lista = []
         variacoes_ibov = []
         media_ibov = 0.0
@@ -220,8 +214,7 @@ def analisar(ticker_raw, data_str):
         # Figura 2: Variação Percentual Diária - barras coloridas
         fig2, ax2 = plt.subplots(figsize=(10, 4.5))
         x = np.arange(len(variacoes_float))
-        cores = ['green' if v >= 0 else 'red' for v in variacoes_float]
-        ax2.bar(x, variacoes_float, color=cores, alpha=0.8, width=0.8)
+        barras_retorno(ax2, x, variacoes_float, largura=0.8, alpha=0.8)
         ax2.set_title(f'Variação Percentual Diária (%) - {ticker}')
         ax2.set_xlabel('Dias (do mais antigo para o mais recente)')
         ax2.set_ylabel('Variação (%)')
@@ -249,6 +242,55 @@ def analisar(ticker_raw, data_str):
         return None, None, f"Erro inesperado durante a análise: {e}"
 
 
+# -------------------- Relatório (sem interface) -------------------- #
+def escrever_pdf(caminho, fig1, fig2, resumo):
+    """Página de resumo seguida dos dois gráficos."""
+    # salvar figuras em PDF com uma primeira página de texto
+    with PdfPages(caminho) as pdf:
+        # página de resumo (texto)
+        fig_text = plt.figure(figsize=(8.27, 11.69))  # A4 portrait tamanho em polegadas
+        fig_text.clf()
+        txt = [
+            f"Relatório: {resumo.get('ticker')}",
+            f"Data de referência: {resumo.get('data_referencia')}",
+            "",
+            f"Número de pregões (ação): {resumo.get('n_pregoes_acao')}",
+            f"Média de variação diária - ação: {resumo.get('media_acao_pct'):+.4f}%",
+            f"Média de variação diária - Ibovespa: {resumo.get('media_ibov_pct'):+.4f}%",
+            f"Diferença (Ação - Ibov): {resumo.get('dif_acao_ibov_pct'):+.4f}%",
+            "",
+            "Observações:",
+            "- Gráfico 1: Variação percentual acumulada (Ação vs Ibovespa).",
+            "- Gráfico 2: Variação percentual diária (barras verdes para ganhos, vermelhas para perdas).",
+        ]
+        fig_text.text(0.05, 0.95, "Relatório de Análise - Ação vs Ibovespa", fontsize=14, weight='bold')
+        y = 0.88
+        for line in txt:
+            fig_text.text(0.05, y, line, fontsize=10, va='top')
+            y -= 0.035
+        fig_text.tight_layout()
+        pdf.savefig(fig_text)
+        plt.close(fig_text)
+
+        # salvar figuras (copiando para PDF)
+        pdf.savefig(fig1)
+        pdf.savefig(fig2)
+
+
+def gerar_relatorio(caminho, ticker, data):
+    """Análise completa gravada em PDF; devolve o resumo."""
+    fig1, fig2, resumo = analisar(ticker, data)
+    if fig1 is None:
+        raise ValueError(resumo)
+
+    try:
+        escrever_pdf(caminho, fig1, fig2, resumo)
+    finally:
+        plt.close(fig1)
+        plt.close(fig2)
+    return resumo
+
+
 # -------------------- Funções de UI -------------------- #
 class App:
     def __init__(self, root):
@@ -386,46 +428,14 @@ class App:
             return
 
         try:
-            # salvar figuras em PDF com uma primeira página de texto
-            with PdfPages(path) as pdf:
-                # página de resumo (texto)
-                fig_text = plt.figure(figsize=(8.27, 11.69))  # A4 portrait tamanho em polegadas
-                fig_text.clf()
-                txt = [
-                    f"Relatório: {self.resumo.get('ticker')}",
-                    f"Data de referência: {self.resumo.get('data_referencia')}",
-                    "",
-                    f"Número de pregões (ação): {self.resumo.get('n_pregoes_acao')}",
-                    f"Média de variação diária - ação: {self.resumo.get('media_acao_pct'):+.4f}%",
-                    f"Média de variação diária - Ibovespa: {self.resumo.get('media_ibov_pct'):+.4f}%",
-                    f"Diferença (Ação - Ibov): {self.resumo.get('dif_acao_ibov_pct'):+.4f}%",
-                    "",
-                    "Observações:",
-                    "- Gráfico 1: Variação percentual acumulada (Ação vs Ibovespa).",
-                    "- Gráfico 2: Variação percentual diária (barras verdes para ganhos, vermelhas para perdas).",
-                ]
-                fig_text.text(0.05, 0.95, "Relatório de Análise - Ação vs Ibovespa", fontsize=14, weight='bold')
-                y = 0.88
-                for line in txt:
-                    fig_text.text(0.05, y, line, fontsize=10, va='top')
-                    y -= 0.035
-                fig_text.tight_layout()
-                pdf.savefig(fig_text)
-                plt.close(fig_text)
-
-                # salvar figuras (copiando para PDF)
-                pdf.savefig(self.fig1)
-                pdf.savefig(self.fig2)
-
+            escrever_pdf(path, self.fig1, self.fig2, self.resumo)
             messagebox.showinfo("Sucesso", f"Relatório salvo em:\n{path}")
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao salvar PDF: {e}")
 
 
-def main():
-    root = tk.Tk()
-    app = App(root)
-    root.mainloop()
+def main(master=None):
+    return abrir_janela(App, master)
 
 
 if __name__ == "__main__":
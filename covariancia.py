@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# CONSTANTES
+# =========================
+# rótulo exibido na interface -> método
+METODOS = {
+    "Amostral": "amostral",
+    "Ledoit-Wolf": "ledoit_wolf",
+    "EWMA": "ewma",
+    "Índice único (Ibovespa)": "indice",
+}
+
+LAMBDA_EWMA = 0.94  # RiskMetrics, dados diários
+
+
+def _matriz(retornos):
+    if isinstance(retornos, pd.DataFrame):
+        return retornos.values.astype(float)
+    return np.asarray(retornos, dtype=float)
+
+
+# =========================
+# ESTIMADORES
+# =========================
+def cov_amostral(retornos):
+    x = _matriz(retornos)
+    x = x - x.mean(axis=0)
+    return x.T @ x / (len(x) - 1)
+
+
+def cov_ledoit_wolf(retornos):
+    """Encolhimento de Ledoit-Wolf (2004) em direção à identidade escalada."""
+    x = _matriz(retornos)
+    t, n = x.shape
+    x = x - x.mean(axis=0)
+
+    s = x.T @ x / t
+    mu = np.trace(s) / n
+
+    alvo = mu * np.eye(n)
+    d2 = np.sum((s - alvo) ** 2)
+    if d2 == 0:
+        return s
+
+    # soma_t ||x_t x_t' - S||² = soma_t |x_t|⁴ - T ||S||²
+    normas = np.sum(x ** 2, axis=1)
+    b2_barra = (np.sum(normas ** 2) - t * np.sum(s ** 2)) / t ** 2
+    b2 = min(b2_barra, d2)
+
+    delta = b2 / d2
+    return delta * alvo + (1 - delta) * s
+
+
+def cov_ewma(retornos, lambd=LAMBDA_EWMA):
+    x = _matriz(retornos)
+    t = len(x)
+
+    pesos = lambd ** np.arange(t - 1, -1, -1)
+    pesos /= pesos.sum()
+
+    x = x - pesos @ x
+    return (x * pesos[:, None]).T @ x
+
+
+def modelo_indice_unico(retornos, ret_mercado):
+    """Modelo de índice único: r_i = alfa_i + beta_i * r_m + e_i.
+
+    Guarda só O(n) parâmetros; a covariância implícita é
+    beta beta' var_m + diag(var_residual).
+    """
+    x = _matriz(retornos)
+    m = np.asarray(ret_mercado, dtype=float)
+
+    xc = x - x.mean(axis=0)
+    mc = m - m.mean()
+
+    var_m = mc @ mc / (len(m) - 1)
+    beta = xc.T @ mc / (len(m) - 1) / var_m
+    alfa = x.mean(axis=0) - beta * m.mean()
+
+    var_total = np.sum(xc ** 2, axis=0) / (len(m) - 1)
+    var_residual = np.maximum(var_total - beta ** 2 * var_m, 0.0)
+
+    return {
+        "alfa": alfa,
+        "beta": beta,
+        "var_mercado": var_m,
+        "var_residual": var_residual,
+    }
+
+
+def estimar_covariancia(retornos, metodo="amostral", ret_mercado=None):
+    """Devolve a matriz n×n ou, para o modelo de índice, o dicionário de parâmetros."""
+    if metodo == "amostral":
+        return cov_amostral(retornos)
+    if metodo == "ledoit_wolf":
+        return cov_ledoit_wolf(retornos)
+    if metodo == "ewma":
+        return cov_ewma(retornos)
+    if metodo == "indice":
+        if ret_mercado is None:
+            raise ValueError("Modelo de índice único exige os retornos do Ibovespa.")
+        return modelo_indice_unico(retornos, ret_mercado)
+
+    raise ValueError(f"Método de covariância desconhecido: {metodo}")
+
+
+# =========================
+# VARIÂNCIA DE CARTEIRAS
+# =========================
+def variancia_carteiras(pesos, estimativa):
+    """w'Σw para um vetor de pesos ou para cada linha de uma matriz de pesos."""
+    pesos = np.asarray(pesos, dtype=float)
+
+    if isinstance(estimativa, dict):
+        # O(n) por carteira, sem montar a matriz n×n
+        beta_carteira = pesos @ estimativa["beta"]
+        return (
+            beta_carteira ** 2 * estimativa["var_mercado"]
+            + (pesos ** 2) @ estimativa["var_residual"]
+        )
+
+    if pesos.ndim == 1:
+        return pesos @ estimativa @ pesos
+    return np.einsum("ij,jk,ik->i", pesos, estimativa, pesos)
+
+
+def matriz_covariancia(estimativa):
+    if isinstance(estimativa, dict):
+        beta = estimativa["beta"]
+        return (
+            np.outer(beta, beta) * estimativa["var_mercado"]
+            + np.diag(estimativa["var_residual"])
+        )
+    return estimativa
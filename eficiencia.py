@@ -1,17 +1,28 @@
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import itertools
 import math
 import os
 import numpy as np
 import pandas as pd
-import yfinance as yf
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
 
-plt.rcParams.update({'figure.max_open_warning': 0})
+from armazem_precos import fechamentos
+from calendario_b3 import inicio_janela
+from interface import abrir_janela, configurar_matplotlib
+from modelos_pdf import Relatorio, capa, modelo_figura
+from painel import POLITICAS_INTERFACE, montar_painel
+from estresse import CENARIOS, colunas_estresse, retornos_cenarios
+from metricas_risco import es_carteiras
+from alocadores import tabela_alocadores
+from snapshot import estatisticas_do_snapshot, retornos_do_snapshot
+from covariancia import (
+    METODOS, estimar_covariancia, matriz_covariancia, variancia_carteiras
+)
+from kernels import avaliar_grade
+from cache_resultados import cache, chave
+
+configurar_matplotlib()
 
 # =========================
 # CONSTANTES
@@ -27,6 +38,10 @@ A4_PORTRAIT = (8.27, 11.69)
 Z_SCORE = 1.65  # 95%
 PESO_MIN = 0.05  # 5%
 
+TITULO_CAPA = "Relatório de alocação eficiente de carteira"
+
+VERSAO_TABELA = 2  # muda quando as colunas da tabela mudam (invalida o cache)
+
 COR_CABECALHO = "#1f4e79"
 COR_LINHA = "#ddebf7"
 COR_TEXTO = "#000000"
@@ -35,15 +50,12 @@ COR_TEXTO = "#000000"
 # DOWNLOAD DE DADOS
 # =========================
 def baixar_dados(ticker, data_ref, n):
-    inicio = data_ref - timedelta(days=n * 4)
-    fim = data_ref + timedelta(days=1)
+    inicio = inicio_janela(data_ref, n)
 
-    df = yf.download(ticker, start=inicio, end=fim, progress=False)
+    df = fechamentos(ticker, inicio, data_ref).to_frame()
     if df.empty:
         return None
 
-    df = df[['Close']].dropna()
-    df = df[df.index <= pd.to_datetime(data_ref)]
     return df.tail(n)
 
 # =========================
@@ -56,6 +68,11 @@ def analisar(ticker_raw, data_str, n):
 
     data_ref = datetime.strptime(data_str, "%d/%m/%Y")
 
+    # janela já calculada pela pré-carga: dispensa download e preparo
+    df = retornos_do_snapshot(ticker, data_ref, n)
+    if df is not None:
+        return df, ticker.replace(".SA", "")
+
     acao = baixar_dados(ticker, data_ref, n)
     ibov = baixar_dados("^BVSP", data_ref, n)
 
@@ -71,76 +88,200 @@ def analisar(ticker_raw, data_str, n):
 
     return df, ticker.replace(".SA", "")
 
+def estatisticas_snapshot(nomes, data_str, n):
+    # carteira toda na pré-carga: médias e covariância também vêm prontas
+    return estatisticas_do_snapshot(nomes, datetime.strptime(data_str, "%d/%m/%Y"), n)
+
 # =========================
-# GERADOR DE PESOS
+# VAR DA CARTEIRA
 # =========================
-def gerar_pesos(n_ativos, passo):
-    total = int(1 / passo)
-    minimo = int(PESO_MIN / passo)
-    restante = total - minimo * n_ativos
+def painel_retornos(resultados, politica="descartar"):
+    # o Ibovespa entra uma única vez, como benchmark do painel
+    return montar_painel(
+        [df['ret_acao'] for df, _ in resultados],
+        [ticker for _, ticker in resultados],
+        benchmark=resultados[0][0]['ret_ibov'],
+        politica=politica
+    )
+
+def montar_df_retorno(resultados, politica="descartar"):
+    return painel_retornos(resultados, politica).retornos()
+
+def calcular_var_carteira(retornos, pesos, aporte_total, metodo="amostral", ret_mercado=None):
+    estimativa = estimar_covariancia(retornos, metodo, ret_mercado)
+    media = retornos.mean().values
+
+    vol = math.sqrt(variancia_carteiras(pesos, estimativa))
+    var_pct = media @ pesos - Z_SCORE * vol
+    var_rs = abs(var_pct) * aporte_total
+
+    return var_pct * 100, var_rs
+
+def tabela_var_combinacoes(resultados, passo, aporte_total, metodo="amostral", estatisticas=None,
+                           politica="descartar"):
+    painel = painel_retornos(resultados, politica)
+
+    # mesmo painel e mesmos parâmetros: a tabela vem do cache em disco; os
+    # cenários entram pelas janelas (as cotações só são lidas sem acerto)
+    k = chave(
+        "tabela_var_combinacoes", VERSAO_TABELA, painel.datas, painel.nomes,
+        painel.matriz, painel.benchmark, passo, aporte_total, metodo, politica,
+        PESO_MIN, Z_SCORE, CENARIOS, estatisticas
+    )
+    tabela = cache.obter(k)
+    if tabela is None:
+        falhas = []
+        cenarios = retornos_cenarios(painel.nomes, falhas=falhas)
+        tabela = _calcular_tabela(painel, passo, aporte_total, metodo, cenarios, estatisticas)
+
+        # sem algum cenário por falha de rede: não guarda a tabela incompleta
+        if not falhas:
+            cache.guardar(k, tabela)
+    return tabela
+
+def _estimativas(painel, metodo, estatisticas):
+    """Médias e estimativa de covariância; a amostral vem do snapshot, quando há."""
+    # o snapshot guarda as estatísticas das datas completas (política descartar)
+    if metodo == "amostral" and estatisticas is not None and painel.politica == "descartar":
+        return estatisticas
+
+    retornos = painel.retornos()
+    ret_mercado = painel.benchmark if metodo == "indice" else None
+    return retornos.mean().values, estimar_covariancia(retornos, metodo, ret_mercado)
+
+def _calcular_tabela(painel, passo, aporte_total, metodo, cenarios, estatisticas=None):
+    retornos = painel.retornos()
+    n = retornos.shape[1]
+
+    media, estimativa = _estimativas(painel, metodo, estatisticas)
+
+    # retorno e volatilidade calculados no kernel, carteira a carteira; os
+    # pesos (colunas, ES e estresse) saem da mesma passada pela grade
+    retorno, vol, _, pesos_lista = avaliar_grade(
+        media, estimativa, passo, PESO_MIN, com_pesos=True
+    )
+    var_pct = retorno - Z_SCORE * vol
+    var_rs = np.abs(var_pct) * aporte_total
 
-    if restante < 0:
-        raise ValueError("Incremento incompatível com o número de ativos.")
+    colunas = {
+        f"Peso {retornos.columns[i]} (%)": pesos_lista[:, i] * 100
+        for i in range(n)
+    }
+    colunas["VaR %"] = var_pct * 100
+    colunas["VaR R$"] = var_rs
 
-    combinacoes = set()
+    # ES histórico (95%, como o VaR) sobre a matriz de retornos das carteiras
+    es = es_carteiras(pesos_lista, retornos.values)
+    colunas["ES %"] = es * 100
+    colunas["ES R$"] = np.abs(es) * aporte_total
 
-    for divisao in itertools.combinations_with_replacement(
-        range(restante + 1), n_ativos
-    ):
-        if sum(divisao) == restante:
-            base = [minimo + d for d in divisao]
-            for perm in set(itertools.permutations(base)):
-                combinacoes.add(tuple(p / total for p in perm))
+    # replay das crises históricas sobre todas as carteiras
+    colunas.update(colunas_estresse(pesos_lista, cenarios))
 
-    return np.array(sorted(combinacoes))
+    return pd.DataFrame(colunas).sort_values("VaR R$").reset_index(drop=True)
 
 # =========================
-# VAR DA CARTEIRA
+# ALOCADORES SEM GRADE
 # =========================
-def montar_df_retorno(resultados):
-    retornos = []
-    nomes = []
+def tabela_alocacoes(resultados, aporte_total, metodo="amostral", estatisticas=None,
+                     politica="descartar"):
+    """Paridade de risco e HRP sobre a mesma covariância da grade."""
+    painel = painel_retornos(resultados, politica)
+    media, estimativa = _estimativas(painel, metodo, estatisticas)
+
+    return tabela_alocadores(
+        painel.nomes, media, matriz_covariancia(estimativa), aporte_total, Z_SCORE
+    )
+
+def desenhar_alocacoes(pdf, alocacoes):
+    fig, ax = modelo_figura("tabela", A4_LANDSCAPE, RODAPE, y_rodape=0.03).nova()
+    ax.axis("off")
+    ax.set_title("Alocações sem grade – Paridade de risco e HRP", fontsize=14, weight="bold")
+
+    table = ax.table(
+        cellText=np.round(alocacoes.values, 2),
+        rowLabels=alocacoes.index,
+        colLabels=alocacoes.columns,
+        loc="center",
+        cellLoc="center"
+    )
+    table.scale(1, 1.5)
+
+    for (row, col), cell in table.get_celld().items():
+        if row == 0 or col == -1:
+            cell.set_facecolor(COR_CABECALHO)
+            cell.set_text_props(color="white", weight="bold")
+        else:
+            cell.set_facecolor(COR_LINHA)
+            cell.set_text_props(color=COR_TEXTO)
 
-    for df, ticker in resultados:
-        retornos.append(df['ret_acao'])
-        nomes.append(ticker)
+    pdf.savefig(fig)
 
-    df_ret = pd.concat(retornos, axis=1)
-    df_ret.columns = nomes
-    return df_ret.dropna()
+# =========================
+# RELATÓRIO (sem interface)
+# =========================
+def escrever_pdf(caminho, tabela, data, n, alocacoes=None):
+    # PDF idêntico já gerado antes: só copia
+    k = chave("eficiencia_pdf", tabela, str(data), str(n), alocacoes)
+    if cache.copiar_pdf(k, caminho):
+        return
 
-def calcular_var_carteira(retornos, pesos, aporte_total):
-    cov = retornos.cov().values
-    media = retornos.mean().values
+    linhas_por_pagina = 20
 
-    vol = math.sqrt(pesos @ cov @ pesos)
-    var_pct = media @ pesos - Z_SCORE * vol
-    var_rs = abs(var_pct) * aporte_total
+    with Relatorio(caminho) as pdf:
 
-    return var_pct * 100, var_rs
+        pdf.savefig(capa(TITULO_CAPA, RODAPE, A4_PORTRAIT).renderizar(
+            f"Data final da análise: {data}\n"
+            f"Janela considerada: {n} pregões"
+        ))
 
-def tabela_var_combinacoes(resultados, passo, aporte_total):
-    retornos = montar_df_retorno(resultados)
-    n = retornos.shape[1]
+        if alocacoes is not None:
+            desenhar_alocacoes(pdf, alocacoes)
 
-    pesos_lista = gerar_pesos(n, passo)
-    linhas = []
+        pagina_tabela = modelo_figura("tabela", A4_LANDSCAPE, RODAPE, y_rodape=0.03)
 
-    for pesos in pesos_lista:
-        var_pct, var_rs = calcular_var_carteira(
-            retornos, pesos, aporte_total
-        )
+        for i in range(0, len(tabela), linhas_por_pagina):
+            fatia = tabela.iloc[i:i + linhas_por_pagina]
+
+            fig, ax = pagina_tabela.nova()
+            ax.axis("off")
 
-        linha = {
-            f"Peso {retornos.columns[i]} (%)": pesos[i] * 100
-            for i in range(n)
-        }
-        linha["VaR %"] = var_pct
-        linha["VaR R$"] = var_rs
+            table = ax.table(
+                cellText=np.round(fatia.values, 2),
+                colLabels=fatia.columns,
+                loc="center",
+                cellLoc="center"
+            )
+
+            table.scale(1, 1.5)
 
-        linhas.append(linha)
+            for (row, col), cell in table.get_celld().items():
+                if row == 0:
+                    cell.set_facecolor(COR_CABECALHO)
+                    cell.set_text_props(color="white", weight="bold")
+                else:
+                    cell.set_facecolor(COR_LINHA)
+                    cell.set_text_props(color=COR_TEXTO)
+
+            pdf.savefig(fig)
 
-    return pd.DataFrame(linhas).sort_values("VaR R$").reset_index(drop=True)
+    cache.guardar_pdf(k, caminho)
+
+
+def gerar_relatorio(caminho, tickers, data, n=252, incremento=5, aporte_total=100000,
+                    metodo="amostral", politica="descartar"):
+    """Tabela de combinações gravada em PDF; devolve o número de combinações."""
+    resultados = [analisar(t, data, int(n)) for t in tickers]
+    estatisticas = estatisticas_snapshot([t for _, t in resultados], data, int(n))
+    tabela = tabela_var_combinacoes(
+        resultados, float(incremento) / 100, float(aporte_total), metodo, estatisticas,
+        politica
+    )
+    alocacoes = tabela_alocacoes(
+        resultados, float(aporte_total), metodo, estatisticas, politica
+    )
+    escrever_pdf(caminho, tabela, data, n, alocacoes)
+    return {"combinacoes": len(tabela), "alocacoes": alocacoes.to_dict(orient="index")}
 
 # =========================
 # INTERFACE
@@ -185,19 +326,36 @@ class App:
         self.incremento.insert(0, "5")
         self.incremento.grid(row=3, column=1)
 
+        ttk.Label(frame, text="Estimador de covariância").grid(row=4, column=0)
+        self.metodo_cov = ttk.Combobox(
+            frame, values=list(METODOS), state="readonly", width=22
+        )
+        self.metodo_cov.current(0)
+        self.metodo_cov.grid(row=4, column=1)
+
+        ttk.Label(frame, text="Dados faltantes").grid(row=5, column=0)
+        self.politica = ttk.Combobox(
+            frame, values=list(POLITICAS_INTERFACE), state="readonly", width=22
+        )
+        self.politica.current(0)
+        self.politica.grid(row=5, column=1)
+
         self.frame_tickers = ttk.LabelFrame(frame, text="Ações")
-        self.frame_tickers.grid(row=4, column=0, columnspan=3, pady=10)
+        self.frame_tickers.grid(row=6, column=0, columnspan=3, pady=10)
 
         self.adicionar_ticker()
 
         ttk.Button(frame, text="+ Adicionar Ação",
-                   command=self.adicionar_ticker).grid(row=5, column=0)
+                   command=self.adicionar_ticker).grid(row=7, column=0)
 
         ttk.Button(frame, text="Exportar PDF",
-                   command=self.executar).grid(row=5, column=1)
+                   command=self.executar).grid(row=7, column=1)
 
         ttk.Button(frame, text="Visualizar PDF",
-                   command=self.visualizar_pdf).grid(row=5, column=2)
+                   command=self.visualizar_pdf).grid(row=7, column=2)
+
+        self.status_cache = ttk.Label(frame, text=cache.resumo(), foreground="gray")
+        self.status_cache.grid(row=8, column=0, columnspan=3, pady=(8, 0))
 
     def adicionar_ticker(self):
         linha = ttk.Frame(self.frame_tickers)
@@ -227,11 +385,19 @@ class App:
                 )
                 self.resultados.append((df, ticker))
 
+            metodo = METODOS[self.metodo_cov.get()]
+            politica = POLITICAS_INTERFACE[self.politica.get()]
+            estatisticas = estatisticas_snapshot(
+                [t for _, t in self.resultados], self.data.get(), int(self.n.get())
+            )
             tabela = tabela_var_combinacoes(
-                self.resultados, passo, aporte_total
+                self.resultados, passo, aporte_total, metodo, estatisticas, politica
+            )
+            alocacoes = tabela_alocacoes(
+                self.resultados, aporte_total, metodo, estatisticas, politica
             )
 
-            self.exportar_pdf(tabela)
+            self.exportar_pdf(tabela, alocacoes)
 
             messagebox.showinfo(
                 "Sucesso",
@@ -241,10 +407,14 @@ class App:
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
+        finally:
+            resumo = cache.resumo()
+            self.root.after(0, lambda: self.status_cache.config(text=resumo))
+
     # =========================
     # PDF
     # =========================
-    def exportar_pdf(self, tabela):
+    def exportar_pdf(self, tabela, alocacoes=None):
         self.caminho_pdf = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("PDF", "*.pdf")]
@@ -252,66 +422,7 @@ class App:
         if not self.caminho_pdf:
             return
 
-        linhas_por_pagina = 20
-
-        with PdfPages(self.caminho_pdf) as pdf:
-
-            fig, ax = plt.subplots(figsize=A4_PORTRAIT)
-            ax.axis("off")
-
-            ax.text(
-                0.5, 0.60,
-                "Relatório de alocação eficiente de carteira",
-                fontsize=23,
-                color="lightblue",
-                ha="center",
-                va="center",
-                weight="bold"
-            )
-
-            ax.text(
-                0.5, 0.52,
-                f"Data final da análise: {self.data.get()}\n"
-                f"Janela considerada: {self.n.get()} pregões",
-                fontsize=14,
-                ha="center",
-                va="center",
-                color="gray"
-            )
-
-            ax.text(0.5, 0.06, RODAPE, fontsize=9, color="gray", ha="center")
-            pdf.savefig(fig)
-            plt.close(fig)
-
-            for i in range(0, len(tabela), linhas_por_pagina):
-                fatia = tabela.iloc[i:i + linhas_por_pagina]
-
-                fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-                ax.axis("off")
-
-                table = ax.table(
-                    cellText=np.round(fatia.values, 2),
-                    colLabels=fatia.columns,
-                    loc="center",
-                    cellLoc="center"
-                )
-
-                table.scale(1, 1.5)
-
-                for (row, col), cell in table.get_celld().items():
-                    if row == 0:
-                        cell.set_facecolor(COR_CABECALHO)
-                        cell.set_text_props(color="white", weight="bold")
-                    else:
-                        cell.set_facecolor(COR_LINHA)
-                        cell.set_text_props(color=COR_TEXTO)
-
-                ax.text(0.5, 0.03, RODAPE, fontsize=8,
-                        color="gray", ha="center",
-                        transform=ax.transAxes)
-
-                pdf.savefig(fig)
-                plt.close(fig)
+        escrever_pdf(self.caminho_pdf, tabela, self.data.get(), self.n.get(), alocacoes)
 
     def visualizar_pdf(self):
         if self.caminho_pdf and os.path.exists(self.caminho_pdf):
@@ -322,22 +433,8 @@ class App:
 # =========================
 # MAIN
 # =========================
-if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
-# =========================
-# MAIN
-# =========================
-if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
-
-def main():
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
+def main(master=None):
+    return abrir_janela(App, master)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,118 @@
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from armazem_precos import COLUNA_AJUSTADA, obter_varios
+from busca_assincrona import ErroBusca
+from painel import montar_painel
+
+# =========================
+# CENÁRIOS DE ESTRESSE HISTÓRICO
+# =========================
+# Replay de crises sobre todas as carteiras da grade: os retornos diários
+# dos ativos na janela da crise (matriz T×n) são combinados com os pesos
+# (P×n) num único produto matricial, em blocos de carteiras:
+#   R = W @ X.T        (P×T) retorno diário de cada carteira
+#   acumulado = Π(1 + R) - 1   (pesos constantes, rebalanceados no dia)
+#   pior dia  = min(R)
+# As janelas são fechadas: a matriz de cada (ativos, cenário) é guardada em
+# memória (fatores de ajuste posteriores não mudam os retornos da janela).
+
+CENARIOS = {
+    "Crise 2008": ("2008-09-01", "2008-10-27"),
+    "Joesley Day": ("2017-05-18", "2017-05-18"),
+    "Covid 2020": ("2020-02-21", "2020-03-23"),
+}
+
+FOLGA = timedelta(days=10)  # para ter o fechamento anterior ao primeiro dia
+BLOCO = 1 << 16             # carteiras por produto matricial
+
+_memoria = {}
+_trava = threading.Lock()
+
+
+def _simbolo(nome):
+    nome = nome.upper().strip()
+    if nome.startswith("^") or nome.endswith(".SA"):
+        return nome
+    return nome + ".SA"
+
+
+def retornos_cenario(nomes, inicio, fim):
+    """Matriz T×n de retornos diários na janela, ou None se algum ativo não tem histórico."""
+    chave = (tuple(_simbolo(n) for n in nomes), str(inicio), str(fim))
+    with _trava:
+        if chave in _memoria:
+            return _memoria[chave]
+
+    retornos = _calcular_cenario(nomes, inicio, fim)
+    with _trava:
+        _memoria[chave] = retornos
+    return retornos
+
+
+def _calcular_cenario(nomes, inicio, fim):
+    inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+    simbolos = [_simbolo(n) for n in nomes]
+    quadros = obter_varios(
+        simbolos, (inicio - FOLGA).date(), fim.date(), colunas=(COLUNA_AJUSTADA,)
+    )
+
+    series = []
+    for s in simbolos:
+        # ajustado: proventos pagos na janela não contam como perda
+        precos = quadros[s][COLUNA_AJUSTADA].dropna()
+        # sem fechamento antes da janela o ativo ainda não era negociado
+        if precos.empty or precos.index[0] >= inicio:
+            return None
+        retornos = precos.pct_change().dropna()
+        series.append(retornos[retornos.index >= inicio])
+
+    # sem negócio no dia: retorno 0 (preço repetido)
+    painel = montar_painel(series, list(nomes), politica="preencher")
+    return painel.matriz if len(painel) else None
+
+
+def retornos_cenarios(nomes, cenarios=CENARIOS, falhas=None):
+    """{cenário: matriz T×n}; cenários sem dados (ou com falha de rede) ficam de fora.
+
+    Os que ficaram de fora por falha de rede são anotados em ``falhas`` (lista).
+    """
+    resultado = {}
+    for nome, (inicio, fim) in cenarios.items():
+        try:
+            retornos = retornos_cenario(nomes, inicio, fim)
+        except ErroBusca:
+            if falhas is not None:
+                falhas.append(nome)
+            continue
+        if retornos is not None:
+            resultado[nome] = retornos
+    return resultado
+
+
+def estresse_grade(pesos, retornos):
+    """Retorno acumulado e pior dia (decimais) de cada carteira na janela."""
+    acumulado = np.empty(len(pesos))
+    pior_dia = np.empty(len(pesos))
+
+    for inicio in range(0, len(pesos), BLOCO):
+        fim = inicio + BLOCO
+        r = pesos[inicio:fim] @ retornos.T
+        acumulado[inicio:fim] = np.expm1(np.log1p(r).sum(axis=1))
+        pior_dia[inicio:fim] = r.min(axis=1)
+
+    return acumulado, pior_dia
+
+
+def colunas_estresse(pesos, cenarios):
+    """Colunas (em %) para a tabela de combinações, uma ou duas por cenário."""
+    colunas = {}
+    for nome, retornos in cenarios.items():
+        acumulado, pior_dia = estresse_grade(pesos, retornos)
+        colunas[f"{nome} (%)"] = acumulado * 100
+        if len(retornos) > 1:
+            colunas[f"{nome} pior dia (%)"] = pior_dia * 100
+    return colunas
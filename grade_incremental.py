@@ -0,0 +1,197 @@
+import numpy as np
+
+from kernels import NUMBA_DISPONIVEL, _blocos_numpy, parametros_grade, tamanho_grade
+
+if NUMBA_DISPONIVEL:
+    from numba import njit
+else:
+    def njit(*args, **kwargs):
+        # sem numba as funções rodam como Python puro (lento para grades enormes)
+        return lambda f: f
+
+# =========================
+# VARREDURA INCREMENTAL DA GRADE
+# =========================
+# Percorre as composições numa ordem "serpente" (Gray): cada carteira difere
+# da anterior por uma unidade de peso (passo) movida entre dois ativos.
+# Com s = Σw guardado, a nova variância sai em O(n):
+#   w' = w + δ(e_a - e_b)
+#   w'Σw' = w'Σw + 2δ(s_a - s_b) + δ²(Σ_aa + Σ_bb - 2Σ_ab)
+# A cada RECALCULO passos tudo é recalculado do zero para limitar o erro
+# acumulado de ponto flutuante.
+#
+# Ordem: S(m, k) = para c = 0..m, (c, S(m - c, k - 1)) com o sentido da
+# subsequência alternando conforme a paridade de c. Ela começa em
+# (0, ..., 0, m) e termina em (m, 0, ..., 0), então a emenda entre dois
+# valores de c também é um único movimento.
+
+RECALCULO = 4096
+
+
+@njit(cache=True)
+def _passo(c):
+    """Avança c para a próxima composição; devolve (destino, origem) ou (-1, -1) no fim."""
+    n = c.shape[0]
+    if n < 2:
+        return -1, -1
+
+    sentido = np.empty(n, dtype=np.int64)
+    sentido[0] = 1
+    for j in range(n - 1):
+        sentido[j + 1] = sentido[j] if c[j] % 2 == 0 else -sentido[j]
+
+    cauda = 0
+    for i in range(n - 2, -1, -1):
+        cauda += c[i + 1]
+        sobe = sentido[i] > 0 and cauda > 0
+        desce = sentido[i] < 0 and c[i] > 0
+        if sobe or desce:
+            # a cauda está num extremo: toda a massa em i+1 ou no último ativo
+            parceiro = i + 1 if (i + 1 == n - 1 or sentido[i + 1] > 0) else n - 1
+            if sobe:
+                c[i] += 1
+                c[parceiro] -= 1
+                return i, parceiro
+            c[i] -= 1
+            c[parceiro] += 1
+            return parceiro, i
+
+    return -1, -1
+
+
+@njit(cache=True)
+def _exato(c, minimo, total, media, cov, montantes, w, s):
+    n = c.shape[0]
+    mu = 0.0
+    mt = 0.0
+    for i in range(n):
+        w[i] = (minimo + c[i]) / total
+        mu += w[i] * media[i]
+        mt += w[i] * montantes[i]
+    q = 0.0
+    for i in range(n):
+        soma = 0.0
+        for j in range(n):
+            soma += cov[i, j] * w[j]
+        s[i] = soma
+        q += w[i] * soma
+    return mu, q, mt
+
+
+@njit(cache=True)
+def _caminhar(media, cov, montantes, minimo, restante, total, recalculo, taxa,
+              retorno, vol, montante, pesos):
+    n = media.shape[0]
+    delta = 1.0 / total
+    guardar = retorno.shape[0] > 0
+    guardar_pesos = pesos.shape[0] > 0
+
+    c = np.zeros(n, dtype=np.int64)
+    c[n - 1] = restante
+    w = np.empty(n)
+    s = np.empty(n)
+    mu, q, mt = _exato(c, minimo, total, media, cov, montantes, w, s)
+
+    melhor = -np.inf
+    melhor_c = c.copy()
+    k = 0
+    while True:
+        v = np.sqrt(max(q, 0.0))
+        if guardar:
+            retorno[k] = mu
+            vol[k] = v
+            montante[k] = mt
+        if guardar_pesos:
+            for i in range(n):
+                pesos[k, i] = (minimo + c[i]) / total
+        if v > 0 and (mu - taxa) / v > melhor:
+            melhor = (mu - taxa) / v
+            melhor_c[:] = c
+
+        a, b = _passo(c)
+        if a < 0:
+            break
+        k += 1
+
+        if k % recalculo == 0:
+            mu, q, mt = _exato(c, minimo, total, media, cov, montantes, w, s)
+            continue
+
+        q += 2 * delta * (s[a] - s[b]) + delta * delta * (cov[a, a] + cov[b, b] - 2 * cov[a, b])
+        for i in range(n):
+            s[i] += delta * (cov[i, a] - cov[i, b])
+        mu += delta * (media[a] - media[b])
+        mt += delta * (montantes[a] - montantes[b])
+
+    return melhor_c
+
+
+def _preparar(media, cov, montantes, passo, peso_min):
+    media = np.ascontiguousarray(media, dtype=float)
+    cov = np.ascontiguousarray(cov, dtype=float)
+    n = len(media)
+    montantes = np.zeros(n) if montantes is None else np.ascontiguousarray(montantes, dtype=float)
+    total, minimo, restante = parametros_grade(n, passo, peso_min)
+    return media, cov, montantes, total, minimo, restante
+
+
+# =========================
+# INTERFACE
+# =========================
+def varrer_grade(media, cov, passo, peso_min, montantes=None, com_pesos=False,
+                 recalculo=RECALCULO):
+    """Retorno, volatilidade e montante de toda a grade, na ordem serpente.
+
+    Com ``com_pesos`` devolve também a matriz de pesos na mesma ordem.
+    """
+    media, cov, mont, total, minimo, restante = _preparar(media, cov, montantes, passo, peso_min)
+    n = len(media)
+    tamanho = tamanho_grade(n, restante)
+
+    retorno, vol, montante = np.empty(tamanho), np.empty(tamanho), np.empty(tamanho)
+    pesos = np.empty((tamanho, n)) if com_pesos else np.empty((0, n))
+
+    _caminhar(media, cov, mont, minimo, restante, total, recalculo, 0.0,
+              retorno, vol, montante, pesos)
+
+    resultado = (retorno, vol, None if montantes is None else montante)
+    return resultado + (pesos,) if com_pesos else resultado
+
+
+def carteira_sharpe_maximo(media, cov, passo, peso_min, taxa=0.0, recalculo=RECALCULO):
+    """Pesos, retorno e volatilidade da carteira de maior (retorno - taxa) / vol da grade.
+
+    Não guarda nada por carteira: memória O(n) para qualquer tamanho de grade.
+    """
+    media, cov, mont, total, minimo, restante = _preparar(media, cov, None, passo, peso_min)
+    n = len(media)
+
+    if not NUMBA_DISPONIVEL:
+        # em Python puro a caminhada é mais lenta que a grade vetorizada em blocos
+        return _sharpe_maximo_blocos(media, cov, minimo, restante, total, float(taxa))
+
+    vazio = np.empty(0)
+    c = _caminhar(media, cov, mont, minimo, restante, total, recalculo, float(taxa),
+                  vazio, vazio, vazio, np.empty((0, n)))
+
+    pesos = (minimo + c) / total
+    return pesos, float(pesos @ media), float(np.sqrt(pesos @ cov @ pesos))
+
+
+def _sharpe_maximo_blocos(media, cov, minimo, restante, total, taxa):
+    """Mesma busca com NumPy, bloco a bloco da grade (memória O(BLOCO))."""
+    melhor, melhores_pesos = -np.inf, None
+
+    for c in _blocos_numpy(len(media), restante):
+        w = (minimo + c) / total
+        retorno = w @ media
+        vol = np.sqrt(np.maximum(np.einsum("ij,jk,ik->i", w, cov, w), 0.0))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sharpe = (retorno - taxa) / vol
+
+        k = int(np.nanargmax(sharpe)) if not np.isnan(sharpe).all() else 0
+        if melhores_pesos is None or sharpe[k] > melhor:
+            melhor, melhores_pesos = sharpe[k], w[k]
+
+    w = melhores_pesos
+    return w, float(w @ media), float(np.sqrt(w @ cov @ w))
@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+from matplotlib.colors import LogNorm
+from matplotlib.image import AxesImage
+from matplotlib.path import Path
+from matplotlib.widgets import LassoSelector
+
+from indice_espacial import indice_dispersao
+
+# =========================
+# CONSTANTES
+# =========================
+COR_POSITIVO = "green"
+COR_NEGATIVO = "red"
+
+# acima disso as barras são rasterizadas no PDF (arquivo menor, mesma aparência)
+LIMIAR_RASTER = 500
+
+# distância máxima (pixels) entre o mouse e o ponto para mostrar a dica
+RAIO_DICA_PX = 8
+
+# dispersões maiores que isso viram densidade + fronteira + amostra
+LIMIAR_LOD = 50_000
+BINS_LOD = (320, 200)
+AMOSTRA_LOD = 4_000
+
+
+def _eixo_x(ax, x):
+    if pd.api.types.is_datetime64_any_dtype(x):
+        ax.xaxis_date()
+        return mdates.date2num(pd.DatetimeIndex(x).values)
+    return np.asarray(x, dtype=float)
+
+
+# =========================
+# BARRAS DE RETORNO DIÁRIO
+# =========================
+def barras_retorno(ax, x, valores, largura=0.8, alpha=None, rasterizar=None):
+    """Equivalente a ax.bar com verde/vermelho, mas com duas coleções em vez de um patch por barra."""
+    xs = _eixo_x(ax, x)
+    v = np.asarray(valores, dtype=float)
+
+    esquerda = xs - largura / 2
+    direita = xs + largura / 2
+    zeros = np.zeros_like(v)
+
+    # (barras, 4 vértices, xy)
+    vertices = np.stack([
+        np.column_stack([esquerda, zeros]),
+        np.column_stack([esquerda, v]),
+        np.column_stack([direita, v]),
+        np.column_stack([direita, zeros]),
+    ], axis=1)
+
+    if rasterizar is None:
+        rasterizar = len(v) > LIMIAR_RASTER
+
+    positivos = v >= 0
+    colecoes = []
+    for mascara, cor in ((positivos, COR_POSITIVO), (~positivos, COR_NEGATIVO)):
+        colecao = PolyCollection(
+            vertices[mascara],
+            facecolors=cor,
+            edgecolors="none",
+            alpha=alpha,
+            rasterized=rasterizar,
+        )
+        ax.add_collection(colecao, autolim=True)
+        colecoes.append(colecao)
+
+    ax.autoscale_view()
+    return colecoes
+
+
+# =========================
+# RÓTULOS DE RUPTURA DO VAR
+# =========================
+def marcar_rupturas(ax, x, valores, limite, offset, fontsize=8, formato="%d/%m/%Y"):
+    """Escreve a data (rotacionada 90°) abaixo de cada retorno menor que ``limite``.
+
+    A seleção das rupturas é vetorizada; só os dias rompidos viram texto.
+    """
+    v = np.asarray(valores, dtype=float)
+    mascara = v < limite
+
+    datas = pd.DatetimeIndex(x)[mascara]
+    ys = v[mascara] - offset
+    rotulos = datas.strftime(formato)
+
+    return [
+        ax.text(d, y, r, rotation=90, fontsize=fontsize, ha='center', va='top')
+        for d, y, r in zip(datas, ys, rotulos)
+    ]
+
+
+# =========================
+# DISPERSÃO COM NÍVEL DE DETALHE
+# =========================
+def fronteira_pareto(x, y):
+    """Índices dos pontos não dominados (maior x e maior y), em ordem crescente de x."""
+    ordem = np.lexsort((-y, -x))
+    ys = y[ordem]
+
+    novo = np.empty(len(ys), dtype=bool)
+    novo[0] = True
+    novo[1:] = ys[1:] > np.maximum.accumulate(ys)[:-1]
+    return ordem[novo][::-1]
+
+
+class ImagemDensidade(AxesImage):
+    """Histograma 2D dos pontos refeito para a área visível a cada desenho com zoom novo."""
+
+    def __init__(self, ax, x, y, bins=BINS_LOD, **kwargs):
+        super().__init__(ax, origin="lower", interpolation="nearest", **kwargs)
+        self.x = x
+        self.y = y
+        self.bins = bins
+        self.limites = None
+
+    def _rebinar(self, limites):
+        (x0, x1), (y0, y1) = limites
+        bx, by = self.bins
+
+        # bincount sobre o índice linear do bin: bem mais rápido que histogram2d
+        ix = np.floor((self.x - x0) * (bx / (x1 - x0))).astype(np.int64)
+        iy = np.floor((self.y - y0) * (by / (y1 - y0))).astype(np.int64)
+        dentro = (ix >= 0) & (ix < bx) & (iy >= 0) & (iy < by)
+        contagem = np.bincount(iy[dentro] * bx + ix[dentro], minlength=bx * by)
+
+        grade = np.ma.masked_equal(contagem.reshape(by, bx).astype(float), 0)
+        self.set_data(grade)
+        self.set_extent((x0, x1, y0, y1))
+        self.set_clim(1, max(grade.max() if grade.count() else 1, 2))
+
+    def draw(self, renderer):
+        limites = (tuple(sorted(self.axes.get_xlim())), tuple(sorted(self.axes.get_ylim())))
+        if limites != self.limites:
+            self.limites = limites
+            self._rebinar(limites)
+        super().draw(renderer)
+
+
+def dispersao_lod(ax, x, y, cor="darkblue", s=40, limite=LIMIAR_LOD, rotulo_fronteira=None):
+    """Dispersão que continua leve com milhões de pontos.
+
+    Até ``limite`` pontos é um scatter comum. Acima disso desenha a
+    densidade como imagem (refeita no zoom), a fronteira de Pareto e uma
+    amostra dos pontos como vetores.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    if len(x) <= limite:
+        return ax.scatter(x, y, s=s, color=cor)
+
+    imagem = ImagemDensidade(ax, x, y, cmap="Blues", norm=LogNorm(), zorder=1)
+    imagem.set_extent((x.min(), x.max(), y.min(), y.max()))
+    ax.add_image(imagem)
+    ax.update_datalim([[x.min(), y.min()], [x.max(), y.max()]])
+
+    amostra = np.random.default_rng(0).choice(len(x), AMOSTRA_LOD, replace=False)
+    ax.scatter(x[amostra], y[amostra], s=4, color=cor, alpha=0.4, zorder=2)
+
+    fronteira = fronteira_pareto(x, y)
+    ax.plot(x[fronteira], y[fronteira], "-o", color=cor, markersize=3,
+            linewidth=1, zorder=3, label=rotulo_fronteira)
+
+    ax.set_aspect("auto")
+    ax.autoscale_view()
+    return imagem
+
+
+# =========================
+# DICAS E SELEÇÃO NA DISPERSÃO
+# =========================
+def conectar_dicas(fig, ax, x, y, descrever):
+    """Mostra ``descrever(i)`` ao passar o mouse sobre o ponto i.
+
+    O ponto é localizado pelo índice espacial, não pelo hit-test do
+    matplotlib em cada marcador.
+    """
+    xs = np.asarray(x, dtype=float)
+    ys = np.asarray(y, dtype=float)
+    indice = indice_dispersao(xs, ys)
+
+    anotacao = ax.annotate(
+        "",
+        xy=(0, 0),
+        xytext=(10, 10),
+        textcoords="offset points",
+        bbox=dict(boxstyle="round", fc="w"),
+        arrowprops=dict(arrowstyle="->"),
+        zorder=6
+    )
+    anotacao.set_visible(False)
+
+    def ao_mover(event):
+        if event.inaxes is not ax or ax.get_navigate_mode() is not None:
+            return
+
+        _, i = indice.mais_proximo((event.xdata, event.ydata))
+        px, py = ax.transData.transform((xs[i], ys[i]))
+        visivel = np.hypot(px - event.x, py - event.y) <= RAIO_DICA_PX
+
+        if visivel:
+            anotacao.xy = (xs[i], ys[i])
+            anotacao.set_text(descrever(i))
+        if visivel or anotacao.get_visible():
+            anotacao.set_visible(visivel)
+            fig.canvas.draw_idle()
+
+    fig.canvas.mpl_connect("motion_notify_event", ao_mover)
+    return indice
+
+
+def conectar_laco(fig, ax, x, y, ao_selecionar, indice=None):
+    """Seleção por laço: destaca os pontos e chama ``ao_selecionar(indices)``."""
+    pontos = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    indice = indice or indice_dispersao(pontos[:, 0], pontos[:, 1])
+
+    destaque = ax.scatter(
+        [], [], s=60, facecolors="none", edgecolors="orange", linewidths=1.5, zorder=5
+    )
+
+    def selecionar(vertices):
+        vertices = np.asarray(vertices)
+        if len(vertices) < 3:
+            return
+
+        # só testa o polígono nos pontos dentro da caixa do laço
+        candidatos = indice.na_caixa(vertices.min(axis=0), vertices.max(axis=0))
+        dentro = candidatos[Path(vertices).contains_points(pontos[candidatos])]
+
+        destaque.set_offsets(pontos[dentro] if len(dentro) else np.empty((0, 2)))
+        ao_selecionar(dentro)
+        fig.canvas.draw_idle()
+
+    seletor = None
+
+    def ao_clicar(event):
+        # com zoom/arrastar da barra de ferramentas ativos o laço fica desligado
+        seletor.set_active(ax.get_navigate_mode() is None)
+
+    # registrado antes do seletor para rodar antes dele
+    fig.canvas.mpl_connect("button_press_event", ao_clicar)
+    seletor = LassoSelector(ax, selecionar, useblit=True)
+    return seletor
@@ -0,0 +1,157 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # sem scipy usa a árvore em NumPy abaixo
+    cKDTree = None
+
+# =========================
+# ÍNDICE ESPACIAL (KD-TREE)
+# =========================
+# Construído uma vez sobre as coordenadas VaR × Montante da dispersão e
+# consultado a cada movimento do mouse (vizinho mais próximo) e a cada laço
+# (pontos dentro da caixa do laço).
+
+FOLHA = 32  # pontos por folha na árvore NumPy
+
+
+class _ArvoreNumpy:
+    """KD-tree estática: nós em arrays, folhas resolvidas com NumPy."""
+
+    def __init__(self, pontos):
+        self.pontos = pontos
+        self.ordem = np.arange(len(pontos))
+        self.nos = []  # (inicio, fim, dim, corte, esquerda, direita)
+        self.raiz = self._construir(0, len(pontos))
+        self._calcular_caixas()
+
+    def _construir(self, inicio, fim):
+        no = len(self.nos)
+        self.nos.append(None)
+
+        if fim - inicio <= FOLHA:
+            self.nos[no] = (inicio, fim, -1, 0.0, -1, -1)
+            return no
+
+        idx = self.ordem[inicio:fim]
+        trecho = self.pontos[idx]
+        dim = int(np.argmax(trecho.max(axis=0) - trecho.min(axis=0)))
+
+        meio = (fim - inicio) // 2
+        particao = np.argpartition(trecho[:, dim], meio)
+        self.ordem[inicio:fim] = idx[particao]
+        corte = self.pontos[self.ordem[inicio + meio], dim]
+
+        esquerda = self._construir(inicio, inicio + meio)
+        direita = self._construir(inicio + meio, fim)
+        self.nos[no] = (inicio, fim, dim, corte, esquerda, direita)
+        return no
+
+    def _calcular_caixas(self):
+        # (mínimo, máximo) de cada nó: folhas com reduceat, internos a partir
+        # dos filhos (criados depois do pai, então varridos de trás para frente)
+        nos = np.array(self.nos, dtype=float)
+        folhas = np.flatnonzero(nos[:, 2] < 0)
+        ordenados = self.pontos[self.ordem]
+        inicios = nos[folhas, 0].astype(np.int64)
+
+        self.minimos = np.empty((len(nos), self.pontos.shape[1]))
+        self.maximos = np.empty_like(self.minimos)
+        self.minimos[folhas] = np.minimum.reduceat(ordenados, inicios)
+        self.maximos[folhas] = np.maximum.reduceat(ordenados, inicios)
+
+        for no in np.flatnonzero(nos[:, 2] >= 0)[::-1]:
+            e, d = self.nos[no][4], self.nos[no][5]
+            self.minimos[no] = np.minimum(self.minimos[e], self.minimos[d])
+            self.maximos[no] = np.maximum(self.maximos[e], self.maximos[d])
+
+    def query(self, q):
+        melhor_d2, melhor_i = np.inf, -1
+        pilha = [(self.raiz, 0.0)]
+
+        while pilha:
+            no, d2_plano = pilha.pop()
+            if d2_plano >= melhor_d2:
+                continue
+
+            inicio, fim, dim, corte, esquerda, direita = self.nos[no]
+            if dim < 0:
+                idx = self.ordem[inicio:fim]
+                d2 = ((self.pontos[idx] - q) ** 2).sum(axis=1)
+                k = int(np.argmin(d2))
+                if d2[k] < melhor_d2:
+                    melhor_d2, melhor_i = float(d2[k]), int(idx[k])
+                continue
+
+            diferenca = q[dim] - corte
+            perto, longe = (esquerda, direita) if diferenca < 0 else (direita, esquerda)
+            # o lado distante entra primeiro na pilha: é examinado por último
+            pilha.append((longe, diferenca * diferenca))
+            pilha.append((perto, 0.0))
+
+        return np.sqrt(melhor_d2), melhor_i
+
+    def na_caixa(self, minimo, maximo):
+        """Índices dos pontos em [minimo, maximo]; só desce nos nós que cruzam a caixa."""
+        achados = []
+        pilha = [self.raiz]
+
+        while pilha:
+            no = pilha.pop()
+            baixo, alto = self.minimos[no], self.maximos[no]
+            if np.any(alto < minimo) or np.any(baixo > maximo):
+                continue
+
+            inicio, fim, dim, corte, esquerda, direita = self.nos[no]
+            if np.all(baixo >= minimo) and np.all(alto <= maximo):
+                # nó inteiro dentro da caixa
+                achados.append(self.ordem[inicio:fim])
+            elif dim < 0:
+                idx = self.ordem[inicio:fim]
+                p = self.pontos[idx]
+                achados.append(idx[np.all((p >= minimo) & (p <= maximo), axis=1)])
+            else:
+                pilha += [esquerda, direita]
+
+        return np.sort(np.concatenate(achados)) if achados else np.empty(0, dtype=np.int64)
+
+
+class IndiceEspacial:
+    """Vizinho mais próximo em O(log n); ``escala`` normaliza cada eixo."""
+
+    def __init__(self, pontos, escala=None):
+        pontos = np.asarray(pontos, dtype=float)
+        if escala is None:
+            escala = np.ones(pontos.shape[1])
+        self.escala = np.where(np.asarray(escala, dtype=float) > 0, escala, 1.0)
+        self.pontos = pontos
+
+        normalizados = pontos / self.escala
+        self.arvore = cKDTree(normalizados) if cKDTree is not None else _ArvoreNumpy(normalizados)
+
+    def mais_proximo(self, ponto):
+        """(distância normalizada, índice da linha) do ponto mais próximo."""
+        distancia, indice = self.arvore.query(np.asarray(ponto, dtype=float) / self.escala)
+        return float(distancia), int(indice)
+
+    def na_caixa(self, minimo, maximo):
+        """Índices (crescentes) dos pontos dentro da caixa [minimo, maximo] (por eixo)."""
+        minimo = np.asarray(minimo, dtype=float) / self.escala
+        maximo = np.asarray(maximo, dtype=float) / self.escala
+
+        if cKDTree is None:
+            return self.arvore.na_caixa(minimo, maximo)
+
+        # bola da norma do máximo que envolve a caixa; o excesso é filtrado
+        centro = (minimo + maximo) / 2
+        raio = float(np.max(maximo - minimo)) / 2
+        candidatos = np.asarray(self.arvore.query_ball_point(centro, raio, p=np.inf), dtype=np.int64)
+        p = self.arvore.data[candidatos]
+        dentro = np.all((p >= minimo) & (p <= maximo), axis=1)
+        return np.sort(candidatos[dentro])
+
+
+def indice_dispersao(x, y):
+    """Índice sobre coordenadas (x, y) de um gráfico, com eixos normalizados pela amplitude."""
+    pontos = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    return IndiceEspacial(pontos, np.ptp(pontos, axis=0))
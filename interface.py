@@ -0,0 +1,87 @@
+import tkinter as tk
+from tkinter import font as tkfont
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+# =========================
+# CONSTANTES
+# =========================
+FONTE_FAMILIA = "Segoe UI"
+FONTE_TAMANHO = 10
+
+_matplotlib_configurado = False
+
+
+# =========================
+# INICIALIZAÇÃO COMPARTILHADA
+# =========================
+def configurar_matplotlib():
+    """Aplica uma única vez as configurações de matplotlib usadas por todas as ferramentas."""
+    global _matplotlib_configurado
+    if _matplotlib_configurado:
+        return
+
+    plt.rcParams.update({'figure.max_open_warning': 0})
+    _matplotlib_configurado = True
+
+
+def configurar_fontes(root):
+    """Ajusta as fontes nomeadas do Tk; vale para todas as janelas do mesmo root."""
+    for nome in ("TkDefaultFont", "TkTextFont", "TkMenuFont"):
+        tkfont.nametofont(nome, root=root).configure(
+            family=FONTE_FAMILIA, size=FONTE_TAMANHO
+        )
+
+
+# =========================
+# JANELAS
+# =========================
+def abrir_janela(classe_app, master=None):
+    """Abre uma ferramenta.
+
+    Sem ``master`` cria o próprio root e roda o mainloop (uso standalone);
+    com ``master`` abre um Toplevel dentro do loop de eventos já existente.
+    """
+    configurar_matplotlib()
+
+    if master is None:
+        root = tk.Tk()
+        configurar_fontes(root)
+        classe_app(root)
+        root.mainloop()
+        return None
+
+    janela = tk.Toplevel(master)
+    classe_app(janela)
+    return janela
+
+
+def criar_figura_interativa(master, titulo, figsize=(10, 6)):
+    """Cria figura para gráficos interativos.
+
+    Com ``master`` a figura é embutida num Toplevel (sem mainloop aninhado);
+    sem ``master`` usa o pyplot normalmente.
+    """
+    if master is None:
+        return plt.subplots(figsize=figsize)
+
+    janela = tk.Toplevel(master)
+    janela.title(titulo)
+
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+
+    canvas = FigureCanvasTkAgg(fig, master=janela)
+    NavigationToolbar2Tk(canvas, janela)
+    canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+
+    return fig, ax
+
+
+def exibir_figura(fig):
+    if fig.canvas.manager is None:
+        fig.canvas.draw_idle()
+    else:
+        plt.show()
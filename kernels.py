@@ -0,0 +1,242 @@
+import itertools
+from math import comb
+
+import numpy as np
+
+from covariancia import variancia_carteiras
+
+try:
+    from numba import njit, prange
+    NUMBA_DISPONIVEL = True
+except ImportError:  # sem numba: mesmos resultados, em blocos com NumPy
+    NUMBA_DISPONIVEL = False
+
+# =========================
+# GRADE DE PESOS
+# =========================
+# Cada carteira da grade é uma composição c (c_i >= 0, soma = restante) e
+# o peso do ativo i é (minimo + c_i) / total. A ordem é a lexicográfica
+# crescente das composições, a mesma de sorted() sobre as tuplas de pesos
+# usada até aqui em gerar_pesos.
+
+BLOCO = 1 << 14  # carteiras por bloco (por thread no numba, por passo no NumPy)
+
+
+def parametros_grade(n_ativos, passo, peso_min):
+    total = int(1 / passo)
+    minimo = int(peso_min / passo)
+    restante = total - minimo * n_ativos
+
+    if restante < 0:
+        raise ValueError("Incremento incompatível com o número de ativos.")
+
+    return total, minimo, restante
+
+
+def tamanho_grade(n_ativos, restante):
+    return comb(restante + n_ativos - 1, n_ativos - 1)
+
+
+# =========================
+# KERNELS NUMBA
+# =========================
+if NUMBA_DISPONIVEL:
+
+    @njit(cache=True)
+    def _desranquear(r, restante, binom, c):
+        # r-ésima composição em ordem lexicográfica (binom[a, b] = C(a, b))
+        n = c.shape[0]
+        resto = restante
+        for i in range(n - 1):
+            livres = n - i - 2
+            v = 0
+            while True:
+                qtd = binom[resto - v + livres, livres]
+                if r < qtd:
+                    break
+                r -= qtd
+                v += 1
+            c[i] = v
+            resto -= v
+        c[n - 1] = resto
+
+    @njit(cache=True)
+    def _proxima(c):
+        # sucessora lexicográfica: move uma unidade da última posição não nula
+        n = c.shape[0]
+        k = n - 1
+        while k > 0 and c[k] == 0:
+            k -= 1
+        if k == 0:
+            return
+        t = c[k] - 1
+        c[k] = 0
+        c[k - 1] += 1
+        c[n - 1] = t
+
+    @njit(parallel=True, cache=True)
+    def _pesos_numba(n, minimo, restante, total, binom, tamanho):
+        pesos = np.empty((tamanho, n))
+        blocos = (tamanho + BLOCO - 1) // BLOCO
+        for b in prange(blocos):
+            c = np.empty(n, dtype=np.int64)
+            inicio = b * BLOCO
+            _desranquear(inicio, restante, binom, c)
+            for r in range(inicio, min(inicio + BLOCO, tamanho)):
+                for i in range(n):
+                    pesos[r, i] = (minimo + c[i]) / total
+                _proxima(c)
+        return pesos
+
+    @njit(parallel=True, cache=True)
+    def _avaliar_numba(media, cov, beta, var_mercado, var_residual, montantes,
+                       minimo, restante, total, binom, tamanho, pesos):
+        # pesos: (tamanho, n) para guardar a grade junto, ou (0, n) para não guardar;
+        # cov (0, 0): modelo de índice único, w'Σw = (w'β)² var_m + Σ w_i² var_res_i
+        n = media.shape[0]
+        indice = cov.shape[0] == 0
+        guardar = pesos.shape[0] > 0
+        retorno = np.empty(tamanho)
+        vol = np.empty(tamanho)
+        montante = np.empty(tamanho)
+        blocos = (tamanho + BLOCO - 1) // BLOCO
+
+        for b in prange(blocos):
+            c = np.empty(n, dtype=np.int64)
+            w = np.empty(n)
+            inicio = b * BLOCO
+            _desranquear(inicio, restante, binom, c)
+
+            for r in range(inicio, min(inicio + BLOCO, tamanho)):
+                mu = 0.0
+                mt = 0.0
+                for i in range(n):
+                    w[i] = (minimo + c[i]) / total
+                    if guardar:
+                        pesos[r, i] = w[i]
+                    mu += w[i] * media[i]
+                    mt += w[i] * montantes[i]
+
+                q = 0.0
+                if indice:
+                    bw = 0.0
+                    for i in range(n):
+                        bw += w[i] * beta[i]
+                        q += w[i] * w[i] * var_residual[i]
+                    q += bw * bw * var_mercado
+                else:
+                    for i in range(n):
+                        s = 0.0
+                        for j in range(n):
+                            s += cov[i, j] * w[j]
+                        q += w[i] * s
+
+                retorno[r] = mu
+                vol[r] = np.sqrt(max(q, 0.0))
+                montante[r] = mt
+                _proxima(c)
+
+        return retorno, vol, montante
+
+
+def _binomiais(n, restante):
+    binom = np.zeros((restante + n + 1, n + 1), dtype=np.int64)
+    for a in range(binom.shape[0]):
+        for b in range(min(a, n) + 1):
+            binom[a, b] = comb(a, b)
+    return binom
+
+
+# =========================
+# FALLBACK NUMPY (em blocos)
+# =========================
+def _blocos_numpy(n, restante):
+    """Composições em blocos de até BLOCO linhas (estrelas e barras, em ordem)."""
+    if n == 1:
+        yield np.array([[restante]])
+        return
+
+    barras = itertools.combinations(range(restante + n - 1), n - 1)
+    while True:
+        plano = np.fromiter(
+            itertools.chain.from_iterable(itertools.islice(barras, BLOCO)),
+            dtype=np.int64
+        )
+        if plano.size == 0:
+            return
+
+        b = plano.reshape(-1, n - 1)
+        c = np.empty((len(b), n), dtype=np.int64)
+        c[:, 0] = b[:, 0]
+        c[:, 1:-1] = np.diff(b, axis=1) - 1
+        c[:, -1] = restante + n - 2 - b[:, -1]
+        yield c
+
+
+# =========================
+# INTERFACE
+# =========================
+def pesos_grade(n_ativos, passo, peso_min):
+    """Matriz (carteiras × ativos) com todos os pesos da grade."""
+    total, minimo, restante = parametros_grade(n_ativos, passo, peso_min)
+    tamanho = tamanho_grade(n_ativos, restante)
+
+    if NUMBA_DISPONIVEL:
+        return _pesos_numba(n_ativos, minimo, restante, total,
+                            _binomiais(n_ativos, restante), tamanho)
+
+    return np.concatenate([
+        (minimo + c) / total for c in _blocos_numpy(n_ativos, restante)
+    ])
+
+
+def avaliar_grade(media, cov, passo, peso_min, montantes=None, com_pesos=False):
+    """Retorno esperado, volatilidade e montante de cada carteira da grade.
+
+    ``cov`` é a matriz n×n ou o dicionário do modelo de índice único (ver
+    ``covariancia.estimar_covariancia``), avaliado em O(n) por carteira.
+    Os pesos são gerados dentro do kernel, sem materializar a grade; a
+    ordem das carteiras é a mesma de ``pesos_grade``. Com ``com_pesos`` a
+    matriz de pesos é preenchida na mesma passada e devolvida por último.
+    """
+    media = np.ascontiguousarray(media, dtype=float)
+    if not isinstance(cov, dict):
+        cov = np.ascontiguousarray(cov, dtype=float)
+    n = len(media)
+    sem_montante = montantes is None
+    montantes = np.zeros(n) if sem_montante else np.ascontiguousarray(montantes, dtype=float)
+
+    total, minimo, restante = parametros_grade(n, passo, peso_min)
+    tamanho = tamanho_grade(n, restante)
+    pesos = np.empty((tamanho if com_pesos else 0, n))
+
+    if NUMBA_DISPONIVEL:
+        if isinstance(cov, dict):
+            denso = np.empty((0, 0))
+            beta = np.ascontiguousarray(cov["beta"], dtype=float)
+            var_mercado = float(cov["var_mercado"])
+            var_residual = np.ascontiguousarray(cov["var_residual"], dtype=float)
+        else:
+            denso, beta, var_mercado, var_residual = cov, np.empty(0), 0.0, np.empty(0)
+
+        retorno, vol, montante = _avaliar_numba(
+            media, denso, beta, var_mercado, var_residual, montantes,
+            minimo, restante, total, _binomiais(n, restante), tamanho, pesos
+        )
+    else:
+        retorno = np.empty(tamanho)
+        vol = np.empty(tamanho)
+        montante = np.empty(tamanho)
+        pos = 0
+        for c in _blocos_numpy(n, restante):
+            w = (minimo + c) / total
+            fim = pos + len(w)
+            if com_pesos:
+                pesos[pos:fim] = w
+            retorno[pos:fim] = w @ media
+            vol[pos:fim] = np.sqrt(np.maximum(variancia_carteiras(w, cov), 0.0))
+            montante[pos:fim] = w @ montantes
+            pos = fim
+
+    resultado = (retorno, vol, None if sem_montante else montante)
+    return resultado + (pesos,) if com_pesos else resultado
@@ -1,19 +1,36 @@
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import itertools
 import math
 import os
+import time
 
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 
-plt.rcParams.update({'figure.max_open_warning': 0})
+from armazem_precos import fechamentos
+from calendario_b3 import inicio_janela
+from interface import (
+    abrir_janela, configurar_matplotlib, criar_figura_interativa, exibir_figura
+)
+from modelos_pdf import Relatorio, capa, modelo_figura
+from covariancia import (
+    METODOS, estimar_covariancia, matriz_covariancia, variancia_carteiras
+)
+from kernels import avaliar_grade
+from grade_incremental import carteira_sharpe_maximo
+from graficos import conectar_dicas, conectar_laco, dispersao_lod, fronteira_pareto
+from painel import POLITICAS_INTERFACE, montar_painel
+from estresse import colunas_estresse, retornos_cenarios
+from metricas_risco import es_carteiras
+from snapshot import estatisticas_do_snapshot, retornos_do_snapshot
+from pipeline import PipelineCarteira
+
+configurar_matplotlib()
 
 # =========================
 # CONSTANTES
@@ -28,6 +45,9 @@ A4_PORTRAIT = (8.27, 11.69)
 
 Z_SCORE = 1.65
 PESO_MIN = 0.05
+RESOLUCAO_PESO = 0.5  # passo dos controles do painel de pesos, em pontos percentuais
+
+TITULO_CAPA = "Relatório de alocação eficiente de carteira"
 
 COR_CABECALHO = "#1f4e79"
 COR_LINHA = "#ddebf7"
@@ -37,15 +57,12 @@ COR_TEXTO = "#000000"
 # DOWNLOAD DE DADOS
 # =========================
 def baixar_dados(ticker, data_ref, n):
-    inicio = data_ref - timedelta(days=n * 4)
-    fim = data_ref + timedelta(days=1)
+    inicio = inicio_janela(data_ref, n)
 
-    df = yf.download(ticker, start=inicio, end=fim, progress=False)
+    df = fechamentos(ticker, inicio, data_ref).to_frame()
     if df.empty:
         return None
 
-    df = df[['Close']].dropna()
-    df = df[df.index <= pd.to_datetime(data_ref)]
     return df.tail(n)
 
 # =========================
@@ -58,6 +75,11 @@ def analisar(ticker_raw, data_str, n):
 
     data_ref = datetime.strptime(data_str, "%d/%m/%Y")
 
+    # janela já calculada pela pré-carga: dispensa download e preparo
+    df = retornos_do_snapshot(ticker, data_ref, n)
+    if df is not None:
+        return df, ticker.replace(".SA", "")
+
     acao = baixar_dados(ticker, data_ref, n)
     ibov = baixar_dados("^BVSP", data_ref, n)
 
@@ -73,47 +95,30 @@ def analisar(ticker_raw, data_str, n):
 
     return df, ticker.replace(".SA", "")
 
-# =========================
-# GERADOR DE PESOS
-# =========================
-def gerar_pesos(n_ativos, passo):
-    total = int(1 / passo)
-    minimo = int(PESO_MIN / passo)
-    restante = total - minimo * n_ativos
-
-    if restante < 0:
-        raise ValueError("Incremento incompatível com o número de ativos.")
-
-    combinacoes = set()
-
-    for divisao in itertools.combinations_with_replacement(range(restante + 1), n_ativos):
-        if sum(divisao) == restante:
-            base = [minimo + d for d in divisao]
-            for perm in set(itertools.permutations(base)):
-                combinacoes.add(tuple(p / total for p in perm))
-
-    return np.array(sorted(combinacoes))
+def estatisticas_snapshot(nomes, data_str, n):
+    # carteira toda na pré-carga: médias e covariância também vêm prontas
+    return estatisticas_do_snapshot(nomes, datetime.strptime(data_str, "%d/%m/%Y"), n)
 
 # =========================
 # VAR E RETORNOS
 # =========================
-def montar_df_retorno(resultados):
-    retornos = []
-    nomes = []
-
-    for df, ticker in resultados:
-        retornos.append(df['ret_acao'])
-        nomes.append(ticker)
+def painel_retornos(resultados, politica="descartar"):
+    # o Ibovespa entra uma única vez, como benchmark do painel
+    return montar_painel(
+        [df['ret_acao'] for df, _ in resultados],
+        [ticker for _, ticker in resultados],
+        benchmark=resultados[0][0]['ret_ibov'],
+        politica=politica
+    )
 
-    df_ret = pd.concat(retornos, axis=1)
-    df_ret.columns = nomes
-    return df_ret.dropna()
+def montar_df_retorno(resultados, politica="descartar"):
+    return painel_retornos(resultados, politica).retornos()
 
-def calcular_var_carteira(retornos, pesos, aporte_total):
-    cov = retornos.cov().values
+def calcular_var_carteira(retornos, pesos, aporte_total, metodo="amostral", ret_mercado=None):
+    estimativa = estimar_covariancia(retornos, metodo, ret_mercado)
     media = retornos.mean().values
 
-    vol = math.sqrt(pesos @ cov @ pesos)
+    vol = math.sqrt(variancia_carteiras(pesos, estimativa))
     var_pct = media @ pesos - Z_SCORE * vol
     var_rs = abs(var_pct) * aporte_total
 
@@ -134,78 +139,91 @@ def simular_montante(df, aporte_mensal, meses, capital_inicial):
 # =========================
 # TABELA FINAL
 # =========================
-def tabela_var_combinacoes(resultados, passo, aporte_total, aporte_mensal):
-    retornos = montar_df_retorno(resultados)
-    n = retornos.shape[1]
-    meses = int(len(retornos) / 21)
+def montar_tabela(nomes, media, estimativa, montantes, passo, aporte_total, retornos=None):
+    n = len(nomes)
+
+    # o montante de cada ticker é linear no peso (ver simular_montante);
+    # retorno, volatilidade e montante saem do kernel, carteira a carteira,
+    # e os pesos (colunas, ES e estresse) na mesma passada pela grade
+    retorno, vol, montante_final, pesos_lista = avaliar_grade(
+        media, estimativa, passo, PESO_MIN, montantes, com_pesos=True
+    )
+    var_pct = retorno - Z_SCORE * vol
+    var_rs = np.abs(var_pct) * aporte_total
 
-    pesos_lista = gerar_pesos(n, passo)
-    linhas = []
+    colunas = {f"Peso {nomes[i]} (%)": pesos_lista[:, i] * 100 for i in range(n)}
+    colunas["VaR %"] = var_pct * 100
+    colunas["VaR R$"] = var_rs
+    colunas["Montante Final (R$)"] = montante_final
 
-    for pesos in pesos_lista:
-        var_pct, var_rs = calcular_var_carteira(retornos, pesos, aporte_total)
+    if retornos is not None:
+        # ES histórico (95%, como o VaR) sobre a matriz de retornos das carteiras
+        es = es_carteiras(pesos_lista, retornos)
+        colunas["ES %"] = es * 100
+        colunas["ES R$"] = np.abs(es) * aporte_total
 
-        montante_final = 0
-        for (df, _), peso in zip(resultados, pesos):
-            capital_inicial = aporte_total * peso
-            montante_final += simular_montante(
-                df,
-                aporte_mensal * peso,
-                meses,
-                capital_inicial
-            )
+    # replay das crises históricas sobre todas as carteiras
+    colunas.update(colunas_estresse(pesos_lista, retornos_cenarios(nomes)))
 
-        linha = {f"Peso {retornos.columns[i]} (%)": pesos[i] * 100 for i in range(n)}
-        linha["VaR %"] = var_pct
-        linha["VaR R$"] = var_rs
-        linha["Montante Final (R$)"] = montante_final
+    return pd.DataFrame(colunas).sort_values("VaR %").reset_index(drop=True)
 
-        linhas.append(linha)
+def tabela_var_combinacoes(resultados, passo, aporte_total, aporte_mensal, metodo="amostral",
+                           estatisticas=None, politica="descartar"):
+    painel = painel_retornos(resultados, politica)
+    retornos = painel.retornos()
+    meses = int(len(retornos) / 21)
 
-    return pd.DataFrame(linhas).sort_values("VaR %").reset_index(drop=True)
+    montantes = np.array([
+        simular_montante(df, aporte_mensal, meses, aporte_total)
+        for df, _ in resultados
+    ])
+
+    ret_mercado = None
+    if metodo == "indice":
+        ret_mercado = painel.benchmark
+
+    # médias e covariância amostral do snapshot, quando há (ver estatisticas_snapshot);
+    # o snapshot só tem as datas completas, isto é, a política "descartar"
+    if metodo == "amostral" and estatisticas is not None and politica == "descartar":
+        media, estimativa = estatisticas
+    else:
+        media = retornos.mean().values
+        estimativa = estimar_covariancia(retornos, metodo, ret_mercado)
+
+    return montar_tabela(
+        list(retornos.columns),
+        media,
+        estimativa,
+        montantes,
+        passo,
+        aporte_total,
+        retornos.values
+    )
 
 # =========================
 # GRÁFICO INTERATIVO
 # =========================
-def mostrar_grafico_interativo(tabela, resultados):
-    fig, ax = plt.subplots(figsize=(10, 6))
+def mostrar_grafico_interativo(tabela, media, cov, master=None):
+    fig, ax = criar_figura_interativa(master, "Risco x Retorno", figsize=(10, 6))
 
     # Gráfico de todas as carteiras simuladas
-    ax.scatter(
+    # acima de LIMIAR_LOD carteiras vira densidade + fronteira de Pareto + amostra
+    dispersao_lod(
+        ax,
         tabela["VaR %"],
         tabela["Montante Final (R$)"],
         s=40,
-        color="darkblue",
-        picker=True
+        cor="darkblue"
     )
 
     # =========================
     # CARTEIRA DE MERCADO
     # =========================
-    retornos = montar_df_retorno(resultados)
-    cov = retornos.cov().values
-    media = retornos.mean().values
-    n = retornos.shape[1]
-
-    pesos_lista = gerar_pesos(n, float(0.05))  # passo pequeno para aproximação
-
-    portf_ret = []
-    portf_vol = []
-
-    for pesos in pesos_lista:
-        ret = np.dot(pesos, media)
-        vol = np.sqrt(np.dot(pesos, np.dot(cov, pesos)))
-        portf_ret.append(ret)
-        portf_vol.append(vol)
-
-    portf_ret = np.array(portf_ret)
-    portf_vol = np.array(portf_vol)
-
-    # Carteira de mercado: Sharpe máximo
-    sharpe = (portf_ret - 0.05) / portf_vol
-    idx_max_sharpe = np.argmax(sharpe)
-    sigma_market = portf_vol[idx_max_sharpe]
-    R_market = portf_ret[idx_max_sharpe]
+    # Carteira de mercado: Sharpe máximo na grade de 5% (passo pequeno para aproximação),
+    # com a média e a covariância da tabela (estimador escolhido na interface)
+    _, R_market, sigma_market = carteira_sharpe_maximo(
+        media, cov, float(0.05), PESO_MIN, taxa=0.05
+    )
 
     # Representar carteira de mercado em vermelho
     ax.scatter(sigma_market*100, R_market*100, color="red", s=100, label="Carteira de Mercado")
@@ -217,112 +235,256 @@ def mostrar_grafico_interativo(tabela, resultados):
     ax.grid(True, linestyle="--", alpha=0.4)
     ax.legend()
 
-    anotacao = ax.annotate(
-        "",
-        xy=(0, 0),
-        xytext=(10, 10),
-        textcoords="offset points",
-        bbox=dict(boxstyle="round", fc="w"),
-        arrowprops=dict(arrowstyle="->")
-    )
-    anotacao.set_visible(False)
+    x = tabela["VaR %"].values
+    y = tabela["Montante Final (R$)"].values
 
-    def on_pick(event):
-        ind = event.ind[0]
-        x = tabela.iloc[ind]["VaR %"]
-        y = tabela.iloc[ind]["Montante Final (R$)"]
+    # dica e laço localizam as carteiras pelo índice espacial
+    indice = conectar_dicas(
+        fig, ax, x, y,
+        lambda i: f"VaR %: {x[i]:.2f}\nMontante: R$ {y[i]:,.2f}"
+    )
 
-        anotacao.xy = (x, y)
-        anotacao.set_text(f"VaR %: {x:.2f}\nMontante: R$ {y:,.2f}")
-        anotacao.set_visible(True)
-        fig.canvas.draw_idle()
+    def ao_selecionar(idx):
+        if len(idx) == 0:
+            ax.set_title("Risco x Retorno – Carteiras Simuladas")
+            return
+        ax.set_title(
+            f"{len(idx)} carteiras selecionadas – VaR % de {x[idx].min():.2f} "
+            f"a {x[idx].max():.2f} – Montante até R$ {y[idx].max():,.2f}",
+            fontsize=10
+        )
 
-    fig.canvas.mpl_connect("pick_event", on_pick)
-    plt.show()
+    conectar_laco(fig, ax, x, y, ao_selecionar, indice)
+    exibir_figura(fig)
 
 # =========================
-# INTERFACE
+# PAINEL DE PESOS
 # =========================
-class App:
-
-    def exportar_pdf(self, tabela):
-        self.caminho_pdf = filedialog.asksaveasfilename(
-            defaultextension=".pdf",
-            filetypes=[("PDF", "*.pdf")]
+# Um controle deslizante por ticker. Média, covariância e montantes vêm
+# prontos do pipeline: cada movimento custa só w'μ, w'Σw e w'm (O(n²)).
+# O gráfico não é redesenhado: o fundo (grade de carteiras e fronteira) é
+# copiado uma vez e só o marcador da posição atual é pintado por cima (blit).
+def ajustar_pesos(pesos, i, valor, peso_min=PESO_MIN):
+    """Fixa o peso ``i`` em ``valor`` e redistribui o resto entre os demais (soma 1)."""
+    n = len(pesos)
+    if n == 1:
+        return np.ones(1)
+
+    valor = min(max(valor, peso_min), 1 - (n - 1) * peso_min)
+    outros = np.arange(n) != i
+    restante = 1 - valor - (n - 1) * peso_min
+
+    # o que sobra acima do mínimo é dividido na proporção da folga atual
+    folga = np.maximum(pesos[outros] - peso_min, 0.0)
+    novos = np.empty(n)
+    novos[i] = valor
+    if folga.sum() > 0:
+        novos[outros] = peso_min + folga / folga.sum() * restante
+    else:
+        novos[outros] = peso_min + restante / (n - 1)
+    return novos
+
+def metricas_pesos(pesos, media, cov, montantes, aporte_total):
+    retorno = pesos @ media
+    vol = math.sqrt(max(pesos @ cov @ pesos, 0.0))
+    var_pct = retorno - Z_SCORE * vol
+    return {
+        "VaR %": var_pct * 100,
+        "VaR R$": abs(var_pct) * aporte_total,
+        "Montante Final (R$)": pesos @ montantes,
+        "Sharpe": retorno / vol if vol else np.nan,
+    }
+
+class PainelPesos:
+    def __init__(self, master, tabela, nomes, media, cov, montantes, aporte_total):
+        self.nomes = nomes
+        self.media = media
+        self.cov = cov
+        self.montantes = montantes
+        self.aporte_total = aporte_total
+        self.pesos = np.full(len(nomes), 1 / len(nomes))
+        self.fundo = None
+
+        self.janela = tk.Toplevel(master)
+        self.janela.title("Ajuste de Pesos – Zeca(AI)")
+
+        lateral = ttk.Frame(self.janela, padding=10)
+        lateral.pack(side="left", fill="y")
+
+        self.controles = []
+        maximo = (1 - (len(nomes) - 1) * PESO_MIN) * 100
+        for i, nome in enumerate(nomes):
+            ttk.Label(lateral, text=nome).pack(anchor="w")
+            controle = tk.Scale(
+                lateral, from_=PESO_MIN * 100, to=maximo, resolution=RESOLUCAO_PESO,
+                orient="horizontal", length=220,
+                command=lambda valor, i=i: self.mover(i, float(valor))
+            )
+            controle.pack(anchor="w", pady=(0, 6))
+            self.controles.append(controle)
+
+        self.rotulo = ttk.Label(lateral, justify="left", font=("Segoe UI", 10, "bold"))
+        self.rotulo.pack(anchor="w", pady=(10, 0))
+
+        # =========================
+        # GRÁFICO
+        # =========================
+        self.fig = Figure(figsize=(9, 6))
+        self.ax = self.fig.add_subplot()
+
+        x = tabela["VaR %"].values
+        y = tabela["Montante Final (R$)"].values
+        dispersao_lod(self.ax, x, y, s=20, cor="darkblue")
+
+        fronteira = fronteira_pareto(x, y)
+        self.ax.plot(x[fronteira], y[fronteira], color="black", lw=1.2,
+                     label="Fronteira eficiente")
+
+        # animated: fica fora do desenho normal e só é pintado no blit
+        self.marcador = self.ax.scatter(
+            [], [], color="orange", edgecolor="black", s=160, zorder=5,
+            marker="*", label="Carteira ajustada", animated=True
         )
-        if not self.caminho_pdf:
-            return
 
-        linhas_por_pagina = 20
+        self.ax.invert_xaxis()
+        self.ax.set_xlabel("VaR % (Risco)")
+        self.ax.set_ylabel("Montante Final (R$)")
+        self.ax.set_title("Risco x Retorno – Ajuste de Pesos")
+        self.ax.grid(True, linestyle="--", alpha=0.4)
+        self.ax.legend(loc="lower left")
 
-        with PdfPages(self.caminho_pdf) as pdf:
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.janela)
+        NavigationToolbar2Tk(self.canvas, self.janela)
+        self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
 
-            fig, ax = plt.subplots(figsize=A4_PORTRAIT)
-            ax.axis("off")
+        # zoom, pan e redimensionamento redesenham tudo: o fundo é copiado de novo
+        self.canvas.mpl_connect("draw_event", self._guardar_fundo)
 
-            ax.text(0.5, 0.60,
-                    "Relatório de alocação eficiente de carteira",
-                    fontsize=23, color="lightblue",
-                    ha="center", va="center", weight="bold")
+        self._mostrar_pesos()
+        self.atualizar()
+        self.canvas.draw()
 
-            ax.text(0.5, 0.52,
-                    f"Data final da análise: {self.data.get()}\n"
-                    f"Janela considerada: {self.n.get()} pregões",
-                    fontsize=14, ha="center", va="center", color="gray")
+    def _guardar_fundo(self, _evento):
+        self.fundo = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.ax.draw_artist(self.marcador)
 
-            ax.text(0.5, 0.06, RODAPE,
-                    fontsize=9, color="gray", ha="center")
+    def _mostrar_pesos(self):
+        for controle, peso in zip(self.controles, self.pesos):
+            controle.set(round(peso * 100 / RESOLUCAO_PESO) * RESOLUCAO_PESO)
 
-            pdf.savefig(fig)
-            plt.close(fig)
-
-            fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-            ax.scatter(
-                tabela["VaR %"],
-                tabela["Montante Final (R$)"],
-                s=60,
-                color="darkblue"
+    def mover(self, i, valor):
+        # o Tk chama o command dos controles ajustados por set() depois, no
+        # redesenho ocioso: esse eco traz o peso já mostrado e é ignorado
+        if abs(valor - self.pesos[i] * 100) <= RESOLUCAO_PESO / 2 + 1e-9:
+            return
+        self.pesos = ajustar_pesos(self.pesos, i, valor / 100)
+        self._mostrar_pesos()
+        self.atualizar()
+
+    def atualizar(self):
+        inicio = time.perf_counter()
+        m = metricas_pesos(self.pesos, self.media, self.cov, self.montantes, self.aporte_total)
+        self.marcador.set_offsets([[m["VaR %"], m["Montante Final (R$)"]]])
+
+        if self.fundo is not None:
+            self.canvas.restore_region(self.fundo)
+            self.ax.draw_artist(self.marcador)
+            self.canvas.blit(self.fig.bbox)
+
+        self.rotulo.config(text=(
+            f"VaR: {m['VaR %']:.2f}% (R$ {m['VaR R$']:,.2f})\n"
+            f"Montante Final: R$ {m['Montante Final (R$)']:,.2f}\n"
+            f"Sharpe (diário): {m['Sharpe']:.3f}\n"
+            f"Recalculado em {(time.perf_counter() - inicio) * 1000:.1f} ms"
+        ))
+
+# =========================
+# RELATÓRIO (sem interface)
+# =========================
+def escrever_pdf(caminho, tabela, data, n):
+    linhas_por_pagina = 20
+
+    with Relatorio(caminho) as pdf:
+
+        pdf.savefig(capa(TITULO_CAPA, RODAPE, A4_PORTRAIT).renderizar(
+            f"Data final da análise: {data}\n"
+            f"Janela considerada: {n} pregões"
+        ))
+
+        fig = Figure(figsize=A4_LANDSCAPE)
+        ax = fig.add_subplot()
+        dispersao_lod(
+            ax,
+            tabela["VaR %"],
+            tabela["Montante Final (R$)"],
+            s=60,
+            cor="darkblue"
+        )
+        ax.invert_xaxis()
+        ax.set_xlabel("VaR % (Risco)")
+        ax.set_ylabel("Montante Final (R$)")
+        ax.set_title("Fronteira Eficiente – Risco x Retorno")
+        ax.grid(True, linestyle="--", alpha=0.4)
+        ax.text(0.5, 0.03, RODAPE,
+                fontsize=8, color="gray",
+                ha="center", transform=ax.transAxes)
+        pdf.savefig(fig)
+
+        pagina_tabela = modelo_figura("tabela", A4_LANDSCAPE, RODAPE, y_rodape=0.03)
+
+        for i in range(0, len(tabela), linhas_por_pagina):
+            fatia = tabela.iloc[i:i + linhas_por_pagina]
+
+            fig, ax = pagina_tabela.nova()
+            ax.axis("off")
+
+            table = ax.table(
+                cellText=np.round(fatia.values, 2),
+                colLabels=fatia.columns,
+                loc="center",
+                cellLoc="center"
             )
-            ax.invert_xaxis()
-            ax.set_xlabel("VaR % (Risco)")
-            ax.set_ylabel("Montante Final (R$)")
-            ax.set_title("Fronteira Eficiente – Risco x Retorno")
-            ax.grid(True, linestyle="--", alpha=0.4)
-            ax.text(0.5, 0.03, RODAPE,
-                    fontsize=8, color="gray",
-                    ha="center", transform=ax.transAxes)
-            pdf.savefig(fig)
-            plt.close(fig)
 
-            for i in range(0, len(tabela), linhas_por_pagina):
-                fatia = tabela.iloc[i:i + linhas_por_pagina]
+            table.scale(1, 1.5)
 
-                fig, ax = plt.subplots(figsize=A4_LANDSCAPE)
-                ax.axis("off")
+            for (row, col), cell in table.get_celld().items():
+                if row == 0:
+                    cell.set_facecolor(COR_CABECALHO)
+                    cell.set_text_props(color="white", weight="bold")
+                else:
+                    cell.set_facecolor(COR_LINHA)
+                    cell.set_text_props(color=COR_TEXTO)
 
-                table = ax.table(
-                    cellText=np.round(fatia.values, 2),
-                    colLabels=fatia.columns,
-                    loc="center",
-                    cellLoc="center"
-                )
+            pdf.savefig(fig)
 
-                table.scale(1, 1.5)
 
-                for (row, col), cell in table.get_celld().items():
-                    if row == 0:
-                        cell.set_facecolor(COR_CABECALHO)
-                        cell.set_text_props(color="white", weight="bold")
-                    else:
-                        cell.set_facecolor(COR_LINHA)
-                        cell.set_text_props(color=COR_TEXTO)
+def gerar_relatorio(caminho, tickers, data, n=252, incremento=5, aporte_total=100000,
+                    aporte_mensal=2000, metodo="amostral", politica="descartar"):
+    """Carteiras simuladas (dispersão e tabela) gravadas em PDF."""
+    resultados = [analisar(t, data, int(n)) for t in tickers]
+    tabela = tabela_var_combinacoes(
+        resultados, float(incremento) / 100, float(aporte_total),
+        float(aporte_mensal), metodo,
+        estatisticas_snapshot([t for _, t in resultados], data, int(n)),
+        politica
+    )
+    escrever_pdf(caminho, tabela, data, n)
+    return {"combinacoes": len(tabela)}
 
-                ax.text(0.5, 0.03, RODAPE,
-                        fontsize=8, color="gray",
-                        ha="center", transform=ax.transAxes)
+# =========================
+# INTERFACE
+# =========================
+class App:
 
-                pdf.savefig(fig)
-                plt.close(fig)
+    def exportar_pdf(self, tabela):
+        self.caminho_pdf = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF", "*.pdf")]
+        )
+        if not self.caminho_pdf:
+            return
+
+        escrever_pdf(self.caminho_pdf, tabela, self.data.get(), self.n.get())
 
     def __init__(self, root):
         self.root = root
@@ -330,6 +492,9 @@ class App:
         self.inputs = []
         self.resultados = []
         self.caminho_pdf = None
+        self.pipeline = PipelineCarteira(
+            analisar, simular_montante, estatisticas=estatisticas_snapshot
+        )
 
         self.root.protocol("WM_DELETE_WINDOW", self.root.destroy)
         self._build()
@@ -363,6 +528,20 @@ class App:
         self.incremento.insert(0, "5")
         self.incremento.grid(row=4, column=1)
 
+        ttk.Label(frame, text="Covariância").grid(row=4, column=2, padx=(10, 0))
+        self.metodo_cov = ttk.Combobox(
+            frame, values=list(METODOS), state="readonly", width=22
+        )
+        self.metodo_cov.current(0)
+        self.metodo_cov.grid(row=4, column=3)
+
+        ttk.Label(frame, text="Dados faltantes").grid(row=3, column=2, padx=(10, 0))
+        self.politica = ttk.Combobox(
+            frame, values=list(POLITICAS_INTERFACE), state="readonly", width=22
+        )
+        self.politica.current(0)
+        self.politica.grid(row=3, column=3)
+
         self.frame_tickers = ttk.LabelFrame(frame, text="Ações")
         self.frame_tickers.grid(row=5, column=0, columnspan=3, pady=10)
 
@@ -380,6 +559,9 @@ class App:
         ttk.Button(frame, text="Gráfico Risco x Retorno",
                    command=self.abrir_grafico).grid(row=7, column=1, pady=5)
 
+        ttk.Button(frame, text="Ajustar Pesos",
+                   command=self.abrir_painel_pesos).grid(row=7, column=2, pady=5)
+
     def adicionar_ticker(self):
         linha = ttk.Frame(self.frame_tickers)
         linha.pack(fill="x")
@@ -409,33 +591,60 @@ class App:
 
     def _thread(self):
         try:
-            self.resultados.clear()
-
             passo = float(self.incremento.get()) / 100
             aporte_total = float(self.aporte_total.get())
             aporte_mensal = float(self.aporte_mensal.get())
 
-            for t in self.inputs:
-                df, ticker = analisar(t.get(), self.data.get(), int(self.n.get()))
-                self.resultados.append((df, ticker))
+            # outra política muda o calendário comum: recomeça o pipeline
+            politica = POLITICAS_INTERFACE[self.politica.get()]
+            if politica != self.pipeline.politica:
+                self.pipeline = PipelineCarteira(
+                    analisar, simular_montante, politica, estatisticas_snapshot
+                )
 
-            self.tabela = tabela_var_combinacoes(
-                self.resultados, passo, aporte_total, aporte_mensal
+            # só baixa/recalcula o que mudou desde a última exportação
+            self.resultados = self.pipeline.atualizar(
+                [t.get() for t in self.inputs],
+                self.data.get(),
+                int(self.n.get())
             )
 
-            self.exportar_pdf(self.tabela)
+            self.tabela = self.pipeline.tabela_combinacoes(
+                montar_tabela, passo, aporte_total, aporte_mensal,
+                METODOS[self.metodo_cov.get()]
+            )
 
-            messagebox.showinfo(
-                "Sucesso",
-                f"Relatório gerado com {len(self.tabela)} combinações!"
+            # o painel de pesos reaproveita média, covariância e montantes da tabela
+            self.dados_painel = (
+                self.pipeline.nomes(),
+                self.pipeline.media(),
+                matriz_covariancia(self.pipeline.estimativa(METODOS[self.metodo_cov.get()])),
+                self.pipeline.montantes(aporte_total, aporte_mensal),
+                aporte_total
             )
 
+            self.exportar_pdf(self.tabela)
+
+            mensagem = f"Relatório gerado com {len(self.tabela)} combinações!"
+            descartadas = len(self.pipeline.datas_descartadas)
+            if descartadas:
+                mensagem += f"\n{descartadas} data(s) sem cotação de todos os tickers foram descartadas."
+
+            messagebox.showinfo("Sucesso", mensagem)
+
         except Exception as e:
             messagebox.showerror("Erro", str(e))
 
     def abrir_grafico(self):
-        if hasattr(self, "tabela"):
-            mostrar_grafico_interativo(self.tabela, self.resultados)
+        if hasattr(self, "dados_painel"):
+            _, media, cov, _, _ = self.dados_painel
+            mostrar_grafico_interativo(self.tabela, media, cov, master=self.root)
+        else:
+            messagebox.showwarning("Aviso", "Execute a simulação antes.")
+
+    def abrir_painel_pesos(self):
+        if hasattr(self, "dados_painel"):
+            PainelPesos(self.root, self.tabela, *self.dados_painel)
         else:
             messagebox.showwarning("Aviso", "Execute a simulação antes.")
 
@@ -448,7 +657,9 @@ class App:
 # =========================
 # MAIN
 # =========================
+def main(master=None):
+    return abrir_janela(App, master)
+
+
 if __name__ == "__main__":
-    root = tk.Tk()
-    App(root)
-    root.mainloop()
+    main()
@@ -1,93 +1,114 @@
+import multiprocessing
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from interface import configurar_fontes, configurar_matplotlib
+from pre_carga import iniciar_em_segundo_plano
 import eficiencia
 import analise_risco_mult
 import backtestmark  # novo script importado
 
 
+# janelas já abertas, para não duplicar a mesma ferramenta
+janelas = {}
+
+
 # =========================
 # FUNÇÕES DE ABERTURA
 # =========================
-def abrir_analise_risco():
+def abrir_ferramenta(chave, modulo, nome):
+    janela = janelas.get(chave)
+    if janela is not None and janela.winfo_exists():
+        janela.deiconify()
+        janela.lift()
+        janela.focus_set()
+        return
+
     try:
-        analise_risco_mult.main()
+        janelas[chave] = modulo.main(root)
     except Exception as e:
         messagebox.showerror(
             "Erro",
-            f"Erro ao abrir Análise de Risco\n\n{e}"
+            f"Erro ao abrir {nome}\n\n{e}"
         )
 
 
+def abrir_analise_risco():
+    abrir_ferramenta("risco", analise_risco_mult, "Análise de Risco")
+
+
 def abrir_eficiencia():
-    try:
-        eficiencia.main()
-    except Exception as e:
-        messagebox.showerror(
-            "Erro",
-            f"Erro ao abrir Eficiência de Carteira\n\n{e}"
-        )
+    abrir_ferramenta("eficiencia", eficiencia, "Eficiência de Carteira")
 
 def abrir_backtest():
-    try:
-        backtestmark.main()  # abre o script backtestmark.py
-    except Exception as e:
-        messagebox.showerror(
-            "Erro",
-            f"Erro ao abrir Backtest Mark\n\n{e}"
-        )
+    abrir_ferramenta("backtest", backtestmark, "Backtest Mark")
 
 
 # =========================
 # INTERFACE MENU
 # =========================
-root = tk.Tk()
-root.title("Menu de Análises – Zeca(AI)")
-root.geometry("420x300")
-root.resizable(False, False)
-
-frame = ttk.Frame(root, padding=20)
-frame.pack(expand=True, fill="both")
-
-titulo = ttk.Label(
-    frame,
-    text="Selecione o tipo de análise",
-    font=("Segoe UI", 14, "bold")
-)
-titulo.pack(pady=10)
-
-btn1 = ttk.Button(
-    frame,
-    text="📊 Análise de Risco Multi-carteira",
-    command=abrir_analise_risco,
-    width=40
-)
-btn1.pack(pady=8)
-
-btn2 = ttk.Button(
-    frame,
-    text="📈 Eficiência de Carteira (VaR)",
-    command=abrir_eficiencia,
-    width=40
-)
-btn2.pack(pady=8)
-
-btn3 = ttk.Button(
-    frame,
-    text="💹 Alocação de Carteira Markowitz",
-    command=abrir_backtest,
-    width=40
-)
-btn3.pack(pady=8)
-
-ttk.Separator(frame).pack(fill="x", pady=15)
-
-rodape = ttk.Label(
-    frame,
-    text="Zeca(AI) – Ferramentas de Análise Financeira",
-    font=("Segoe UI", 9),
-    foreground="gray"
-)
-rodape.pack()
-
-root.mainloop()
+def main():
+    global root
+
+    configurar_matplotlib()
+
+    root = tk.Tk()
+    root.title("Menu de Análises – Zeca(AI)")
+    root.geometry("420x300")
+    root.resizable(False, False)
+    configurar_fontes(root)
+
+    # baixa a lista de acompanhamento após o fechamento, enquanto o menu estiver aberto
+    iniciar_em_segundo_plano()
+
+    frame = ttk.Frame(root, padding=20)
+    frame.pack(expand=True, fill="both")
+
+    titulo = ttk.Label(
+        frame,
+        text="Selecione o tipo de análise",
+        font=("Segoe UI", 14, "bold")
+    )
+    titulo.pack(pady=10)
+
+    btn1 = ttk.Button(
+        frame,
+        text="📊 Análise de Risco Multi-carteira",
+        command=abrir_analise_risco,
+        width=40
+    )
+    btn1.pack(pady=8)
+
+    btn2 = ttk.Button(
+        frame,
+        text="📈 Eficiência de Carteira (VaR)",
+        command=abrir_eficiencia,
+        width=40
+    )
+    btn2.pack(pady=8)
+
+    btn3 = ttk.Button(
+        frame,
+        text="💹 Alocação de Carteira Markowitz",
+        command=abrir_backtest,
+        width=40
+    )
+    btn3.pack(pady=8)
+
+    ttk.Separator(frame).pack(fill="x", pady=15)
+
+    rodape = ttk.Label(
+        frame,
+        text="Zeca(AI) – Ferramentas de Análise Financeira",
+        font=("Segoe UI", 9),
+        foreground="gray"
+    )
+    rodape.pack()
+
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    # necessário para o pool de renderização no executável (PyInstaller)
+    multiprocessing.freeze_support()
+    main()
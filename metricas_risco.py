@@ -0,0 +1,168 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+
+# =========================
+# CONSTANTES
+# =========================
+CONFIANCAS = (0.90, 0.95, 0.975, 0.99)
+HORIZONTES = (1, 5, 10, 21)  # pregões
+
+COR_CABECALHO = "#1f4e79"
+COR_LINHA = "#ddebf7"
+
+
+def escores_z(confiancas):
+    normal = NormalDist()
+    return np.array([normal.inv_cdf(c) for c in confiancas])
+
+
+# =========================
+# SUPERFÍCIE DE VAR
+# =========================
+def superficie_var(retornos, pesos=None, confiancas=CONFIANCAS, horizontes=HORIZONTES):
+    """VaR paramétrico e histórico para todas as séries numa única passada.
+
+    ``retornos`` é T×n (retornos diários em decimal). Se ``pesos`` for
+    informado, a carteira entra como série adicional (última linha).
+    Devolve dois arrays (séries × confianças × horizontes), em %.
+    """
+    x = retornos.values if isinstance(retornos, pd.DataFrame) else np.asarray(retornos)
+    x = x.astype(float)
+
+    if pesos is not None:
+        x = np.column_stack([x, x @ np.asarray(pesos, dtype=float)])
+
+    z = escores_z(confiancas)
+    h = np.asarray(horizontes, dtype=float)
+
+    media = x.mean(axis=0)
+    vol = x.std(axis=0, ddof=1)
+
+    # (séries, 1, horizontes) - (1, confianças, 1) * (séries, 1, horizontes)
+    parametrico = (
+        media[:, None, None] * h[None, None, :]
+        - z[None, :, None] * vol[:, None, None] * np.sqrt(h)[None, None, :]
+    )
+
+    # quantis de todas as confianças de uma vez; como no paramétrico, a média
+    # cresce com h e só o desvio do quantil em relação a ela com √h
+    quantis = np.quantile(x, 1 - np.asarray(confiancas), axis=0).T
+    historico = (
+        media[:, None, None] * h[None, None, :]
+        + (quantis - media[:, None])[:, :, None] * np.sqrt(h)[None, None, :]
+    )
+
+    return parametrico * 100, historico * 100
+
+
+# =========================
+# VAR DA CARTEIRA E DECOMPOSIÇÃO
+# =========================
+def decompor_var(aportes, media, cov, z_score=1.65):
+    """VaR paramétrico (R$) da carteira e sua decomposição por ativo.
+
+    Com a = aportes (R$), σ = √(a'Σa) e s = Σa (um único produto):
+        VaR       = z·σ - a·μ
+        marginal  = ∂VaR/∂a_i = z·s_i/σ - μ_i      (R$ por R$ aplicado)
+        componente = a_i · marginal_i              (soma = VaR, Euler)
+    Perdas positivas, em R$.
+    """
+    a = np.asarray(aportes, dtype=float)
+    media = np.asarray(media, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+
+    s = cov @ a
+    sigma = np.sqrt(max(a @ s, 0.0))
+
+    # carteira vazia (aportes zerados): sem risco, o termo z·s/σ fica 0
+    risco = np.divide(s, sigma, out=np.zeros_like(s), where=sigma > 0)
+    marginal = z_score * risco - media
+    componente = a * marginal
+    total = a.sum()
+
+    return {
+        "var_reais": float(componente.sum()),
+        "var_pct": float(componente.sum() / total * 100) if total else np.nan,
+        "marginal": marginal,
+        "componente": componente,
+    }
+
+
+# =========================
+# EXPECTED SHORTFALL
+# =========================
+BLOCO_ES = 4096  # carteiras por bloco na matriz de retornos (bloco × T)
+
+
+def expected_shortfall(retornos, confianca=0.95, axis=0):
+    """ES histórico: média das piores ``1 - confianca`` observações ao longo de ``axis``.
+
+    np.partition separa as k piores em O(T), sem ordenar a série inteira.
+    """
+    x = np.asarray(retornos, dtype=float)
+    # 1 - 0.95 = 0.05000000000000004: sem arredondar, T·0.05 inteiro pegaria uma a mais
+    k = max(int(np.ceil(round(x.shape[axis] * (1 - confianca), 9))), 1)
+    piores = np.partition(x, k - 1, axis=axis)
+    return np.take(piores, np.arange(k), axis=axis).mean(axis=axis)
+
+
+def es_parametrico(media, vol, confianca=0.95):
+    """ES da normal: média - vol · φ(z) / (1 - confiança)."""
+    z = NormalDist().inv_cdf(confianca)
+    return media - vol * NormalDist().pdf(z) / (1 - confianca)
+
+
+def es_carteiras(pesos, retornos, confianca=0.95):
+    """ES histórico de cada carteira (linhas de ``pesos``) sobre os retornos T×n."""
+    x = np.asarray(retornos, dtype=float)
+    es = np.empty(len(pesos))
+
+    for inicio in range(0, len(pesos), BLOCO_ES):
+        fim = inicio + BLOCO_ES
+        es[inicio:fim] = expected_shortfall(pesos[inicio:fim] @ x.T, confianca, axis=1)
+
+    return es
+
+
+# =========================
+# PÁGINA DO RELATÓRIO
+# =========================
+def figura_superficie(superficie, nomes, titulo, rodape, figsize,
+                      confiancas=CONFIANCAS, horizontes=HORIZONTES):
+    """Tabela compacta: uma linha por série, uma coluna por (confiança, horizonte)."""
+    fig = Figure(figsize=figsize)
+    ax = fig.add_subplot()
+    ax.axis("off")
+
+    colunas = [f"{c * 100:g}% {h}d" for c in confiancas for h in horizontes]
+    valores = superficie.reshape(len(nomes), -1)
+    celulas = [[f"{v:.2f}" for v in linha] for linha in valores]
+
+    ax.set_title(titulo, fontsize=14, weight="bold")
+
+    table = ax.table(
+        cellText=celulas,
+        rowLabels=nomes,
+        colLabels=colunas,
+        loc="center",
+        cellLoc="center"
+    )
+    table.auto_set_font_size(False)
+    table.set_fontsize(7)
+    table.auto_set_column_width(list(range(-1, len(colunas))))
+    table.scale(1, 1.4)
+
+    for (row, col), cell in table.get_celld().items():
+        if row == 0 or col == -1:
+            cell.set_facecolor(COR_CABECALHO)
+            cell.set_text_props(color="white", weight="bold")
+        else:
+            cell.set_facecolor(COR_LINHA)
+
+    ax.text(0.5, 0.02, rodape, fontsize=8,
+            color="gray", ha="center", transform=ax.transAxes)
+
+    return fig
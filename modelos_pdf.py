@@ -0,0 +1,267 @@
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_pdf import PdfPages
+
+from caminhos import diretorio_cache
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # sem pypdf as páginas estáticas são desenhadas a cada relatório
+    PdfReader = PdfWriter = None
+
+# =========================
+# CONSTANTES
+# =========================
+# incrementar sempre que o conteúdo de alguma página estática mudar
+VERSAO_MODELOS = 1
+
+# abaixo disso não compensa o custo de despachar para outros processos
+MIN_PARALELO = 4
+
+_paginas = {}
+_figuras = {}
+_trava = threading.Lock()
+
+# modelos de figura do processo: livres e emprestados (chave -> {thread: modelo})
+_modelos_livres = {}
+_modelos_em_uso = {}
+_trava_modelos = threading.Lock()
+_executor = None
+
+
+# =========================
+# PÁGINAS ESTÁTICAS
+# =========================
+def _desenhar(desenhar, figsize):
+    fig = Figure(figsize=figsize)
+    desenhar(fig)
+    return fig
+
+
+def pagina_estatica(chave, desenhar, figsize):
+    """PDF (bytes) de uma página que não muda entre relatórios.
+
+    Renderizada uma vez por versão e guardada em memória e em disco.
+    """
+    with _trava:
+        if chave in _paginas:
+            return _paginas[chave]
+
+        arquivo = os.path.join(
+            diretorio_cache("modelos"), f"{chave}_v{VERSAO_MODELOS}.pdf"
+        )
+        if os.path.exists(arquivo):
+            with open(arquivo, "rb") as f:
+                conteudo = f.read()
+        else:
+            buffer = io.BytesIO()
+            with PdfPages(buffer) as pdf:
+                pdf.savefig(_desenhar(desenhar, figsize))
+            conteudo = buffer.getvalue()
+
+            # outros processos (pools de renderização e do servidor) podem
+            # ler o mesmo arquivo: grava à parte e troca de uma vez
+            temporario = f"{arquivo}.{os.getpid()}.tmp"
+            with open(temporario, "wb") as f:
+                f.write(conteudo)
+            os.replace(temporario, arquivo)
+
+        _paginas[chave] = conteudo
+        return conteudo
+
+
+def figura_estatica(chave, desenhar, figsize):
+    """Mesma página como Figure já montada, para quando não há pypdf."""
+    with _trava:
+        if chave not in _figuras:
+            _figuras[chave] = _desenhar(desenhar, figsize)
+        return _figuras[chave]
+
+
+# =========================
+# MODELOS DE FIGURA
+# =========================
+class ModeloCapa:
+    """Capa com título e rodapé fixos; só o subtítulo muda por relatório."""
+
+    def __init__(self, titulo, rodape, figsize):
+        self.fig = Figure(figsize=figsize)
+        ax = self.fig.add_subplot()
+        ax.axis("off")
+
+        ax.text(0.5, 0.60, titulo,
+                fontsize=23, color="lightblue",
+                ha="center", va="center", weight="bold")
+
+        self.subtitulo = ax.text(0.5, 0.52, "",
+                                 fontsize=14, ha="center",
+                                 va="center", color="gray")
+
+        ax.text(0.5, 0.06, rodape,
+                fontsize=9, color="gray", ha="center")
+
+    def renderizar(self, subtitulo):
+        self.subtitulo.set_text(subtitulo)
+        return self.fig
+
+
+class ModeloFigura:
+    """Figura A4 reaproveitada entre páginas: só o conteúdo dos eixos é refeito."""
+
+    def __init__(self, figsize, rodape, y_rodape=0.02):
+        self.fig = Figure(figsize=figsize)
+        self.ax = self.fig.add_subplot()
+        self.rodape = rodape
+        self.y_rodape = y_rodape
+        self.bottom = self.fig.subplotpars.bottom
+
+    def nova(self):
+        self.ax.cla()
+        self.fig.subplots_adjust(bottom=self.bottom)
+        self.ax.text(0.5, self.y_rodape, self.rodape, fontsize=8,
+                     color="gray", ha="center", transform=self.ax.transAxes)
+        return self.fig, self.ax
+
+
+def _modelo(chave, criar):
+    # Figure não é thread-safe: o modelo fica com a thread enquanto ela vive
+    # e volta para o processo quando ela termina (cada exportação da
+    # interface roda numa thread nova)
+    thread = threading.current_thread()
+    with _trava_modelos:
+        em_uso = _modelos_em_uso.setdefault(chave, {})
+        if thread in em_uso:
+            return em_uso[thread]
+
+        livres = _modelos_livres.setdefault(chave, [])
+        for dona in [t for t in em_uso if not t.is_alive()]:
+            livres.append(em_uso.pop(dona))
+
+        em_uso[thread] = livres.pop() if livres else criar()
+        return em_uso[thread]
+
+
+def capa(titulo, rodape, figsize):
+    return _modelo(("capa", titulo, rodape, figsize),
+                   lambda: ModeloCapa(titulo, rodape, figsize))
+
+
+def modelo_figura(nome, figsize, rodape, y_rodape=0.02):
+    return _modelo(("figura", nome, figsize, rodape, y_rodape),
+                   lambda: ModeloFigura(figsize, rodape, y_rodape))
+
+
+# =========================
+# RENDERIZAÇÃO PARALELA
+# =========================
+def mescla_disponivel():
+    return PdfWriter is not None
+
+
+def _iniciar_processo():
+    matplotlib.use("Agg")
+
+
+def _pool():
+    global _executor
+    with _trava:
+        if _executor is None:
+            # mantido entre relatórios: criar processos custa caro (principalmente no Windows)
+            _executor = ProcessPoolExecutor(
+                max_workers=os.cpu_count(), initializer=_iniciar_processo
+            )
+        return _executor
+
+
+def pdf_em_memoria(desenhar, *args):
+    """Executa ``desenhar(pdf, *args)`` num PdfPages em memória e devolve os bytes."""
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        desenhar(pdf, *args)
+    return buffer.getvalue()
+
+
+def renderizar_em_paralelo(desenhar, tarefas):
+    """Gera um PDF (bytes) por tarefa, em processos separados, mantendo a ordem.
+
+    ``desenhar`` precisa ser uma função de módulo (picklable) com assinatura
+    ``desenhar(pdf, *tarefa)``.
+    """
+    if len(tarefas) < MIN_PARALELO:
+        return [pdf_em_memoria(desenhar, *t) for t in tarefas]
+
+    funcoes = [desenhar] * len(tarefas)
+    return list(_pool().map(pdf_em_memoria, funcoes, *zip(*tarefas)))
+
+
+# =========================
+# RELATÓRIO
+# =========================
+class Relatorio:
+    """PdfPages que também aceita páginas prontas (bytes) e as mescla na ordem.
+
+    Uso:
+        with Relatorio(caminho) as rel:
+            rel.savefig(fig)
+            rel.adicionar_estatica("explicativa", desenhar, A4_PORTRAIT)
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.partes = []
+        self.buffer = None
+        self.pdf = None
+
+        if PdfWriter is None:
+            self.pdf = PdfPages(caminho)
+
+    def _bloco(self):
+        if self.pdf is None:
+            self.buffer = io.BytesIO()
+            self.pdf = PdfPages(self.buffer)
+        return self.pdf
+
+    def _fechar_bloco(self):
+        if self.buffer is not None:
+            self.pdf.close()
+            self.partes.append(self.buffer.getvalue())
+            self.buffer = None
+            self.pdf = None
+
+    def savefig(self, fig):
+        self._bloco().savefig(fig)
+
+    def adicionar_pdf(self, conteudo):
+        if PdfWriter is None:
+            raise RuntimeError("Mesclar páginas prontas exige o pacote pypdf.")
+        self._fechar_bloco()
+        self.partes.append(conteudo)
+
+    def adicionar_estatica(self, chave, desenhar, figsize):
+        if PdfWriter is None:
+            self.pdf.savefig(figura_estatica(chave, desenhar, figsize))
+        else:
+            self.adicionar_pdf(pagina_estatica(chave, desenhar, figsize))
+
+    def close(self):
+        if PdfWriter is None:
+            self.pdf.close()
+            return
+
+        self._fechar_bloco()
+        writer = PdfWriter()
+        for conteudo in self.partes:
+            writer.append(PdfReader(io.BytesIO(conteudo)))
+        with open(self.caminho, "wb") as f:
+            writer.write(f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# PAINEL DE RETORNOS ALINHADOS
+# =========================
+# Junta as séries de retorno de vários ativos (e do benchmark) numa única
+# matriz T×n sobre o calendário comum. Políticas para datas incompletas:
+#   descartar – mantém só as datas em que todos os ativos têm retorno;
+#   preencher – ativo sem negócio no dia tem retorno 0 (preço repetido);
+#   pareado   – mantém os buracos (NaN); média e covariância usam, para
+#               cada par, apenas as datas em que os dois têm retorno.
+
+POLITICAS = ("descartar", "preencher", "pareado")
+
+# rótulo exibido na interface -> política; o pareado fica de fora porque
+# ES, estresse e os estimadores de covariância precisam da matriz completa
+POLITICAS_INTERFACE = {
+    "Descartar datas incompletas": "descartar",
+    "Preencher com retorno 0": "preencher",
+}
+
+
+class Painel:
+    def __init__(self, datas, nomes, matriz, benchmark, datas_descartadas, politica):
+        self.datas = datas
+        self.nomes = nomes
+        self.matriz = matriz
+        self.benchmark = benchmark
+        self.datas_descartadas = datas_descartadas
+        self.politica = politica
+
+    def __len__(self):
+        return len(self.datas)
+
+    def retornos(self):
+        return pd.DataFrame(self.matriz, index=self.datas, columns=self.nomes)
+
+    def media(self):
+        return np.nanmean(self.matriz, axis=0)
+
+    def cov(self):
+        if self.politica != "pareado":
+            return np.cov(self.matriz, rowvar=False, ddof=1).reshape(len(self.nomes), -1)
+
+        # somas por par só nas datas em que os dois ativos têm retorno
+        presente = (~np.isnan(self.matriz)).astype(float)
+        x = np.where(presente > 0, self.matriz, 0.0)
+
+        n = presente.T @ presente
+        soma = x.T @ presente            # soma[i, j] = Σ x_i nas datas com j
+        produto = x.T @ x
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (produto - soma * soma.T / n) / (n - 1)
+
+
+def _valores(serie):
+    return pd.DatetimeIndex(serie.index).values.astype("datetime64[ns]")
+
+
+def montar_painel(series, nomes=None, benchmark=None, politica="descartar"):
+    """Alinha as séries (índice de datas) num Painel, segundo ``politica``."""
+    if politica not in POLITICAS:
+        raise ValueError(f"Política desconhecida: {politica}")
+
+    if nomes is None:
+        nomes = [s.name for s in series]
+
+    todas = list(series) + ([benchmark] if benchmark is not None else [])
+    datas = np.unique(np.concatenate([_valores(s) for s in todas]))
+
+    # uma busca binária por série em vez de reindex/concat do pandas
+    matriz = np.full((len(datas), len(todas)), np.nan)
+    for j, s in enumerate(todas):
+        pos = np.searchsorted(datas, _valores(s))
+        matriz[pos, j] = np.asarray(s.values, dtype=float)
+
+    faltando = np.isnan(matriz)
+    if politica == "descartar":
+        manter = ~faltando.any(axis=1)
+    elif politica == "preencher":
+        # antes da primeira cotação não há preço a repetir
+        iniciado = np.logical_or.accumulate(~faltando, axis=0)
+        matriz[faltando & iniciado] = 0.0
+        manter = iniciado.all(axis=1)
+    else:
+        manter = ~faltando[:, :len(series)].all(axis=1)
+
+    indice = pd.DatetimeIndex(datas)
+    matriz = matriz[manter]
+
+    return Painel(
+        datas=indice[manter],
+        nomes=list(nomes),
+        matriz=matriz[:, :len(series)],
+        benchmark=matriz[:, len(series)] if benchmark is not None else None,
+        datas_descartadas=indice[~manter],
+        politica=politica,
+    )
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+from covariancia import estimar_covariancia
+from painel import montar_painel
+
+# =========================
+# PIPELINE INCREMENTAL DE CARTEIRA
+# =========================
+# Etapas e dependências:
+#   dados por ticker  (ticker, data, pregões)
+#     -> retornos alinhados + média/covariância  (lista de tickers)
+#       -> montante por ticker  (pregões alinhados, aportes)
+#         -> tabela de combinações  (incremento, aportes)
+# Cada etapa guarda a chave com que foi calculada e só é refeita
+# quando essa chave muda.
+
+
+def normalizar_ticker(ticker_raw):
+    ticker = ticker_raw.upper().strip()
+    if ticker.endswith(".SA"):
+        ticker = ticker[:-3]
+    return ticker
+
+
+class PipelineCarteira:
+    def __init__(self, analisar, simular_montante, politica="descartar", estatisticas=None):
+        # "pareado" não tem matriz completa para a atualização incremental
+        if politica not in ("descartar", "preencher"):
+            raise ValueError(f"Política não suportada pelo pipeline: {politica}")
+
+        self.analisar = analisar
+        self.simular_montante = simular_montante
+        self.politica = politica
+
+        # estatisticas(nomes, data_str, n) -> (média, covariância) prontas
+        # (snapshot da pré-carga) ou None; só vale para a carteira inteira
+        self.estatisticas = estatisticas
+        self.chave_estatisticas = None
+        self.estatisticas_prontas = None
+
+        self.chave_dados = None
+        self.dados = {}
+
+        # estado da covariância, na ordem de self.unicos
+        self.unicos = []
+        self.indice = None
+        self.datas_descartadas = pd.DatetimeIndex([])
+        self.centrados = None
+        self.media_u = None
+        self.cov_u = None
+        self.versao_cov = 0
+
+        self.chave_montantes = None
+        self.montantes_u = None
+
+        self.chave_tabela = None
+        self.tabela = None
+
+        # ordem digitada pelo usuário (pode repetir ticker)
+        self.ordem = []
+
+    # =========================
+    # ETAPA 1 – DADOS POR TICKER
+    # =========================
+    def atualizar(self, tickers_raw, data_str, n):
+        chave = (data_str, n)
+        if chave != self.chave_dados:
+            self._limpar()
+            self.chave_dados = chave
+
+        ordem = [normalizar_ticker(t) for t in tickers_raw]
+        novos = list(dict.fromkeys(ordem))
+
+        removidos = [t for t in self.unicos if t not in novos]
+        adicionados = [t for t in novos if t not in self.unicos]
+
+        # baixa tudo antes de mexer no estado: uma falha no meio (ticker
+        # digitado errado) não pode deixar dados e covariância descasados
+        baixados = {t: self.analisar(t, data_str, n) for t in adicionados}
+
+        self.dados.update(baixados)
+        for t in removidos:
+            del self.dados[t]
+
+        self._atualizar_covariancia(novos, removidos, adicionados)
+        self.ordem = ordem
+        return self.resultados()
+
+    def resultados(self):
+        return [self.dados[t] for t in self.ordem]
+
+    def _limpar(self):
+        self.dados = {}
+        self.unicos = []
+        self.indice = None
+        self.centrados = None
+        self.media_u = None
+        self.cov_u = None
+        self.versao_cov += 1
+        self.chave_montantes = None
+        self.chave_tabela = None
+
+    # =========================
+    # ETAPA 2 – RETORNOS E COVARIÂNCIA
+    # =========================
+    def _atualizar_covariancia(self, novos, removidos, adicionados):
+        if not removidos and not adicionados:
+            if novos != self.unicos:
+                self._reordenar(novos)
+            return
+
+        indice_novo = self._indice_comum(novos)
+
+        if self.indice is None or not indice_novo.equals(self.indice):
+            # janela comum mudou: todas as estatísticas mudam
+            self._recalcular(novos, indice_novo)
+        else:
+            for t in removidos:
+                self._remover_coluna(t)
+            for t in adicionados:
+                self._adicionar_coluna(t)
+            self._reordenar(novos)
+
+        self.versao_cov += 1
+
+    def _indice_comum(self, tickers):
+        painel = montar_painel(
+            [self.dados[t][0]['ret_acao'] for t in tickers],
+            tickers,
+            politica=self.politica
+        )
+        self.datas_descartadas = painel.datas_descartadas
+        return painel.datas
+
+    def _coluna(self, t):
+        df, _ = self.dados[t]
+        # só há buracos com a política "preencher": dia sem negócio = retorno 0
+        return df['ret_acao'].reindex(self.indice).fillna(0.0).values.astype(float)
+
+    def _recalcular(self, tickers, indice):
+        self.indice = indice
+        self.unicos = list(tickers)
+
+        matriz = np.column_stack([self._coluna(t) for t in tickers])
+        self.media_u = matriz.mean(axis=0)
+        self.centrados = matriz - self.media_u
+        self.cov_u = self.centrados.T @ self.centrados / (len(indice) - 1)
+
+    def _remover_coluna(self, t):
+        i = self.unicos.index(t)
+        self.unicos.pop(i)
+        self.media_u = np.delete(self.media_u, i)
+        self.centrados = np.delete(self.centrados, i, axis=1)
+        self.cov_u = np.delete(np.delete(self.cov_u, i, axis=0), i, axis=1)
+
+    def _adicionar_coluna(self, t):
+        coluna = self._coluna(t)
+        media = coluna.mean()
+        centrada = coluna - media
+
+        cruzada = self.centrados.T @ centrada / (len(self.indice) - 1)
+        variancia = centrada @ centrada / (len(self.indice) - 1)
+
+        n = len(self.unicos)
+        cov = np.empty((n + 1, n + 1))
+        cov[:n, :n] = self.cov_u
+        cov[:n, n] = cruzada
+        cov[n, :n] = cruzada
+        cov[n, n] = variancia
+
+        self.unicos.append(t)
+        self.media_u = np.append(self.media_u, media)
+        self.centrados = np.column_stack([self.centrados, centrada])
+        self.cov_u = cov
+
+    def _reordenar(self, novos):
+        perm = [self.unicos.index(t) for t in novos]
+        self.unicos = list(novos)
+        self.media_u = self.media_u[perm]
+        self.centrados = self.centrados[:, perm]
+        self.cov_u = self.cov_u[np.ix_(perm, perm)]
+
+    def _posicoes(self):
+        return [self.unicos.index(t) for t in self.ordem]
+
+    def nomes(self):
+        return [self.dados[t][1] for t in self.ordem]
+
+    def retornos(self):
+        pos = self._posicoes()
+        matriz = self.centrados[:, pos] + self.media_u[pos]
+        return pd.DataFrame(matriz, index=self.indice, columns=self.nomes())
+
+    def _prontas(self):
+        if self.estatisticas is None or self.politica != "descartar":
+            return None
+
+        chave = (self.chave_dados, tuple(self.ordem))
+        if chave != self.chave_estatisticas:
+            data_str, n = self.chave_dados
+            self.estatisticas_prontas = self.estatisticas(self.nomes(), data_str, n)
+            self.chave_estatisticas = chave
+        return self.estatisticas_prontas
+
+    def media(self):
+        prontas = self._prontas()
+        if prontas is not None:
+            return prontas[0]
+        return self.media_u[self._posicoes()]
+
+    def cov(self):
+        prontas = self._prontas()
+        if prontas is not None:
+            return prontas[1]
+        pos = self._posicoes()
+        return self.cov_u[np.ix_(pos, pos)]
+
+    def retorno_mercado(self):
+        df, _ = self.dados[self.unicos[0]]
+        return df['ret_ibov'].reindex(self.indice).fillna(0.0).values
+
+    def estimativa(self, metodo):
+        # a amostral já é mantida incrementalmente; as demais partem dos retornos
+        if metodo == "amostral":
+            return self.cov()
+
+        ret_mercado = self.retorno_mercado() if metodo == "indice" else None
+        return estimar_covariancia(self.retornos(), metodo, ret_mercado)
+
+    # =========================
+    # ETAPA 3 – MONTANTE POR TICKER
+    # =========================
+    def montantes(self, aporte_total, aporte_mensal):
+        # o montante é linear no peso: basta simular cada ticker com peso 1
+        meses = int(len(self.indice) / 21)
+        chave = (meses, aporte_total, aporte_mensal, tuple(self.unicos))
+
+        if chave != self.chave_montantes:
+            anteriores = {}
+            if self.chave_montantes is not None and self.chave_montantes[:3] == chave[:3]:
+                anteriores = dict(zip(self.chave_montantes[3], self.montantes_u))
+
+            self.montantes_u = np.array([
+                anteriores[t] if t in anteriores else self.simular_montante(
+                    self.dados[t][0], aporte_mensal, meses, aporte_total
+                )
+                for t in self.unicos
+            ])
+            self.chave_montantes = chave
+
+        return self.montantes_u[self._posicoes()]
+
+    # =========================
+    # ETAPA 4 – TABELA
+    # =========================
+    def tabela_combinacoes(self, montar_tabela, passo, aporte_total, aporte_mensal,
+                           metodo="amostral"):
+        chave = (
+            self.versao_cov, tuple(self.ordem), passo, aporte_total, aporte_mensal, metodo
+        )
+        if chave != self.chave_tabela:
+            self.tabela = montar_tabela(
+                self.nomes(),
+                self.media(),
+                self.estimativa(metodo),
+                self.montantes(aporte_total, aporte_mensal),
+                passo,
+                aporte_total,
+                self.retornos().values
+            )
+            self.chave_tabela = chave
+        return self.tabela
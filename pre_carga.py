@@ -0,0 +1,183 @@
+import argparse
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+
+from armazem_precos import COLUNA_AJUSTADA, HORA_FECHAMENTO, ler, obter_varios
+from busca_assincrona import ErroBusca
+from caminhos import DIR_CACHE, diretorio_cache
+from calendario_b3 import eh_pregao, inicio_janela, proximo_pregao, ultimo_pregao
+from painel import montar_painel
+import snapshot
+
+# =========================
+# PRÉ-CARGA DA LISTA DE ACOMPANHAMENTO
+# =========================
+# Depois do fechamento, baixa as cotações dos tickers acompanhados para o
+# armazém local e grava os snapshots (retornos, médias e covariância) de
+# cada janela.
+# Assim a primeira execução do dia nas ferramentas não depende da rede.
+#
+# Uso:
+#   python pre_carga.py            -> agenda e roda todo dia após o fechamento
+#   python pre_carga.py --agora    -> roda uma vez e sai
+
+ARQUIVO_LISTA = os.path.join(DIR_CACHE, "lista_acompanhamento.txt")
+ARQUIVO_ULTIMA = "ultima_execucao.txt"
+
+HORARIO = time(HORA_FECHAMENTO, 0)
+JANELAS = (252,)          # pregões usados nas métricas
+JANELA_MAXIMA = 1260      # pregões mantidos no armazém (~5 anos)
+BENCHMARK = "^BVSP"
+ESPERA_NOVA_TENTATIVA = 15 * 60  # segundos, se a pré-carga falhar (rede fora etc.)
+
+
+def ler_lista(caminho=ARQUIVO_LISTA):
+    """Um ticker por linha; linhas vazias e comentários (#) são ignorados."""
+    if not os.path.exists(caminho):
+        return []
+
+    tickers = []
+    with open(caminho, encoding="utf-8") as f:
+        for linha in f:
+            ticker = linha.split("#")[0].strip().upper()
+            if not ticker:
+                continue
+            if not ticker.startswith("^") and not ticker.endswith(".SA"):
+                ticker += ".SA"
+            tickers.append(ticker)
+    return list(dict.fromkeys(tickers))
+
+
+# =========================
+# SNAPSHOTS
+# =========================
+def _retornos(precos, tickers, n):
+    # mesmos n fechamentos que o baixar_dados das ferramentas
+    return [precos[t][COLUNA_AJUSTADA].dropna().tail(n).pct_change().dropna() for t in tickers]
+
+
+def pre_calcular(tickers, data_ref, n, precos):
+    nomes = [t for t in tickers if len(precos[t]) > 1]
+    series = _retornos(precos, nomes + [BENCHMARK], n)
+    benchmark = series.pop()
+
+    # só as datas do Ibovespa, como no join das ferramentas: assim média e
+    # covariância dos tickers completos são as mesmas que elas calculariam
+    series = [s[s.index.isin(benchmark.index)] for s in series]
+
+    # pareado: um ticker com pouco histórico não encurta a janela dos demais
+    painel = montar_painel(
+        series, [t.replace(".SA", "") for t in nomes],
+        benchmark=benchmark, politica="pareado"
+    )
+
+    return snapshot.gravar(painel, data_ref, n)
+
+
+# =========================
+# EXECUÇÃO
+# =========================
+def executar(tickers, data_ref=None, janelas=JANELAS, log=print):
+    data_ref = ultimo_pregao(data_ref or date.today())
+    inicio = inicio_janela(data_ref, JANELA_MAXIMA)
+    todos = list(tickers) + [BENCHMARK]
+
+    log(f"Pré-carga de {len(tickers)} tickers até {data_ref:%d/%m/%Y}...")
+    try:
+        obter_varios(todos, inicio, data_ref, colunas=(COLUNA_AJUSTADA,))
+    except ErroBusca as e:
+        # o que foi baixado já está no armazém; segue com o que houver
+        log(f"Aviso: nem todos os tickers foram baixados ({e})")
+
+    precos = {t: ler(t, inicio, data_ref, colunas=(COLUNA_AJUSTADA,)) for t in todos}
+    if len(precos[BENCHMARK]) < 2:
+        raise ErroBusca(f"Sem cotações de {BENCHMARK} para a pré-carga.")
+
+    for n in janelas:
+        log(f"  janela de {n} pregões -> {pre_calcular(tickers, data_ref, n, precos)}")
+
+    with open(os.path.join(diretorio_cache("pre_carga"), ARQUIVO_ULTIMA), "w") as f:
+        f.write(data_ref.isoformat())
+    return data_ref
+
+
+# =========================
+# AGENDAMENTO
+# =========================
+def ultima_execucao():
+    caminho = os.path.join(diretorio_cache("pre_carga"), ARQUIVO_ULTIMA)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho) as f:
+        return date.fromisoformat(f.read().strip())
+
+
+def pregao_encerrado(agora):
+    """Último pregão cujo fechamento já é definitivo."""
+    hoje = agora.date()
+    if eh_pregao(hoje) and agora.time() >= HORARIO:
+        return hoje
+    return ultimo_pregao(hoje - timedelta(days=1))
+
+
+def proxima_execucao(agora):
+    hoje = agora.date()
+    if eh_pregao(hoje) and agora.time() < HORARIO:
+        return datetime.combine(hoje, HORARIO)
+    return datetime.combine(proximo_pregao(hoje), HORARIO)
+
+
+def agendar(caminho_lista=ARQUIVO_LISTA, janelas=JANELAS, parar=None, log=print):
+    """Roda a pré-carga pendente e depois uma vez por pregão, após o fechamento."""
+    parar = parar or threading.Event()
+
+    while not parar.is_set():
+        agora = datetime.now()
+        alvo = pregao_encerrado(agora)
+        tickers = ler_lista(caminho_lista)
+
+        espera = (proxima_execucao(agora) - agora).total_seconds()
+
+        if tickers and ultima_execucao() != alvo:
+            try:
+                executar(tickers, alvo, janelas, log)
+            except Exception as e:
+                log(f"Erro na pré-carga: {e}")
+                espera = min(espera, ESPERA_NOVA_TENTATIVA)
+
+        parar.wait(max(espera, 60))
+
+
+def iniciar_em_segundo_plano(caminho_lista=ARQUIVO_LISTA, janelas=JANELAS, log=print):
+    """Agenda a pré-carga numa thread daemon; devolve o Event que a interrompe."""
+    parar = threading.Event()
+    threading.Thread(
+        target=agendar, args=(caminho_lista, janelas, parar, log),
+        name="pre-carga", daemon=True
+    ).start()
+    return parar
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-carga da lista de acompanhamento")
+    parser.add_argument("--lista", default=ARQUIVO_LISTA,
+                        help="arquivo com um ticker por linha")
+    parser.add_argument("--agora", action="store_true",
+                        help="roda uma vez (último pregão encerrado) e sai")
+    parser.add_argument("--data", help="data de referência (dd/mm/aaaa); implica --agora")
+    parser.add_argument("--janela", type=int, action="append",
+                        help="pregões por janela (pode repetir); padrão 252")
+    args = parser.parse_args()
+
+    tickers = ler_lista(args.lista)
+    if not tickers:
+        parser.error(f"nenhum ticker em {args.lista}")
+
+    janelas = tuple(args.janela or JANELAS)
+    if args.agora or args.data:
+        data_ref = (datetime.strptime(args.data, "%d/%m/%Y").date()
+                    if args.data else pregao_encerrado(datetime.now()))
+        executar(tickers, data_ref, janelas)
+    else:
+        agendar(args.lista, janelas)
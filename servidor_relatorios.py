@@ -0,0 +1,318 @@
+import argparse
+import importlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from caminhos import diretorio_cache
+
+# =========================
+# SERVIDOR LOCAL DE RELATÓRIOS
+# =========================
+# Recebe pedidos de análise em JSON, enfileira e executa num pool de
+# processos. Os processos ficam vivos entre os pedidos e mantêm os caches
+# aquecidos (módulos importados, snapshots, loop de busca). O armazém de
+# preços em disco é compartilhado por todos.
+#
+#   POST /trabalhos               {"tipo": "risco", "parametros": {...}}  -> 202 {"id": ...}
+#   GET  /trabalhos               lista dos trabalhos
+#   GET  /trabalhos/<id>          estado, resultado ou erro
+#   GET  /trabalhos/<id>/pdf      relatório pronto
+#   GET  /saude                   fila e trabalhadores
+#
+# Tipos e parâmetros (os mesmos de gerar_relatorio em cada ferramenta):
+#   risco       ticker, data, n
+#   eficiencia  tickers, data, n, incremento, aporte_total, metodo, politica
+#   markowitz   tickers, data, n, incremento, aporte_total, aporte_mensal, metodo, politica
+# (politica: "descartar" ou "preencher", ver painel.POLITICAS_INTERFACE)
+#   cotacao     ticker, data
+#
+# Uso:
+#   python servidor_relatorios.py [--porta 8765] [--trabalhadores 4]
+
+ENDERECO = "127.0.0.1"
+PORTA = int(os.environ.get("ZECAAI_PORTA_RELATORIOS", "8765"))
+TRABALHADORES = max(1, min(4, (os.cpu_count() or 2) - 1))
+MAX_FILA = 200            # trabalhos pendentes aceitos antes de responder 503
+RETENCAO = 24 * 3600      # segundos que um trabalho concluído continua consultável
+
+TIPOS = {
+    "risco": "analise_risco",
+    "eficiencia": "eficiencia",
+    "markowitz": "markcml",
+    "cotacao": "cotacao",
+}
+
+
+# =========================
+# TRABALHADOR (processo do pool)
+# =========================
+def _iniciar_trabalhador():
+    # sem tela: figuras só para PDF
+    import matplotlib
+    matplotlib.use("Agg")
+
+    for modulo in TIPOS.values():
+        importlib.import_module(modulo)
+
+
+def executar_trabalho(tipo, parametros, destino):
+    modulo = importlib.import_module(TIPOS[tipo])
+    return modulo.gerar_relatorio(destino, **parametros)
+
+
+def _json(valor):
+    """Converte o resultado (numpy, pandas) em tipos que o json aceita."""
+    if isinstance(valor, dict):
+        return {str(k): _json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_json(v) for v in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not np.isfinite(valor):
+        return None
+    if isinstance(valor, (str, int, float, bool)) or valor is None:
+        return valor
+    return str(valor)
+
+
+# =========================
+# FILA DE TRABALHOS
+# =========================
+class Trabalho:
+    def __init__(self, tipo, parametros, diretorio):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.parametros = parametros
+        self.destino = os.path.join(diretorio, f"{self.id}.pdf")
+        self.criado = time.time()
+        self.concluido = None
+        self.futuro = None
+        self.resultado = None
+        self.erro = None
+
+    @property
+    def estado(self):
+        if self.concluido is not None:
+            return "erro" if self.erro else "concluido"
+        if self.futuro is not None and self.futuro.running():
+            return "executando"
+        return "na_fila"
+
+    def descrever(self):
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "parametros": self.parametros,
+            "criado": self.criado,
+            "concluido": self.concluido,
+            "resultado": self.resultado,
+            "erro": self.erro,
+        }
+
+
+class FilaTrabalhos:
+    def __init__(self, trabalhadores=TRABALHADORES, max_fila=MAX_FILA):
+        self.trabalhadores = trabalhadores
+        self.max_fila = max_fila
+        self.diretorio = diretorio_cache("relatorios")
+        self.trabalhos = {}
+        self._trava = threading.Lock()
+        self.pool = self._novo_pool()
+
+    def _novo_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.trabalhadores, initializer=_iniciar_trabalhador
+        )
+
+    def _reiniciar_pool(self, quebrado):
+        """Troca o pool depois que um trabalhador morreu (falta de memória, falha)."""
+        with self._trava:
+            if self.pool is quebrado:
+                self.pool = self._novo_pool()
+        quebrado.shutdown(wait=False, cancel_futures=True)
+
+    def pendentes(self):
+        return sum(1 for t in self.trabalhos.values() if t.concluido is None)
+
+    def enviar(self, tipo, parametros):
+        """Enfileira o trabalho; ValueError para pedido inválido, OverflowError com a fila cheia."""
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo desconhecido: {tipo!r} (use {', '.join(TIPOS)})")
+        if not isinstance(parametros, dict):
+            raise ValueError("'parametros' deve ser um objeto JSON.")
+
+        with self._trava:
+            self._limpar()
+            if self.pendentes() >= self.max_fila:
+                raise OverflowError("Fila cheia, tente novamente mais tarde.")
+
+            trabalho = Trabalho(tipo, parametros, self.diretorio)
+            self.trabalhos[trabalho.id] = trabalho
+
+        try:
+            pool, trabalho.futuro = self._submeter(trabalho)
+        except BrokenProcessPool as e:
+            # nem o pool novo aceitou: o trabalho falha, não fica pendente para sempre
+            self._falhar(trabalho, e)
+            return trabalho
+
+        trabalho.futuro.add_done_callback(lambda f: self._concluir(trabalho, f, pool))
+        return trabalho
+
+    def _submeter(self, trabalho):
+        argumentos = (executar_trabalho, trabalho.tipo, trabalho.parametros, trabalho.destino)
+        pool = self.pool
+        try:
+            return pool, pool.submit(*argumentos)
+        except BrokenProcessPool:
+            self._reiniciar_pool(pool)
+        pool = self.pool
+        return pool, pool.submit(*argumentos)
+
+    def _concluir(self, trabalho, futuro, pool):
+        try:
+            trabalho.resultado = _json(futuro.result())
+        except BrokenProcessPool as e:
+            # o trabalhador morreu durante este trabalho (ou outro do mesmo pool)
+            self._reiniciar_pool(pool)
+            self._falhar(trabalho, e)
+            return
+        except Exception as e:
+            self._falhar(trabalho, e)
+            return
+        trabalho.concluido = time.time()
+
+    def _falhar(self, trabalho, erro):
+        trabalho.erro = f"{type(erro).__name__}: {erro}"
+        trabalho.concluido = time.time()
+
+    def _limpar(self):
+        limite = time.time() - RETENCAO
+        for id_, trabalho in list(self.trabalhos.items()):
+            if trabalho.concluido is not None and trabalho.concluido < limite:
+                del self.trabalhos[id_]
+                if os.path.exists(trabalho.destino):
+                    os.remove(trabalho.destino)
+
+    def obter(self, id_):
+        return self.trabalhos.get(id_)
+
+    def listar(self):
+        return [t.descrever() for t in list(self.trabalhos.values())]
+
+    def encerrar(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+# =========================
+# HTTP
+# =========================
+ROTA_TRABALHO = re.compile(r"^/trabalhos/([0-9a-f]{32})(/pdf)?$")
+
+
+class Manipulador(BaseHTTPRequestHandler):
+    fila = None  # definido em criar_servidor
+
+    def _responder(self, status, corpo):
+        dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _erro(self, status, mensagem):
+        self._responder(status, {"erro": mensagem})
+
+    def do_POST(self):
+        if self.path != "/trabalhos":
+            return self._erro(404, "Rota não encontrada.")
+
+        try:
+            tamanho = int(self.headers.get("Content-Length", 0))
+            pedido = json.loads(self.rfile.read(tamanho) or b"{}")
+            trabalho = self.fila.enviar(pedido.get("tipo"), pedido.get("parametros", {}))
+        except (ValueError, AttributeError) as e:
+            return self._erro(400, str(e))
+        except OverflowError as e:
+            return self._erro(503, str(e))
+
+        self._responder(202, {"id": trabalho.id, "estado": trabalho.estado})
+
+    def do_GET(self):
+        if self.path == "/saude":
+            return self._responder(200, {
+                "pendentes": self.fila.pendentes(),
+                "trabalhadores": self.fila.trabalhadores,
+            })
+
+        if self.path == "/trabalhos":
+            return self._responder(200, self.fila.listar())
+
+        rota = ROTA_TRABALHO.match(self.path)
+        trabalho = self.fila.obter(rota.group(1)) if rota else None
+        if trabalho is None:
+            return self._erro(404, "Trabalho não encontrado.")
+
+        if not rota.group(2):
+            return self._responder(200, trabalho.descrever())
+
+        if trabalho.estado != "concluido" or not os.path.exists(trabalho.destino):
+            return self._erro(409, f"Relatório indisponível (estado: {trabalho.estado}).")
+
+        with open(trabalho.destino, "rb") as f:
+            dados = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(dados)))
+        self.send_header(
+            "Content-Disposition", f'attachment; filename="{trabalho.tipo}_{trabalho.id}.pdf"'
+        )
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+class ServidorRelatorios(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # o padrão (5) recusa rajadas de pedidos simultâneos
+
+
+def criar_servidor(endereco=ENDERECO, porta=PORTA, trabalhadores=TRABALHADORES):
+    """Servidor pronto para serve_forever(); a fila fica em ``servidor.fila``."""
+    fila = FilaTrabalhos(trabalhadores)
+    manipulador = type("ManipuladorRelatorios", (Manipulador,), {"fila": fila})
+
+    servidor = ServidorRelatorios((endereco, porta), manipulador)
+    servidor.fila = fila
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local de relatórios")
+    parser.add_argument("--porta", type=int, default=PORTA)
+    parser.add_argument("--trabalhadores", type=int, default=TRABALHADORES)
+    args = parser.parse_args()
+
+    servidor = criar_servidor(porta=args.porta, trabalhadores=args.trabalhadores)
+    print(f"Relatórios em http://{ENDERECO}:{args.porta} "
+          f"({args.trabalhadores} trabalhadores)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        servidor.fila.encerrar()
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from metricas_risco import expected_shortfall
+
+# =========================
+# SIMULADOR DE OPERAÇÕES (WHAT-IF)
+# =========================
+# Guarda a carteira atual já "fatorada": aportes a (R$), retornos X (T×n),
+# médias μ, covariância Σ, s = Σa, q = a'Σa e o resultado diário em R$
+# p = Xa. Uma operação de δ reais no ativo i é uma atualização de posto um:
+#   q' = q + 2δ s_i + δ² Σ_ii          (variância, O(1))
+#   p' = p + δ X[:, i]                 (resultado diário, O(T), para o ES)
+# Ticker fora da carteira: só a coluna dele é buscada e Σ ganha uma linha
+# (covariâncias contra as colunas existentes, O(nT)).
+
+Z_SCORE = 1.65
+CONFIANCA = 0.95
+
+
+def _simbolo(ticker):
+    ticker = ticker.upper().strip()
+    if ticker.startswith("^") or ticker.endswith(".SA"):
+        return ticker
+    return ticker + ".SA"
+
+
+class SimuladorOperacoes:
+    def __init__(self, nomes, retornos, aportes, buscar_retornos=None,
+                 z_score=Z_SCORE, confianca=CONFIANCA):
+        """``retornos`` é um DataFrame T×n (decimais); ``buscar_retornos(ticker)``
+        devolve a Series de retornos de um ticker novo."""
+        self.nomes = list(nomes)
+        self.datas = retornos.index
+        self.x = np.asarray(retornos, dtype=float)
+        self.aportes = np.asarray(aportes, dtype=float)
+        self.buscar_retornos = buscar_retornos
+        self.z = z_score
+        self.confianca = confianca
+
+        self.media = self.x.mean(axis=0)
+        self.cov = np.atleast_2d(np.cov(self.x, rowvar=False))
+        self.s = self.cov @ self.aportes
+        self.q = float(self.aportes @ self.s)
+        self.resultado_diario = self.x @ self.aportes
+
+    # =========================
+    # MÉTRICAS
+    # =========================
+    def _metricas(self, q, esperado, resultado_diario, total):
+        var_reais = self.z * np.sqrt(max(q, 0.0)) - esperado
+        es_reais = -expected_shortfall(resultado_diario, self.confianca)
+        return {
+            "total": float(total),
+            "var_reais": float(var_reais),
+            "var_pct": float(var_reais / total * 100) if total else np.nan,
+            "es_reais": float(es_reais),
+            "es_pct": float(es_reais / total * 100) if total else np.nan,
+        }
+
+    def atual(self):
+        """VaR e ES (R$, perdas positivas) da carteira como está."""
+        return self._metricas(
+            self.q, self.aportes @ self.media, self.resultado_diario, self.aportes.sum()
+        )
+
+    # =========================
+    # TICKERS NOVOS
+    # =========================
+    def _posicao(self, ticker):
+        ticker = _simbolo(ticker)
+        if ticker in self.nomes:
+            return self.nomes.index(ticker)
+
+        if self.buscar_retornos is None:
+            raise ValueError(f"{ticker} não está na carteira.")
+
+        # só a coluna nova: datas da carteira, dia sem negócio = retorno 0
+        serie = self.buscar_retornos(ticker)
+        coluna = serie.reindex(self.datas).fillna(0.0).values.astype(float)
+
+        media = coluna.mean()
+        centrada = coluna - media
+        cruzada = (self.x - self.media).T @ centrada / (len(coluna) - 1)
+        variancia = centrada @ centrada / (len(coluna) - 1)
+
+        n = len(self.nomes)
+        cov = np.empty((n + 1, n + 1))
+        cov[:n, :n] = self.cov
+        cov[:n, n] = cov[n, :n] = cruzada
+        cov[n, n] = variancia
+
+        self.cov = cov
+        self.x = np.column_stack([self.x, coluna])
+        self.media = np.append(self.media, media)
+        self.aportes = np.append(self.aportes, 0.0)
+        self.s = np.append(self.s, cruzada @ self.aportes[:n])
+        self.nomes.append(ticker)
+        return n
+
+    # =========================
+    # OPERAÇÕES
+    # =========================
+    def avaliar(self, ticker, valor):
+        """Métricas após comprar (valor > 0) ou vender (valor < 0) ``valor`` reais do ticker."""
+        i = self._posicao(ticker)
+        if self.aportes[i] + valor < 0:
+            raise ValueError(f"Venda maior que a posição em {self.nomes[i]}.")
+
+        q = self.q + 2 * valor * self.s[i] + valor * valor * self.cov[i, i]
+        esperado = self.aportes @ self.media + valor * self.media[i]
+        resultado_diario = self.resultado_diario + valor * self.x[:, i]
+
+        return self._metricas(q, esperado, resultado_diario, self.aportes.sum() + valor)
+
+    def aplicar(self, ticker, valor):
+        """Efetiva a operação: a carteira simulada passa a ser a nova base."""
+        metricas = self.avaliar(ticker, valor)
+        i = self.nomes.index(_simbolo(ticker))
+
+        self.q += 2 * valor * self.s[i] + valor * valor * self.cov[i, i]
+        self.s += valor * self.cov[:, i]
+        self.resultado_diario += valor * self.x[:, i]
+        self.aportes[i] += valor
+        return metricas
+
+    def posicoes(self):
+        return pd.Series(self.aportes, index=self.nomes)
@@ -0,0 +1,193 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from caminhos import diretorio_cache
+from calendario_b3 import ultimo_pregao
+from painel import montar_painel
+
+# =========================
+# SNAPSHOTS DE ESTATÍSTICAS POR (DATA, JANELA)
+# =========================
+# Um arquivo .npz por pregão de referência e janela (em pregões), gerado
+# pela pré-carga da lista de acompanhamento:
+#   snapshots/<AAAA-MM-DD>_<n>.npz
+#     versao     versão do formato
+#     tickers    (n_tickers,)        sem o sufixo .SA
+#     datas      (T,)                datas com cotação do Ibovespa
+#     retornos   (T, n_tickers)      retornos diários (NaN sem cotação)
+#     benchmark  (T,)                retornos do Ibovespa
+#     media      (n_tickers,)
+#     cov        (n_tickers, n_tickers)  covariância pareada
+#     vol, sharpe, beta, correlacao, var_param  (n_tickers,)
+# As ferramentas tiram daqui os retornos e as métricas de cada ticker (sem
+# download) e, quando a carteira toda está no snapshot, médias e covariância.
+# Só vale o snapshot que termina no pregão pedido.
+
+VERSAO = 4  # 2: fechamento ajustado; 3: só datas do Ibovespa; 4: métricas por ticker
+Z_SCORE = 1.65
+METRICAS = ("vol", "sharpe", "beta", "correlacao", "var_param")
+
+_carregados = {}
+_trava = threading.Lock()
+
+
+def caminho(data_ref, n):
+    dia = pd.Timestamp(ultimo_pregao(data_ref))
+    return os.path.join(diretorio_cache("snapshots"), f"{dia:%Y-%m-%d}_{n}.npz")
+
+
+def _nome(ticker):
+    ticker = ticker.upper().strip()
+    return ticker[:-3] if ticker.endswith(".SA") else ticker
+
+
+# =========================
+# GERAÇÃO
+# =========================
+def calcular_metricas(painel):
+    """Média, volatilidade, Sharpe, beta, correlação e VaR de cada ticker do painel."""
+    x = painel.matriz
+    b = painel.benchmark
+
+    media = np.nanmean(x, axis=0)
+    vol = np.nanstd(x, axis=0, ddof=1)
+
+    # momentos contra o benchmark só nas datas em que os dois têm retorno
+    presente = ~np.isnan(x) & ~np.isnan(b)[:, None]
+    n = presente.sum(axis=0)
+    xc = np.where(presente, x - media, 0.0)
+    bc = np.where(presente, (b - np.nanmean(b))[:, None], 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov_b = (xc * bc).sum(axis=0) / (n - 1)
+        var_b = (bc ** 2).sum(axis=0) / (n - 1)
+        var_x = (xc ** 2).sum(axis=0) / (n - 1)
+
+        return {
+            "media": media,
+            "vol": vol,
+            "sharpe": media / vol,
+            "beta": cov_b / var_b,
+            "correlacao": cov_b / np.sqrt(var_b * var_x),
+            "var_param": (media - Z_SCORE * vol) * 100,
+        }
+
+
+def gravar(painel, data_ref, n):
+    """Grava o snapshot de um painel (política "pareado", com benchmark)."""
+    destino = caminho(data_ref, n)
+
+    with open(destino + ".tmp", "wb") as f:
+        np.savez_compressed(
+            f,
+            versao=VERSAO,
+            tickers=np.array([_nome(t) for t in painel.nomes]),
+            datas=painel.datas.values,
+            retornos=painel.matriz,
+            benchmark=painel.benchmark,
+            cov=painel.cov(),
+            **calcular_metricas(painel)
+        )
+    os.replace(destino + ".tmp", destino)
+    return destino
+
+
+# =========================
+# LEITURA
+# =========================
+class Snapshot:
+    def __init__(self, dados):
+        self.tickers = [str(t) for t in dados["tickers"]]
+        self.posicao = {t: i for i, t in enumerate(self.tickers)}
+        self.datas = pd.DatetimeIndex(dados["datas"])
+        self.retornos = dados["retornos"]
+        self.benchmark = dados["benchmark"]
+        self.media = dados["media"]
+        self.cov = dados["cov"]
+        self.metricas = {m: dados[m] for m in METRICAS}
+
+        # ticker "completo": retorno em todas as datas em que o Ibovespa também tem
+        base = ~np.isnan(self.benchmark)
+        self.completo = ~np.isnan(self.retornos[base]).any(axis=0) & (base.sum() > 1)
+
+    def tem(self, ticker):
+        i = self.posicao.get(_nome(ticker))
+        return i is not None and bool(self.completo[i])
+
+    def retornos_ticker(self, ticker):
+        """Mesmo formato que ``analisar`` devolve (colunas ret_acao e ret_ibov)."""
+        i = self.posicao[_nome(ticker)]
+        base = ~np.isnan(self.benchmark)
+        return pd.DataFrame(
+            {"ret_acao": self.retornos[base, i], "ret_ibov": self.benchmark[base]},
+            index=self.datas[base]
+        )
+
+    def estatisticas(self, tickers):
+        """Vetor de médias e matriz de covariância já calculados para os tickers."""
+        pos = [self.posicao[_nome(t)] for t in tickers]
+        return self.media[pos], self.cov[np.ix_(pos, pos)]
+
+    def metricas_ticker(self, ticker):
+        i = self.posicao[_nome(ticker)]
+        return {"media": float(self.media[i]),
+                **{m: float(v[i]) for m, v in self.metricas.items()}}
+
+
+def carregar(data_ref, n):
+    """Snapshot de (data, janela), ou None se não houver um válido em disco.
+
+    Válido é o que termina no pregão pedido: durante o pregão o de hoje ainda
+    não existe e a ferramenta baixa tudo, em vez de misturar janelas.
+    """
+    arquivo = caminho(data_ref, n)
+    if not os.path.exists(arquivo):
+        return None
+
+    chave = (arquivo, os.path.getmtime(arquivo))
+    with _trava:
+        if chave not in _carregados:
+            with np.load(arquivo) as dados:
+                if int(dados["versao"]) != VERSAO:
+                    return None
+                _carregados[chave] = Snapshot(dados)
+        snap = _carregados[chave]
+
+    datas = snap.datas[~np.isnan(snap.benchmark)]
+    if len(datas) == 0 or datas[-1].date() != ultimo_pregao(data_ref):
+        return None
+    return snap
+
+
+def retornos_do_snapshot(ticker, data_ref, n):
+    """Retornos do ticker na janela, se a pré-carga já os calculou; senão None."""
+    snap = carregar(data_ref, n)
+    if snap is None or not snap.tem(ticker):
+        return None
+    return snap.retornos_ticker(ticker)
+
+
+def estatisticas_do_snapshot(tickers, data_ref, n):
+    """Médias e covariância da carteira, se todos os tickers estão completos no snapshot.
+
+    Nesse caso coincidem com as do painel "descartar" das ferramentas (mesmas
+    datas, sem buracos); com qualquer ticker faltando devolve None.
+    """
+    snap = carregar(data_ref, n)
+    if snap is None or not all(snap.tem(t) for t in tickers):
+        return None
+    return snap.estatisticas(tickers)
+
+
+def metricas_individuais(ticker, data_ref, n, ret_acao, ret_ibov):
+    """Métricas do ticker (ver calcular_metricas): do snapshot, quando há; senão
+    calculadas sobre os retornos dados, com as mesmas fórmulas."""
+    snap = carregar(data_ref, n)
+    if snap is not None and snap.tem(ticker):
+        return snap.metricas_ticker(ticker)
+
+    painel = montar_painel([ret_acao], [_nome(ticker)], benchmark=ret_ibov)
+    return {m: float(v[0]) for m, v in calcular_metricas(painel).items()}
@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import armazem_precos
+
+
+@pytest.fixture
+def armazem(tmp_path, monkeypatch):
+    def diretorio(*partes):
+        caminho = os.path.join(tmp_path, *partes)
+        os.makedirs(caminho, exist_ok=True)
+        return caminho
+
+    monkeypatch.setattr(armazem_precos, "diretorio_cache", diretorio)
+    return armazem_precos
+
+
+def barras(datas, close, ajustado):
+    return pd.DataFrame({
+        "Open": close, "High": close, "Low": close,
+        "Close": close, "Adj Close": ajustado, "Volume": 100.0,
+    }, index=pd.DatetimeIndex(datas))
+
+
+def test_fechamentos_usa_o_fechamento_ajustado(armazem, monkeypatch):
+    datas = pd.bdate_range("2024-03-04", "2024-03-08")
+    close = np.array([10.0, 10.0, 9.0, 9.0, 9.0])     # data ex de R$ 1,00
+    ajustado = np.array([9.0, 9.0, 9.0, 9.0, 9.0])
+    monkeypatch.setattr(armazem, "historico", lambda *a: barras(datas, close, ajustado))
+
+    serie = armazem.fechamentos("TEST3.SA", datas[0], datas[-1])
+    assert serie.name == "Close"
+    assert np.allclose(serie.pct_change().dropna(), 0.0)
+
+
+def test_resposta_vazia_nao_marca_cobertura(armazem, monkeypatch):
+    pedidos = []
+
+    def historico(ticker, ini, fim, intervalo):
+        pedidos.append((ini, fim))
+        return pd.DataFrame(columns=list(armazem.COLUNAS_PRECO) + ["Volume"])
+
+    monkeypatch.setattr(armazem, "historico", historico)
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-08")
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-08")
+
+    assert len(pedidos) == 2
+    assert armazem.faixas_faltantes("TEST3.SA", "2024-03-04", "2024-03-08")
+
+
+def test_resposta_curta_cobre_so_as_datas_recebidas(armazem, monkeypatch):
+    datas = pd.bdate_range("2024-03-04", "2024-03-06")
+    monkeypatch.setattr(armazem, "historico", lambda *a: barras(datas, 10.0, 10.0))
+
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-08")
+
+    faltam = armazem.faixas_faltantes("TEST3.SA", "2024-03-04", "2024-03-08")
+    assert faltam == [(pd.Timestamp("2024-03-07"), pd.Timestamp("2024-03-08"))]
+
+
+def test_provento_novo_rebaixa_o_historico(armazem, monkeypatch):
+    datas = pd.bdate_range("2024-03-04", "2024-03-15")
+    close = pd.Series(10.0, index=datas)
+    close[datas >= "2024-03-12"] = 9.0           # data ex de R$ 1,00 em 12/03
+    fator = {"atual": pd.Series(1.0, index=datas)}
+    pedidos = []
+
+    def historico(ticker, ini, fim, intervalo):
+        pedidos.append((pd.Timestamp(ini), pd.Timestamp(fim)))
+        trecho = close[(close.index >= ini) & (close.index <= fim)]
+        return barras(trecho.index, trecho.values, (trecho * fator["atual"][trecho.index]).values)
+
+    monkeypatch.setattr(armazem, "historico", historico)
+    armazem.fechamentos("TEST3.SA", "2024-03-04", "2024-03-08")
+
+    # o provento sai depois da primeira carga: o Yahoo reajusta tudo para trás
+    fator["atual"] = pd.Series(np.where(datas < "2024-03-12", 0.9, 1.0), index=datas)
+    serie = armazem.fechamentos("TEST3.SA", "2024-03-04", "2024-03-15")
+
+    assert np.allclose(serie.pct_change().dropna(), 0.0, atol=1e-6)
+    assert pedidos[-1] == (pd.Timestamp("2024-03-04"), pd.Timestamp("2024-03-15"))
+
+
+def test_desdobramento_novo_nao_deixa_emenda(armazem, monkeypatch):
+    datas = pd.bdate_range("2024-03-04", "2024-03-15")
+    bruto = pd.Series(np.where(datas < "2024-03-12", 100.0, 10.0), index=datas)
+    fator = {"atual": pd.Series(1.0, index=datas)}
+
+    def historico(ticker, ini, fim, intervalo):
+        trecho = (bruto * fator["atual"])[(datas >= ini) & (datas <= fim)]
+        return barras(trecho.index, trecho.values, trecho.values)
+
+    monkeypatch.setattr(armazem, "historico", historico)
+    armazem.fechamentos("TEST3.SA", "2024-03-04", "2024-03-08")
+
+    # desdobramento 1:10 em 12/03
+    fator["atual"] = pd.Series(np.where(datas < "2024-03-12", 0.1, 1.0), index=datas)
+    df = armazem.obter("TEST3.SA", "2024-03-04", "2024-03-15")
+
+    assert np.allclose(df["Close"].pct_change().dropna(), 0.0, atol=1e-6)
+
+
+def test_mesmo_ajuste_baixa_so_o_trecho_novo(armazem, monkeypatch):
+    datas = pd.bdate_range("2024-03-04", "2024-03-15")
+    pedidos = []
+
+    def historico(ticker, ini, fim, intervalo):
+        pedidos.append((pd.Timestamp(ini), pd.Timestamp(fim)))
+        trecho = datas[(datas >= ini) & (datas <= fim)]
+        return barras(trecho, 10.0, 10.0)
+
+    monkeypatch.setattr(armazem, "historico", historico)
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-08")
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-15")
+
+    # só o trecho novo, a partir da âncora (última barra já gravada)
+    assert pedidos[-1] == (pd.Timestamp("2024-03-08"), pd.Timestamp("2024-03-15"))
+
+
+@pytest.mark.parametrize("resposta", ["vazia", "404"])
+def test_janela_antes_da_listagem_nao_e_pedida_de_novo(armazem, monkeypatch, resposta):
+    datas = pd.bdate_range("2024-03-04", "2024-03-08")
+    pedidos = []
+
+    def historico(ticker, ini, fim, intervalo):
+        pedidos.append((pd.Timestamp(ini), pd.Timestamp(fim)))
+        if pd.Timestamp(fim) >= datas[0]:
+            return barras(datas, 10.0, 10.0)
+        if resposta == "404":
+            raise armazem.ErroBusca("HTTP 404: Data doesn't exist", 404)
+        return pd.DataFrame(columns=list(armazem.COLUNAS_PRECO) + ["Volume"])
+
+    monkeypatch.setattr(armazem, "historico", historico)
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-08")
+
+    # janela de crise anterior à listagem
+    for _ in range(3):
+        assert armazem.obter("TEST3.SA", "2008-09-01", "2008-10-27").empty
+
+    assert len(pedidos) == 2
+    assert armazem.faixas_faltantes("TEST3.SA", "2008-09-01", "2008-10-27") == []
+
+
+def test_erro_de_rede_antes_da_listagem_e_repassado(armazem, monkeypatch):
+    datas = pd.bdate_range("2024-03-04", "2024-03-08")
+
+    def historico(ticker, ini, fim, intervalo):
+        if pd.Timestamp(fim) >= datas[0]:
+            return barras(datas, 10.0, 10.0)
+        raise armazem.ErroBusca("timeout")
+
+    monkeypatch.setattr(armazem, "historico", historico)
+    armazem.obter("TEST3.SA", "2024-03-04", "2024-03-08")
+
+    with pytest.raises(armazem.ErroBusca):
+        armazem.obter("TEST3.SA", "2008-09-01", "2008-10-27")
+    assert armazem.faixas_faltantes("TEST3.SA", "2008-09-01", "2008-10-27")
@@ -0,0 +1,135 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from busca_assincrona import BuscadorAssincrono, ErroBusca
+
+DADOS = {"chart": {"result": [], "error": None}}
+
+
+class Manipulador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pedidos = {}
+    chegadas = []
+
+    def _enviar(self, status, corpo, cabecalhos=()):
+        self.send_response(status)
+        for nome, valor in cabecalhos:
+            self.send_header(nome, valor)
+        if not any(nome == "Transfer-Encoding" for nome, _ in cabecalhos):
+            self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        contagem = self.pedidos[self.path] = self.pedidos.get(self.path, 0) + 1
+        corpo = json.dumps(DADOS).encode()
+
+        if self.path == "/chunked":
+            partes = [corpo[:10], corpo[10:]]
+            dados = b"".join(b"%x\r\n%s\r\n" % (len(p), p) for p in partes) + b"0\r\n\r\n"
+            self._enviar(200, dados, [("Transfer-Encoding", "chunked")])
+        elif self.path == "/gzip":
+            self._enviar(200, gzip.compress(corpo), [("Content-Encoding", "gzip")])
+        elif self.path == "/429":
+            if contagem < 3:
+                self._enviar(429, b"", [("Retry-After", "0")])
+            else:
+                self._enviar(200, corpo)
+        elif self.path == "/lento":
+            time.sleep(0.3)
+            self._enviar(200, corpo)
+        elif self.path.startswith("/taxa"):
+            Manipulador.chegadas.append(time.monotonic())
+            self._enviar(200, corpo)
+        elif self.path == "/html":
+            self._enviar(200, b"<html>consent</html>", [("Content-Type", "text/html")])
+        else:
+            self._enviar(404, b"{}")
+
+    def log_message(self, formato, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def servidor():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manipulador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+    servidor.shutdown()
+
+
+def buscar(base, caminho):
+    async def rodar():
+        buscador = BuscadorAssincrono(base, taxa=100, rajada=100, espera_base=0.01)
+        try:
+            return await buscador.obter_json(caminho)
+        finally:
+            buscador.fechar()
+    return asyncio.run(rodar())
+
+
+def test_corpo_chunked(servidor):
+    assert buscar(servidor, "/chunked") == DADOS
+
+
+def test_corpo_gzip(servidor):
+    assert buscar(servidor, "/gzip") == DADOS
+
+
+def test_429_tenta_de_novo(servidor):
+    assert buscar(servidor, "/429") == DADOS
+    assert Manipulador.pedidos["/429"] == 3
+
+
+def test_corpo_que_nao_e_json_vira_erro_de_busca(servidor):
+    with pytest.raises(ErroBusca):
+        buscar(servidor, "/html")
+
+
+def test_erro_http_definitivo(servidor):
+    with pytest.raises(ErroBusca) as erro:
+        buscar(servidor, "/inexistente")
+    assert erro.value.status == 404
+
+
+def test_pedidos_simultaneos_para_a_mesma_url_viram_uma_busca(servidor):
+    async def rodar():
+        buscador = BuscadorAssincrono(servidor, taxa=100, rajada=100)
+        try:
+            esperas = [asyncio.ensure_future(buscador.obter_json("/lento")) for _ in range(20)]
+            await asyncio.sleep(0.05)
+            # quem desiste não cancela a busca compartilhada (shield)
+            esperas[0].cancel()
+            return await asyncio.gather(*esperas[1:]), buscador.em_andamento
+        finally:
+            buscador.fechar()
+
+    respostas, em_andamento = asyncio.run(rodar())
+    assert respostas == [DADOS] * 19
+    assert Manipulador.pedidos["/lento"] == 1
+    assert em_andamento == {}
+
+
+def test_limite_de_taxa_espaca_os_pedidos(servidor):
+    taxa, n = 20, 6
+
+    async def rodar():
+        buscador = BuscadorAssincrono(servidor, taxa=taxa, rajada=1)
+        try:
+            await asyncio.gather(*(buscador.obter_json(f"/taxa?i={i}") for i in range(n)))
+        finally:
+            buscador.fechar()
+
+    Manipulador.chegadas.clear()
+    asyncio.run(rodar())
+
+    # balde com uma ficha: um pedido a cada 1/taxa segundos
+    assert len(Manipulador.chegadas) == n
+    assert Manipulador.chegadas[-1] - Manipulador.chegadas[0] >= (n - 1) / taxa * 0.9
+    assert min(b - a for a, b in zip(Manipulador.chegadas, Manipulador.chegadas[1:])) >= 0.5 / taxa
@@ -0,0 +1,43 @@
+import os
+import threading
+
+import pandas as pd
+
+from cache_resultados import CacheResultados, chave
+
+
+def test_entrada_corrompida_conta_como_falha(tmp_path):
+    cache = CacheResultados(str(tmp_path))
+    k = chave("teste", 1)
+    with open(os.path.join(tmp_path, f"{k}.pkl"), "wb") as f:
+        f.write(b"\x80\x04nao e um pickle")
+
+    tabela = cache.memorizar(k, lambda: pd.DataFrame({"a": [1, 2]}))
+
+    assert tabela["a"].tolist() == [1, 2]
+    assert cache.estatisticas()["falhas"] == 1
+    assert cache.obter(k)["a"].tolist() == [1, 2]
+
+
+def test_gravacoes_simultaneas_da_mesma_chave(tmp_path):
+    cache = CacheResultados(str(tmp_path))
+    k = chave("teste", 2)
+    tabela = pd.DataFrame({"a": range(10000)})
+    erros = []
+
+    def gravar():
+        try:
+            for _ in range(20):
+                cache.guardar(k, tabela)
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert erros == []
+    assert os.listdir(tmp_path) == [f"{k}.pkl"]
+    pd.testing.assert_frame_equal(cache.obter(k), tabela)
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+import eficiencia
+from cache_resultados import CacheResultados
+
+
+def resultados():
+    datas = pd.bdate_range("2024-01-02", periods=60)
+    rng = np.random.default_rng(0)
+    ibov = rng.normal(0, 0.01, len(datas))
+    return [
+        (pd.DataFrame({"ret_acao": rng.normal(0.001, 0.02, len(datas)), "ret_ibov": ibov},
+                      index=datas), ticker)
+        for ticker in ("PETR4", "VALE3")
+    ]
+
+
+def test_acerto_no_cache_nao_busca_cenarios(tmp_path, monkeypatch):
+    chamadas = []
+
+    def retornos_cenarios(nomes, falhas=None):
+        chamadas.append(nomes)
+        return {"Crise": np.full((3, len(nomes)), -0.05)}
+
+    monkeypatch.setattr(eficiencia, "cache", CacheResultados(str(tmp_path)))
+    monkeypatch.setattr(eficiencia, "retornos_cenarios", retornos_cenarios)
+
+    primeira = eficiencia.tabela_var_combinacoes(resultados(), 0.25, 1000.0)
+    segunda = eficiencia.tabela_var_combinacoes(resultados(), 0.25, 1000.0)
+
+    assert len(chamadas) == 1
+    assert "Crise (%)" in segunda
+    pd.testing.assert_frame_equal(primeira, segunda)
+
+
+def test_tabela_sem_cenario_por_falha_nao_fica_no_cache(tmp_path, monkeypatch):
+    chamadas = []
+
+    def retornos_cenarios(nomes, falhas=None):
+        chamadas.append(nomes)
+        falhas.append("Crise")
+        return {}
+
+    monkeypatch.setattr(eficiencia, "cache", CacheResultados(str(tmp_path)))
+    monkeypatch.setattr(eficiencia, "retornos_cenarios", retornos_cenarios)
+
+    eficiencia.tabela_var_combinacoes(resultados(), 0.25, 1000.0)
+    eficiencia.tabela_var_combinacoes(resultados(), 0.25, 1000.0)
+
+    assert len(chamadas) == 2
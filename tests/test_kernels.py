@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import kernels
+from covariancia import matriz_covariancia, modelo_indice_unico
+
+CASOS = [(1, 0.05, 0.0), (2, 0.1, 0.0), (3, 0.05, 0.05), (4, 0.1, 0.1), (5, 0.125, 0.0)]
+
+# fallback NumPy sempre; kernel numba só quando o pacote está instalado
+caminhos = pytest.mark.parametrize("kernel", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(
+        not kernels.NUMBA_DISPONIVEL, reason="numba não instalado")),
+], indirect=True)
+
+
+@pytest.fixture
+def kernel(request, monkeypatch):
+    monkeypatch.setattr(kernels, "NUMBA_DISPONIVEL", request.param)
+    return kernels
+
+
+def forca_bruta(n, passo, peso_min):
+    """Todas as carteiras com pesos múltiplos do passo, >= peso_min e soma 1, em ordem."""
+    total = int(1 / passo)
+    minimo = int(peso_min / passo)
+    partes = [
+        c for c in itertools.product(range(minimo, total + 1), repeat=n)
+        if sum(c) == total
+    ]
+    return np.array(sorted(partes), dtype=float) / total
+
+
+def dados(n):
+    rng = np.random.default_rng(n)
+    a = rng.normal(size=(n, n)) * 0.01
+    return rng.normal(0.001, 0.001, n), a @ a.T, rng.uniform(1000, 2000, n)
+
+
+@caminhos
+@pytest.mark.parametrize("n, passo, peso_min", CASOS)
+def test_grade_igual_a_forca_bruta(kernel, n, passo, peso_min):
+    media, cov, montantes = dados(n)
+    esperado = forca_bruta(n, passo, peso_min)
+
+    retorno, vol, montante, pesos = kernel.avaliar_grade(
+        media, cov, passo, peso_min, montantes, com_pesos=True
+    )
+
+    np.testing.assert_allclose(pesos, esperado)
+    assert pesos.min() >= peso_min - 1e-12
+    np.testing.assert_allclose(pesos.sum(axis=1), 1.0)
+    np.testing.assert_allclose(retorno, esperado @ media)
+    np.testing.assert_allclose(vol, np.sqrt(np.einsum("ij,jk,ik->i", esperado, cov, esperado)))
+    np.testing.assert_allclose(montante, esperado @ montantes)
+    np.testing.assert_allclose(kernel.pesos_grade(n, passo, peso_min), esperado)
+
+
+@caminhos
+def test_sem_pesos_e_sem_montante(kernel):
+    media, cov, _ = dados(3)
+
+    resultado = kernel.avaliar_grade(media, cov, 0.1, 0.0)
+
+    assert len(resultado) == 3 and resultado[2] is None
+    np.testing.assert_allclose(resultado[0], forca_bruta(3, 0.1, 0.0) @ media)
+
+
+@caminhos
+def test_modelo_de_indice_sem_matriz_densa(kernel):
+    rng = np.random.default_rng(7)
+    mercado = rng.normal(0, 0.01, 250)
+    retornos = mercado[:, None] * rng.uniform(0.5, 1.5, 4) + rng.normal(0, 0.01, (250, 4))
+    indice = modelo_indice_unico(retornos, mercado)
+    media = retornos.mean(axis=0)
+
+    fator = kernel.avaliar_grade(media, indice, 0.1, 0.05)
+    denso = kernel.avaliar_grade(media, matriz_covariancia(indice), 0.1, 0.05)
+
+    np.testing.assert_allclose(fator[1], denso[1])
+    np.testing.assert_allclose(fator[0], denso[0])
+
+
+def test_passo_incompativel():
+    with pytest.raises(ValueError):
+        kernels.avaliar_grade(np.zeros(3), np.eye(3), 0.25, 0.5)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from metricas_risco import (
+    CONFIANCAS, HORIZONTES, decompor_var, es_carteiras, expected_shortfall, superficie_var
+)
+
+
+def es_ordenado(x, confianca):
+    k = max(int(np.ceil(round(len(x) * (1 - confianca), 9))), 1)
+    return np.sort(x)[:k].mean()
+
+
+@pytest.mark.parametrize("t", [20, 100, 252, 1000, 1001])
+@pytest.mark.parametrize("confianca", [0.95, 0.99, 0.975])
+def test_es_igual_a_media_das_piores_ordenadas(t, confianca):
+    x = np.random.default_rng(t).standard_t(4, t)
+    assert np.isclose(expected_shortfall(x, confianca), es_ordenado(x, confianca))
+
+
+def test_es_com_t_multiplo_de_20_usa_exatamente_5_por_cento():
+    x = np.random.default_rng(0).normal(size=1000)
+    assert np.isclose(expected_shortfall(x, 0.95), np.sort(x)[:50].mean())
+
+
+def test_es_carteiras_igual_ao_es_de_cada_carteira():
+    rng = np.random.default_rng(1)
+    retornos = rng.normal(0, 0.02, (252, 3))
+    pesos = rng.dirichlet(np.ones(3), 10)
+
+    esperado = [expected_shortfall(retornos @ w) for w in pesos]
+    assert np.allclose(es_carteiras(pesos, retornos), esperado)
+
+
+def test_decompor_var_soma_dos_componentes_e_o_var():
+    rng = np.random.default_rng(2)
+    retornos = rng.normal(0.001, 0.02, (252, 4))
+    aportes = np.array([10_000, 20_000, 5_000, 0.0])
+    media, cov = retornos.mean(axis=0), np.cov(retornos, rowvar=False)
+
+    d = decompor_var(aportes, media, cov)
+    esperado = 1.65 * np.sqrt(aportes @ cov @ aportes) - aportes @ media
+    assert np.isclose(d["componente"].sum(), esperado)
+    assert np.isclose(d["var_reais"], esperado)
+
+
+def test_decompor_var_sem_aportes_nao_gera_nan():
+    cov = np.array([[4e-4, 1e-4], [1e-4, 9e-4]])
+    with np.errstate(all="raise"):
+        d = decompor_var(np.zeros(2), np.array([1e-3, 5e-4]), cov)
+    assert d["var_reais"] == 0.0
+    assert np.all(np.isfinite(d["marginal"]))
+
+
+def test_superficie_historica_escala_como_a_parametrica():
+    rng = np.random.default_rng(3)
+    x = rng.normal(0.002, 0.02, (500, 2))
+
+    parametrico, historico = superficie_var(x, [0.5, 0.5])
+
+    # horizonte de 1 pregão: o próprio quantil
+    q = np.quantile(x[:, 0], 1 - np.array(CONFIANCAS))
+    np.testing.assert_allclose(historico[0, :, 0], q * 100)
+
+    # média × h nas duas: a diferença entre elas cresce só com √h
+    diferenca = parametrico - historico
+    np.testing.assert_allclose(
+        diferenca, diferenca[:, :, :1] * np.sqrt(np.array(HORIZONTES))[None, None, :]
+    )
@@ -0,0 +1,64 @@
+import os
+import threading
+
+import pytest
+
+import modelos_pdf
+
+A4 = (8.27, 11.69)
+
+
+def em_thread(funcao):
+    saida = []
+    t = threading.Thread(target=lambda: saida.append(funcao()))
+    t.start()
+    t.join()
+    return saida[0]
+
+
+def test_modelo_reaproveitado_entre_exportacoes():
+    pegar = lambda: modelos_pdf.modelo_figura("teste_reuso", A4, "rodapé")
+
+    # cada exportação da interface roda numa thread nova
+    assert em_thread(pegar) is em_thread(pegar)
+
+
+def test_threads_simultaneas_nao_dividem_modelo():
+    pegar = lambda: modelos_pdf.capa("Teste", "rodapé", A4)
+    pronta = threading.Barrier(2)
+    modelos = []
+
+    def exportar():
+        modelos.append(pegar())
+        pronta.wait()  # as duas vivas ao mesmo tempo
+
+    threads = [threading.Thread(target=exportar) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert modelos[0] is not modelos[1]
+    assert pegar() is pegar()
+
+
+@pytest.fixture
+def diretorio(tmp_path, monkeypatch):
+    def diretorio_cache(*partes):
+        caminho = os.path.join(tmp_path, *partes)
+        os.makedirs(caminho, exist_ok=True)
+        return caminho
+
+    monkeypatch.setattr(modelos_pdf, "diretorio_cache", diretorio_cache)
+    monkeypatch.setattr(modelos_pdf, "_paginas", {})
+    return tmp_path / "modelos"
+
+
+def test_pagina_estatica_grava_sem_temporario(diretorio):
+    desenhar = lambda fig: fig.add_subplot().text(0.5, 0.5, "estática")
+
+    conteudo = modelos_pdf.pagina_estatica("teste", desenhar, A4)
+
+    arquivos = os.listdir(diretorio)
+    assert arquivos == [f"teste_v{modelos_pdf.VERSAO_MODELOS}.pdf"]
+    assert (diretorio / arquivos[0]).read_bytes() == conteudo
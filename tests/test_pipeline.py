@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import PipelineCarteira
+
+DATAS = pd.bdate_range("2024-01-01", periods=60)
+
+
+def analisar_falso(ticker, data_str, n):
+    if ticker == "XXXX":
+        raise ValueError(f"Sem dados suficientes para {ticker}")
+    rng = np.random.default_rng(sum(map(ord, ticker)))
+    df = pd.DataFrame({
+        "ret_acao": rng.normal(0, 0.02, len(DATAS)),
+        "ret_ibov": rng.normal(0, 0.01, len(DATAS)),
+    }, index=DATAS)
+    return df, ticker
+
+
+def test_download_com_falha_nao_corrompe_o_estado():
+    pipeline = PipelineCarteira(analisar_falso, lambda *a: 0.0)
+
+    with pytest.raises(ValueError):
+        pipeline.atualizar(["PETR4", "XXXX"], "15/03/2024", 60)
+
+    resultados = pipeline.atualizar(["PETR4"], "15/03/2024", 60)
+    assert [t for _, t in resultados] == ["PETR4"]
+
+    esperado = np.cov(analisar_falso("PETR4", None, None)[0]["ret_acao"])
+    assert np.allclose(pipeline.cov(), esperado)
+
+
+def test_falha_depois_de_execucao_valida_preserva_a_carteira():
+    pipeline = PipelineCarteira(analisar_falso, lambda *a: 0.0)
+    pipeline.atualizar(["PETR4", "VALE3"], "15/03/2024", 60)
+
+    with pytest.raises(ValueError):
+        pipeline.atualizar(["PETR4", "VALE3", "XXXX"], "15/03/2024", 60)
+
+    pipeline.atualizar(["VALE3", "PETR4", "ITUB4"], "15/03/2024", 60)
+    retornos = pipeline.retornos()
+    assert list(retornos.columns) == ["VALE3", "PETR4", "ITUB4"]
+    assert np.allclose(pipeline.cov(), retornos.cov().values)
@@ -0,0 +1,97 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import servidor_relatorios
+
+PDF = b"%PDF-1.4\n% relatorio de teste\n%%EOF\n"
+
+
+def gerar_relatorio(destino, espera=0, morrer=False):
+    """Substitui o gerar_relatorio das ferramentas nos processos do pool."""
+    if morrer:
+        os._exit(1)
+    time.sleep(espera)
+    with open(destino, "wb") as f:
+        f.write(PDF)
+    return {"paginas": 1}
+
+
+@pytest.fixture
+def servidor(tmp_path, monkeypatch):
+    monkeypatch.setattr(servidor_relatorios, "TIPOS", {"teste": __name__})
+    monkeypatch.setattr(servidor_relatorios, "diretorio_cache", lambda *p: str(tmp_path))
+
+    srv = servidor_relatorios.criar_servidor(porta=0, trabalhadores=1)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    srv.fila.encerrar()
+
+
+def pedir(srv, caminho, corpo=None):
+    url = f"http://127.0.0.1:{srv.server_address[1]}{caminho}"
+    dados = None if corpo is None else json.dumps(corpo).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=dados), timeout=10) as r:
+            return r.status, r.headers.get("Content-Type"), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers.get("Content-Type"), e.read()
+
+
+def enviar(srv, **parametros):
+    status, _, corpo = pedir(srv, "/trabalhos", {"tipo": "teste", "parametros": parametros})
+    assert status == 202
+    return json.loads(corpo)["id"]
+
+
+def aguardar(srv, id_, limite=30):
+    fim = time.time() + limite
+    while time.time() < fim:
+        trabalho = json.loads(pedir(srv, f"/trabalhos/{id_}")[2])
+        if trabalho["estado"] in ("concluido", "erro"):
+            return trabalho
+        time.sleep(0.05)
+    raise AssertionError(f"trabalho {id_} não terminou")
+
+
+def test_envio_consulta_e_pdf(servidor):
+    id_ = enviar(servidor)
+
+    trabalho = aguardar(servidor, id_)
+    assert trabalho["estado"] == "concluido"
+    assert trabalho["resultado"] == {"paginas": 1}
+
+    status, tipo, corpo = pedir(servidor, f"/trabalhos/{id_}/pdf")
+    assert (status, tipo, corpo) == (200, "application/pdf", PDF)
+
+
+def test_pedido_invalido_da_400(servidor):
+    assert pedir(servidor, "/trabalhos", {"tipo": "nao_existe"})[0] == 400
+    assert pedir(servidor, "/trabalhos", {"tipo": "teste", "parametros": [1]})[0] == 400
+
+
+def test_fila_cheia_da_503(servidor):
+    servidor.fila.max_fila = 1
+    id_ = enviar(servidor, espera=1)
+
+    status, _, corpo = pedir(servidor, "/trabalhos", {"tipo": "teste", "parametros": {}})
+    assert status == 503
+    assert "erro" in json.loads(corpo)
+    assert aguardar(servidor, id_)["estado"] == "concluido"
+
+
+def test_trabalhador_morto_nao_derruba_o_servidor(servidor):
+    morto = aguardar(servidor, enviar(servidor, morrer=True))
+    assert morto["estado"] == "erro"
+    assert "BrokenProcessPool" in morto["erro"]
+
+    # o pool é recriado e os próximos trabalhos seguem normalmente
+    assert aguardar(servidor, enviar(servidor))["estado"] == "concluido"
+    assert json.loads(pedir(servidor, "/saude")[2])["pendentes"] == 0
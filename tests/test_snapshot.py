@@ -0,0 +1,57 @@
+import os
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import snapshot
+from painel import montar_painel
+
+
+@pytest.fixture
+def snapshots(tmp_path, monkeypatch):
+    def diretorio(*partes):
+        caminho = os.path.join(tmp_path, *partes)
+        os.makedirs(caminho, exist_ok=True)
+        return caminho
+
+    monkeypatch.setattr(snapshot, "diretorio_cache", diretorio)
+    monkeypatch.setattr(snapshot, "_carregados", {})
+    return snapshot
+
+
+def retornos(datas, semente):
+    rng = np.random.default_rng(semente)
+    return pd.Series(rng.normal(0.001, 0.02, len(datas)), index=datas)
+
+
+def gravar(snapshots, datas, data_ref):
+    ibov = retornos(datas, 0)
+    acoes = [retornos(datas, 1), retornos(datas, 2)]
+    painel = montar_painel(acoes, ["PETR4", "VALE3"], benchmark=ibov, politica="pareado")
+    snapshots.gravar(painel, data_ref, 20)
+    return acoes, ibov
+
+
+def test_metricas_do_snapshot_iguais_as_calculadas(snapshots):
+    datas = pd.bdate_range("2024-02-16", "2024-03-15")
+    acoes, ibov = gravar(snapshots, datas, date(2024, 3, 15))
+
+    do_snapshot = snapshots.metricas_individuais("PETR4.SA", date(2024, 3, 15), 20, acoes[0], ibov)
+    calculadas = snapshots.metricas_individuais("PETR4.SA", date(2024, 3, 18), 20, acoes[0], ibov)
+
+    assert snapshots.carregar(date(2024, 3, 15), 20) is not None
+    assert snapshots.carregar(date(2024, 3, 18), 20) is None
+    assert do_snapshot.keys() == calculadas.keys()
+    for m in do_snapshot:
+        assert do_snapshot[m] == pytest.approx(calculadas[m])
+
+
+def test_snapshot_que_nao_termina_no_pregao_pedido_e_ignorado(snapshots):
+    # gravado com a data de hoje no nome, mas sem a barra do dia
+    datas = pd.bdate_range("2024-02-16", "2024-03-14")
+    gravar(snapshots, datas, date(2024, 3, 15))
+
+    assert snapshots.carregar(date(2024, 3, 15), 20) is None
+    assert snapshots.retornos_do_snapshot("PETR4", date(2024, 3, 15), 20) is None